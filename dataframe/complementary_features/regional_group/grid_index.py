@@ -0,0 +1,384 @@
+"""
+Grid Index — Vizinho mais próximo Haversine em tempo constante
+==============================================================
+
+A atribuição de ``grupo_regional`` a coordenadas novas é um KNN-1 Haversine
+sobre os pontos de ``geo_reference.parquet``. Um ``BallTree`` resolve isso,
+mas exige sklearn (~1 s de import), é reconstruído a cada processo e cada
+consulta desce a árvore.
+
+Aqui o retângulo das referências é dividido em células fixas de
+``step_deg`` graus. Cada célula guarda os pontos que podem ser o vizinho
+mais próximo de alguma coordenada dentro dela:
+
+    geo_reference.parquet ──► export_grid_index() ──► geo_grid.npz
+                                ├─ counts      uint16 (n_lat · n_lon,)  candidatos por célula
+                                ├─ candidates  uint16 (Σ counts,)       índices dos pontos (CSR)
+                                ├─ latitude, longitude, labels          pontos de referência
+                                └─ lat0, lon0, step, n_lat, n_lon, source_sha256
+
+    GeoGridIndex.nearest(lat, lon)
+        célula = ⌊(lat − lat0) / step⌋ · n_lon + ⌊(lon − lon0) / step⌋
+        argmin da distância Haversine entre os candidatos da célula
+
+Exatidão: com ``c`` o centro da célula e ``r`` a distância de ``c`` ao canto
+mais distante, toda coordenada ``q`` da célula tem (desigualdade triangular)
+
+    d(q, p) ≥ d(c, p) − r        e        d(q, p*) ≤ d(c, p*) + r
+
+então o vizinho de ``q`` está entre os pontos com
+``d(c, p) ≤ min_p* d(c, p*) + 2r`` — é essa a lista da célula (com folga de
+arredondamento). A distância comparada é a mesma ``rdist`` do BallTree
+Haversine do sklearn. Coordenadas fora do retângulo (raras) são comparadas
+com todos os pontos.
+
+CLI:
+    python -m dataframe.complementary_features.regional_group.grid_index export
+    python -m dataframe.complementary_features.regional_group.grid_index parity
+    python -m dataframe.complementary_features.regional_group.grid_index bench
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from pathlib import Path
+
+import numpy as np
+
+_logger = logging.getLogger(__name__)
+
+GRID_INDEX_NAME = "geo_grid.npz"
+DEFAULT_REFERENCE_PATH = Path(__file__).resolve().parents[3] / "use_case" / "files" / "geo_reference.parquet"
+
+_FORMAT_VERSION = 1
+_DEFAULT_STEP_DEG = 0.25
+_MARGIN_DEG = 1.0
+# Folga (radianos, ~6 mm) sobre os limites da desigualdade triangular
+_EPS_RAD = 1e-9
+# Células por bloco na construção (bloco × pontos distâncias em memória)
+_BUILD_CHUNK = 8192
+
+
+def _sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _rdist(lat1: np.ndarray, lon1: np.ndarray, cos1: np.ndarray,
+           lat2: np.ndarray, lon2: np.ndarray, cos2: np.ndarray) -> np.ndarray:
+    """Distância reduzida Haversine (radianos), a mesma ``rdist`` do BallTree."""
+    s0 = np.sin(0.5 * (lat1 - lat2))
+    s1 = np.sin(0.5 * (lon1 - lon2))
+    return s0 * s0 + cos1 * cos2 * s1 * s1
+
+
+def _dist(rdist: np.ndarray) -> np.ndarray:
+    return 2.0 * np.arcsin(np.sqrt(np.minimum(rdist, 1.0)))
+
+
+class GeoGridIndex:
+    """
+    KNN-1 Haversine sobre pontos de referência rotulados, por grade fixa.
+
+    Attributes:
+        labels : ``grupo_regional`` de cada ponto de referência.
+        step   : Lado da célula em graus.
+    """
+
+    def __init__(self, arrays: dict[str, np.ndarray]) -> None:
+        self.step = float(arrays["step"])
+        self._lat0 = float(arrays["lat0"])
+        self._lon0 = float(arrays["lon0"])
+        self._n_lat = int(arrays["n_lat"])
+        self._n_lon = int(arrays["n_lon"])
+        self._counts = arrays["counts"].astype(np.int64)
+        self._offsets = np.concatenate([[0], np.cumsum(self._counts)[:-1]])
+        self._candidates = arrays["candidates"].astype(np.intp)
+        self._lat = np.radians(arrays["latitude"])
+        self._lon = np.radians(arrays["longitude"])
+        self._cos = np.cos(self._lat)
+        self.labels = arrays["labels"]
+
+    # ── Construção ───────────────────────────────────────────────────────
+
+    @staticmethod
+    def build_arrays(
+        latitude: np.ndarray,
+        longitude: np.ndarray,
+        labels: np.ndarray,
+        step_deg: float = _DEFAULT_STEP_DEG,
+    ) -> dict[str, np.ndarray]:
+        """
+        Tabela célula → candidatos para os pontos dados (em graus).
+
+        Raises:
+            ValueError: Sem pontos, coordenadas não finitas ou ``step_deg``
+                        fora de (0, 1] (o limite do canto assume células pequenas).
+        """
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        if latitude.size == 0:
+            raise ValueError("Grid index sem pontos de referência")
+        if not (np.isfinite(latitude).all() and np.isfinite(longitude).all()):
+            raise ValueError("Pontos de referência com coordenadas não finitas")
+        if not 0.0 < step_deg <= 1.0:
+            raise ValueError(f"step_deg deve estar em (0, 1], recebido {step_deg}")
+
+        lat0 = float(latitude.min()) - _MARGIN_DEG
+        lon0 = float(longitude.min()) - _MARGIN_DEG
+        n_lat = int(np.ceil((float(latitude.max()) + _MARGIN_DEG - lat0) / step_deg))
+        n_lon = int(np.ceil((float(longitude.max()) + _MARGIN_DEG - lon0) / step_deg))
+
+        p_lat, p_lon = np.radians(latitude), np.radians(longitude)
+        p_cos = np.cos(p_lat)
+        half = np.radians(step_deg) / 2.0
+
+        counts, candidates = [], []
+        cells = np.arange(n_lat * n_lon)
+        for start in range(0, cells.size, _BUILD_CHUNK):
+            chunk = cells[start:start + _BUILD_CHUNK]
+            c_lat = np.radians(lat0 + (chunk // n_lon + 0.5) * step_deg)[:, None]
+            c_lon = np.radians(lon0 + (chunk % n_lon + 0.5) * step_deg)[:, None]
+            c_cos = np.cos(c_lat)
+            # Canto mais distante do centro: o do lado do equador (|lat| menor)
+            radius = np.maximum(
+                _dist(_rdist(c_lat, c_lon, c_cos, c_lat - half, c_lon + half, np.cos(c_lat - half))),
+                _dist(_rdist(c_lat, c_lon, c_cos, c_lat + half, c_lon + half, np.cos(c_lat + half))),
+            )
+            d = _dist(_rdist(c_lat, c_lon, c_cos, p_lat[None, :], p_lon[None, :], p_cos[None, :]))
+            keep = d <= d.min(axis=1, keepdims=True) + 2.0 * radius + _EPS_RAD
+            counts.append(keep.sum(axis=1))
+            candidates.append(np.nonzero(keep)[1])
+
+        index_dtype = np.uint16 if latitude.size <= np.iinfo(np.uint16).max else np.uint32
+        counts = np.concatenate(counts)
+        return {
+            "format_version": np.array(_FORMAT_VERSION),
+            "step":       np.array(step_deg),
+            "lat0":       np.array(lat0),
+            "lon0":       np.array(lon0),
+            "n_lat":      np.array(n_lat),
+            "n_lon":      np.array(n_lon),
+            "counts":     counts.astype(np.uint16 if counts.max() <= np.iinfo(np.uint16).max else np.uint32),
+            "candidates": np.concatenate(candidates).astype(index_dtype),
+            "latitude":   latitude,
+            "longitude":  longitude,
+            "labels":     np.asarray(labels),
+        }
+
+    @classmethod
+    def build(cls, latitude, longitude, labels, step_deg: float = _DEFAULT_STEP_DEG) -> "GeoGridIndex":
+        """Índice em memória (ver ``build_arrays``)."""
+        return cls(cls.build_arrays(latitude, longitude, labels, step_deg))
+
+    @classmethod
+    def load(cls, path: str | Path, reference: str | Path | None = None) -> "GeoGridIndex":
+        """
+        Carrega ``geo_grid.npz``.
+
+        Args:
+            path     : Caminho do ``.npz``.
+            reference: ``geo_reference.parquet`` de origem; quando informado,
+                       o sha256 gravado na exportação precisa bater.
+
+        Raises:
+            ValueError: Versão de formato desconhecida ou ``.npz`` exportado
+                        de outro ``geo_reference.parquet``.
+        """
+        with np.load(path) as data:
+            arrays = {k: data[k] for k in data.files}
+        if int(arrays.pop("format_version")) != _FORMAT_VERSION:
+            raise ValueError(f"{path}: versão de formato não suportada")
+        source = str(arrays.pop("source_sha256"))
+        if reference is not None and _sha256(Path(reference)) != source:
+            raise ValueError(
+                f"{path} foi exportado de outro {Path(reference).name} — re-exporte com: "
+                f"python -m dataframe.complementary_features.regional_group.grid_index export"
+            )
+        return cls(arrays)
+
+    # ── Consulta ─────────────────────────────────────────────────────────
+
+    def nearest(self, latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+        """
+        Índice (n,) do ponto de referência mais próximo de cada coordenada.
+
+        Args:
+            latitude, longitude: Graus, sem nulos.
+
+        Raises:
+            ValueError: Coordenada NaN/inf (como o BallTree).
+        """
+        latitude = np.asarray(latitude, dtype=np.float64).ravel()
+        longitude = np.asarray(longitude, dtype=np.float64).ravel()
+        if not (np.isfinite(latitude).all() and np.isfinite(longitude).all()):
+            raise ValueError("Input contains NaN or infinity.")
+
+        i = np.floor((latitude - self._lat0) / self.step)
+        j = np.floor((longitude - self._lon0) / self.step)
+        inside = (i >= 0) & (i < self._n_lat) & (j >= 0) & (j < self._n_lon)
+
+        lat, lon = np.radians(latitude), np.radians(longitude)
+        if inside.all():
+            cells = (i * self._n_lon + j).astype(np.intp)
+            return self._nearest_in_cells(lat, lon, cells)
+
+        out = np.empty(latitude.size, dtype=np.intp)
+        cells = (i[inside] * self._n_lon + j[inside]).astype(np.intp)
+        out[inside] = self._nearest_in_cells(lat[inside], lon[inside], cells)
+        out[~inside] = self._nearest_brute(lat[~inside], lon[~inside])
+        return out
+
+    def assign(self, latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+        """Rótulo (``grupo_regional``) do ponto mais próximo de cada coordenada."""
+        return self.labels[self.nearest(latitude, longitude)]
+
+    def _nearest_in_cells(self, lat: np.ndarray, lon: np.ndarray, cells: np.ndarray) -> np.ndarray:
+        """Argmin da ``rdist`` entre os candidatos de cada célula (listas de tamanho variável)."""
+        counts = self._counts[cells]
+        if (counts == 1).all():
+            return self._candidates[self._offsets[cells]]
+
+        # Pares (consulta, candidato) achatados: consulta q ocupa [starts[q], starts[q] + counts[q])
+        starts = np.cumsum(counts) - counts
+        query = np.repeat(np.arange(cells.size), counts)
+        slot = np.arange(query.size) - starts[query] + self._offsets[cells][query]
+        cand = self._candidates[slot]
+
+        rd = _rdist(lat[query], lon[query], np.cos(lat)[query], self._lat[cand], self._lon[cand], self._cos[cand])
+        best = np.minimum.reduceat(rd, starts)
+        # Primeiro candidato (menor índice) que atinge o mínimo da sua consulta
+        hits = np.flatnonzero(rd == best[query])
+        first = np.ones(hits.size, dtype=bool)
+        first[1:] = query[hits[1:]] != query[hits[:-1]]
+        return cand[hits[first]]
+
+    def _nearest_brute(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        """Argmin contra todos os pontos (coordenadas fora da grade)."""
+        out = np.empty(lat.size, dtype=np.intp)
+        step = max(1, (1 << 22) // self._lat.size)
+        for s in range(0, lat.size, step):
+            la, lo = lat[s:s + step, None], lon[s:s + step, None]
+            rd = _rdist(la, lo, np.cos(la), self._lat[None, :], self._lon[None, :], self._cos[None, :])
+            out[s:s + step] = rd.argmin(axis=1)
+        return out
+
+
+def export_grid_index(
+    reference_path: str | Path = DEFAULT_REFERENCE_PATH,
+    step_deg: float = _DEFAULT_STEP_DEG,
+) -> Path:
+    """
+    Grava ``geo_grid.npz`` ao lado de ``geo_reference.parquet``.
+
+    Returns:
+        Caminho do ``.npz`` gravado.
+    """
+    import pyarrow.parquet as pq
+
+    reference_path = Path(reference_path)
+    ref = pq.read_table(reference_path, columns=["latitude", "longitude", "grupo_regional"], use_threads=False)
+    arrays = GeoGridIndex.build_arrays(
+        ref.column("latitude").to_numpy(),
+        ref.column("longitude").to_numpy(),
+        ref.column("grupo_regional").to_numpy(),
+        step_deg,
+    )
+    out = reference_path.with_name(GRID_INDEX_NAME)
+    tmp = out.with_name(out.stem + ".tmp.npz")
+    np.savez(tmp, source_sha256=np.array(_sha256(reference_path)), **arrays)
+    tmp.replace(out)
+    _logger.info(
+        f"Grid index exportado para {out} ({int(arrays['n_lat']) * int(arrays['n_lon'])} células, "
+        f"{arrays['candidates'].size} candidatos, máx {int(arrays['counts'].max())}/célula, "
+        f"{out.stat().st_size / 1024:.0f} KB)"
+    )
+    return out
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  CLI — exportação, paridade e benchmark contra o BallTree
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _reference_tree(reference_path: Path):
+    """BallTree Haversine do caminho antigo (referência)."""
+    import pyarrow.parquet as pq
+    from sklearn.neighbors import BallTree
+
+    ref = pq.read_table(reference_path, columns=["latitude", "longitude"], use_threads=False)
+    coords = np.radians(np.column_stack([ref.column("latitude").to_numpy(), ref.column("longitude").to_numpy()]))
+    return BallTree(coords, metric="haversine")
+
+
+def _probe_points(index: GeoGridIndex, n: int, seed: int = 0) -> np.ndarray:
+    """Coordenadas (n, 2) em graus: pontos da referência, perturbações, pares médios e o retângulo inteiro."""
+    rng = np.random.default_rng(seed)
+    ref = np.degrees(np.column_stack([index._lat, index._lon]))
+    k = n // 4
+    near = ref[rng.integers(0, len(ref), k)] + rng.normal(0.0, 0.02, (k, 2))
+    a, b = ref[rng.integers(0, len(ref), k)], ref[rng.integers(0, len(ref), k)]
+    mid = (a + b) / 2.0
+    box = np.column_stack([
+        rng.uniform(ref[:, 0].min() - 3.0, ref[:, 0].max() + 3.0, n - 3 * k),
+        rng.uniform(ref[:, 1].min() - 3.0, ref[:, 1].max() + 3.0, n - 3 * k),
+    ])
+    return np.concatenate([ref, near, mid, box])
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Grid index do grupo_regional (KNN-1 Haversine)")
+    parser.add_argument("command", choices=("export", "parity", "bench"))
+    parser.add_argument("--reference", type=Path, default=DEFAULT_REFERENCE_PATH)
+    parser.add_argument("--step", type=float, default=_DEFAULT_STEP_DEG)
+    parser.add_argument("--sizes", default="1,8,64,512,4096,32768,262144,1000000")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    grid_path = args.reference.with_name(GRID_INDEX_NAME)
+
+    if args.command == "export":
+        export_grid_index(args.reference, args.step)
+    elif args.command == "parity":
+        index = GeoGridIndex.load(grid_path, args.reference)
+        tree = _reference_tree(args.reference)
+        points = _probe_points(index, 2_000_000)
+        got = index.nearest(points[:, 0], points[:, 1])
+        _, expected = tree.query(np.radians(points), k=1)
+        expected = expected.ravel()
+        differ = got != expected
+        # Empates exatos de distância podem escolher outro ponto: o rótulo é o que importa
+        label_differ = index.labels[got] != index.labels[expected]
+        print(f"  {points.shape[0]:,} coordenadas: {int(differ.sum())} índices e "
+              f"{int(label_differ.sum())} rótulos diferentes do BallTree")
+        raise SystemExit(1 if label_differ.any() else 0)
+    else:
+        t0 = time.perf_counter()
+        tree = _reference_tree(args.reference)
+        tree_load = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        index = GeoGridIndex.load(grid_path, args.reference)
+        grid_load = time.perf_counter() - t0
+        print(f"  carga: BallTree (parquet + construção) {tree_load * 1000:.2f} ms, "
+              f"grid {grid_load * 1000:.2f} ms (com sha256 do parquet)")
+        sizes = [int(s) for s in args.sizes.split(",")]
+        points = _probe_points(index, max(sizes), seed=1)
+        np.random.default_rng(1).shuffle(points)
+        print(f"\n  {'':>12} {'BallTree':>12} {'grid':>12} {'speedup':>9} {'grid µs/consulta':>17}")
+        for n in sizes:
+            batch = points[:n]
+            rad = np.radians(batch)
+            ms = {}
+            for name, fn in (("tree", lambda: tree.query(rad, k=1)),
+                             ("grid", lambda: index.nearest(batch[:, 0], batch[:, 1]))):
+                fn()
+                times = []
+                for _ in range(args.repeats if n < 100_000 else 3):
+                    t0 = time.perf_counter()
+                    fn()
+                    times.append(time.perf_counter() - t0)
+                ms[name] = float(np.median(times)) * 1000
+            print(f"  {f'n={n:,}':>12} {ms['tree']:>10.3f}ms {ms['grid']:>10.3f}ms "
+                  f"{ms['tree'] / ms['grid']:>8.1f}× {ms['grid'] * 1000 / n:>17.3f}")
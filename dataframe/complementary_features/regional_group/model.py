@@ -31,7 +31,11 @@ import polars as pl
 import matplotlib.pyplot as plt
 import matplotlib.cm as cm
 from sklearn.cluster import DBSCAN
-from sklearn.neighbors import KNeighborsClassifier
+
+try:
+    from .grid_index import GeoGridIndex, export_grid_index
+except ImportError:
+    from grid_index import GeoGridIndex, export_grid_index
 
 # ── Constante física ────────────────────────────────────────────────────────────
 EARTH_RADIUS_KM: float = 6_371.0
@@ -128,9 +132,9 @@ class RegionalGroupClassifier(UnsupervisedGeoModel):
     3. DBSCAN agrupa pontos dentro de `radius_km` com ≥ `min_samples` vizinhos.
     4. Cada ponto isolado (label DBSCAN = -1) recebe um grupo único próprio,
        preservando a fidelidade regional climática de cada localização.
-    5. Para coordenadas novas (não vistas no treino), um KNN 1-vizinho é usado
-       como fallback, buscando o ponto treinado geograficamente mais próximo
-       (seja cluster ou grupo isolado).
+    5. Para coordenadas novas (não vistas no treino), o vizinho Haversine mais
+       próximo é buscado no ``GeoGridIndex`` (o mesmo índice da inferência),
+       seja ele cluster ou grupo isolado.
 
     Example
     -------
@@ -153,7 +157,7 @@ class RegionalGroupClassifier(UnsupervisedGeoModel):
         self._eps_rad: float = radius_km / EARTH_RADIUS_KM
 
         self._dbscan: Optional[DBSCAN] = None
-        self._knn: Optional[KNeighborsClassifier] = None
+        self._grid: Optional[GeoGridIndex] = None
         self._unique_coords: Optional[pl.DataFrame] = None
         self._coord_labels: Optional[np.ndarray] = None
 
@@ -213,14 +217,14 @@ class RegionalGroupClassifier(UnsupervisedGeoModel):
 
         self.n_total_groups_ = self.n_clusters_ + self.n_noise_
 
-        # KNN 1-vizinho treinado sobre TODOS os pontos (clusters + isolados)
-        # como fallback exclusivo para coordenadas não vistas no treino.
-        self._knn = KNeighborsClassifier(
-            n_neighbors=1,
-            algorithm="ball_tree",
-            metric="haversine",
+        # Vizinho mais próximo sobre TODOS os pontos (clusters + isolados).
+        # Uma coordenada vista no treino é o próprio vizinho (distância 0),
+        # então o mesmo índice serve também para o caminho "rótulo direto".
+        self._grid = GeoGridIndex.build(
+            self._unique_coords["latitude"].to_numpy(),
+            self._unique_coords["longitude"].to_numpy(),
+            self._coord_labels,
         )
-        self._knn.fit(coords_rad, self._coord_labels.tolist())
 
         self.is_fitted = True
         print(
@@ -240,7 +244,7 @@ class RegionalGroupClassifier(UnsupervisedGeoModel):
         Estratégia por tipo de ponto:
         • Coordenada de cluster (grupo < n_clusters_) → rótulo direto do treino.
         • Coordenada isolada (grupo ≥ n_clusters_)    → rótulo único atribuído no fit().
-        • Coordenada nova (não vista no treino)       → KNN 1-vizinho mais próximo.
+        • Coordenada nova (não vista no treino)       → vizinho mais próximo (grid index).
         • Lat/lon nulo                                → recebe null.
 
         Pontos isolados mantêm seu grupo individual — nenhuma localização
@@ -260,42 +264,21 @@ class RegionalGroupClassifier(UnsupervisedGeoModel):
 
         self._validate_geo_columns(df)
 
-        # Mapa completo: todos os pontos do treino → rótulo (sem label -1).
-        train_lats = self._unique_coords["latitude"].to_list()
-        train_lons = self._unique_coords["longitude"].to_list()
-        coord_map: dict[tuple, int] = {
-            (lat, lon): int(label)
-            for (lat, lon), label in zip(
-                zip(train_lats, train_lons), self._coord_labels
+        lat = df["latitude"].cast(pl.Float64)
+        lon = df["longitude"].cast(pl.Float64)
+        valid = (lat.is_not_null() & lon.is_not_null()).to_numpy()
+
+        # Pontos do treino são o próprio vizinho (distância 0) → rótulo direto;
+        # coordenadas novas recebem o rótulo do ponto mais próximo.
+        labels = np.zeros(len(df), dtype=np.int32)
+        if valid.any():
+            labels[valid] = self._grid.assign(
+                lat.to_numpy()[valid], lon.to_numpy()[valid]
             )
-        }
-
-        labels: list[Optional[int]] = []
-        knn_idxs: list[int] = []
-        knn_coords: list[tuple[float, float]] = []
-
-        for i, (lat, lon) in enumerate(
-            zip(df["latitude"].to_list(), df["longitude"].to_list())
-        ):
-            if lat is None or lon is None:
-                labels.append(None)
-            elif (lat, lon) in coord_map:
-                labels.append(coord_map[(lat, lon)])
-            else:
-                # Coordenada nova (não vista no treino) → resolvida via KNN
-                labels.append(None)  # placeholder
-                knn_idxs.append(i)
-                knn_coords.append((lat, lon))
-
-        # Resolve coordenadas novas via KNN Haversine
-        if knn_idxs:
-            coords_rad = np.radians(np.array(knn_coords))
-            knn_labels = self._knn.predict(coords_rad)
-            for idx, label in zip(knn_idxs, knn_labels):
-                labels[idx] = int(label)
 
         return df.with_columns(
             pl.Series("grupo_regional", labels, dtype=pl.Int32)
+            .scatter(np.flatnonzero(~valid), None)
         )
 
     # ── Utilitários ─────────────────────────────────────────────────────────
@@ -342,8 +325,9 @@ class RegionalGroupClassifier(UnsupervisedGeoModel):
         Exporta o mapeamento de grupos regionais para arquivo Parquet.
 
         Salva um artefato contendo todas as coordenadas únicas e seus rótulos
-        atribuídos. Este arquivo é usado pela inferência (via BallTree KNN-1)
+        atribuídos. Este arquivo é usado pela inferência (via grid index KNN-1)
         para atribuir grupos a coordenadas novas sem re-treinar o DBSCAN.
+        O ``geo_grid.npz`` correspondente é exportado ao lado.
 
         O artefato é denominado 'geo_reference.parquet' e será automaticamente
         carregado pela classe DLNormalizer durante a inferência.
@@ -381,14 +365,16 @@ class RegionalGroupClassifier(UnsupervisedGeoModel):
         output_file = Path(output_path)
         output_file.parent.mkdir(parents=True, exist_ok=True)
 
-        # Salva em formato Parquet
+        # Salva em formato Parquet + grid index pré-computado para a inferência
         df_mapping.write_parquet(output_path)
+        grid_path = export_grid_index(output_path)
         print(
             f"✓ Mapeamento de grupos regionais exportado:\n"
             f"  Arquivo: {output_path}\n"
             f"  Registros: {len(df_mapping)}\n"
             f"  Colunas: {df_mapping.columns}\n"
-            f"  Grupos: {self.n_total_groups_}"
+            f"  Grupos: {self.n_total_groups_}\n"
+            f"  Grid index: {grid_path}"
         )
 
         return df_mapping
@@ -27,7 +27,7 @@ REFATORAÇÃO (Message 15):
     Eliminado DLSchema — classe que reimplementava logic. de FeatureDeriver
     + ModelSchema. Novo fluxo de _preprocess():
     
-    1. _assign_grupo_regional_knn() → geo lookup via BallTree Haversine
+    1. _assign_grupo_regional_knn() → geo lookup via grade geográfica (Haversine)
     2. ModelSchema.add_date_features() → period_dia + features temporais
     3. ModelSchema.adjust_machine_type() + OHE + Clipping+MinMax
     4. Extrai embeddings Int32 (hora, mes, grupo_regional, periodo_dia)
@@ -113,7 +113,8 @@ logging.getLogger("absl").setLevel(logging.ERROR)
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 from model.pre_process.schema import ModelSchema
-from tools.normalizer import DLNormalizer, _assign_grupo_regional_knn, compute_normalization_stats
+from tools.normalizer import DLNormalizer, _assign_grupo_regional_knn, _non_finite_columns, _sanitize, compute_normalization_stats
+from tools.numpy_engine import export_numpy_weights
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -166,23 +167,16 @@ def _sanitize_features(df: pl.DataFrame) -> pl.DataFrame:
 
     Emite WARNING com a lista de colunas afetadas para rastreabilidade.
     """
-    float_dtypes = (pl.Float32, pl.Float64)
-    nan_cols = [
-        c for c in df.columns
-        if df[c].dtype in float_dtypes
-        and (df[c].is_nan().any() or df[c].is_infinite().any())
-    ]
+    nan_cols = _non_finite_columns(
+        df, [c for c, dtype in df.schema.items() if dtype in (pl.Float32, pl.Float64)]
+    )
     if nan_cols:
         _logger.warning(
             "NaN/inf em %d coluna(s) apos schema (divisao por zero na normalizacao) "
             "— substituindo por 0.0: %s",
             len(nan_cols), nan_cols,
         )
-        for c in nan_cols:
-            np_dtype = np.float32 if df[c].dtype == pl.Float32 else np.float64
-            arr = df[c].to_numpy().copy().astype(np_dtype)
-            arr = np.where(np.isfinite(arr), arr, np_dtype(0.0))
-            df  = df.with_columns(pl.Series(c, arr))
+        df = _sanitize(df, nan_cols)
     return df
 
 
@@ -758,7 +752,7 @@ class DLPipeline:
         }
 
         # pré-etapa 2 — derivação de features + schema de transformação
-        _logger.info("Derivando grupo_regional via BallTree KNN...")
+        _logger.info("Derivando grupo_regional via grade geográfica...")
         if "latitude" in df.columns and "longitude" in df.columns:
             df = _assign_grupo_regional_knn(df)
         
@@ -1070,6 +1064,7 @@ class DLPipeline:
         Estrutura gerada:
             {path}/
                 keras_model.keras        — modelo Keras formato nativo
+                numpy_model.npz          — mesmos pesos para o engine NumPy (sem TensorFlow)
                 meta.json                — feature_columns, n_groups, config, metrics
                 metadata_norm.json       — parâmetros de normalização para inferência
 
@@ -1087,6 +1082,7 @@ class DLPipeline:
 
         # modelo Keras — formato nativo .keras (recomendado a partir do Keras 3)
         tf.keras.models.save_model(self.model_, str(path / "keras_model.keras"))
+        export_numpy_weights(path, self.model_)
 
         # metadados — converte Path para str para serialização JSON
         cfg_dict = {
@@ -1449,6 +1445,7 @@ class SegmentedDLPipeline:
                 manifest.json           — mapeamento segmento → diretório + métricas
                 segment_{mt}/
                     keras_model.keras
+                    numpy_model.npz
                     meta.json
 
         Args:
@@ -61,6 +61,7 @@ from xgboost import XGBRegressor
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 from model.pre_process.schema import ModelSchema
 from tools.normalizer import MLNormalizer
+from tools.tree_engine import export_tree_model
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -1162,7 +1163,10 @@ class MLPipeline:
 
     def save(self, path: str | Path) -> None:
         """
-        Salva o pipeline completo (modelo + feature_columns_ + metrics_) com joblib.
+        Salva o pipeline completo (modelo + feature_columns_ + metrics_) com joblib,
+        mais o sidecar ``normalizer_meta.json`` (metadados do MLNormalizer) e,
+        para ``best_pipeline.joblib`` com LightGBM/XGBoost, as árvores em
+        ``tree_model.npz`` (``HVACMLInferenceAPI(engine="numpy")``).
 
         Args:
             path: Caminho do arquivo de saida (.joblib).
@@ -1175,6 +1179,13 @@ class MLPipeline:
         path = Path(path)
         path.parent.mkdir(parents=True, exist_ok=True)
         joblib.dump(self, path)
+        # Metadados do normalizer legíveis sem desserializar o modelo
+        MLNormalizer.from_pipeline(self).write_sidecar(path)
+        if path.name == "best_pipeline.joblib":
+            try:
+                export_tree_model(path.parent, self)
+            except ValueError as exc:
+                _logger.warning("tree_model.npz não exportado: %s", exc)
         _logger.info("Pipeline salvo em: %s", path)
 
     @classmethod
@@ -1437,6 +1448,8 @@ class SegmentedMLPipeline:
                 manifest.json                  — mapeamento segmento → arquivo + métricas
                 {segment}/
                     best_pipeline.joblib        — MLPipeline vencedor do segmento
+                    normalizer_meta.json        — metadados do MLNormalizer (sem unpickle)
+                    tree_model.npz              — árvores em arrays NumPy (tools/tree_engine.py)
 
         Args:
             path: Diretório base de saída, e.g. ``artifacts_dir / "ml_hvac"``.
@@ -0,0 +1,315 @@
+"""
+Calendar Table — Features de data pré-computadas por dia
+========================================================
+
+``ModelSchema.add_date_features`` derivava as features de calendário a cada
+chamada: duas chamadas a ``holidays.BR(years=anos)``, listas Python de
+vésperas e três ``is_in``. Isso roda em toda inferência de 1 linha
+(``FeatureDeriver.derive``) e em todo treino.
+
+Aqui a dimensão de calendário é gerada uma única vez para uma faixa larga de
+anos e gravada ordenada por data, um dia por linha, sem buracos:
+
+    holidays.BR ──► export_calendar() ──► calendar.parquet
+                                           data (Date, ordenada, contígua)
+                                           mes, trimestre                 Int8
+                                           is_feriado, is_vespera_feriado Int8
+                                           is_dia_util                    Int8
+                                           estacao                        String
+
+    CalendarTable.lookup(datas)
+        posição = dias desde 1970-01-01 (físico do pl.Date) − primeiro dia
+        gather de cada coluna na posição   (data nula → linha nula)
+
+Datas fora da faixa gravada estendem a tabela em memória (com aviso no log),
+calculando os feriados dos anos que faltam.
+
+``is_vespera_feriado`` olha o dia seguinte mesmo na virada do ano (31/12 é
+véspera do 01/01), o que o cálculo por ``anos`` do DataFrame só fazia quando
+o ano seguinte também estava no lote. ``estacao`` segue o mapeamento por mês
+de ``FeatureDeriver`` (Verão = 12, 1, 2 …).
+
+CLI:
+    python -m model.pre_process.calendar_table export
+    python -m model.pre_process.calendar_table parity
+    python -m model.pre_process.calendar_table bench
+"""
+
+from __future__ import annotations
+
+import datetime
+import logging
+import threading
+from pathlib import Path
+
+import polars as pl
+
+_logger = logging.getLogger(__name__)
+
+CALENDAR_NAME = "calendar.parquet"
+DEFAULT_CALENDAR_PATH = Path(__file__).resolve().parents[2] / "use_case" / "files" / CALENDAR_NAME
+
+CALENDAR_COLUMNS: tuple[str, ...] = (
+    "mes", "trimestre", "is_feriado", "is_vespera_feriado", "is_dia_util", "estacao",
+)
+
+_FIRST_YEAR = 2000
+_LAST_YEAR = 2060
+
+_SEASON_BY_MONTH: dict[int, str] = {
+    12: "verao", 1: "verao", 2: "verao",
+    3: "outono", 4: "outono", 5: "outono",
+    6: "inverno", 7: "inverno", 8: "inverno",
+    9: "primavera", 10: "primavera", 11: "primavera",
+}
+
+
+def build_calendar(first_year: int = _FIRST_YEAR, last_year: int = _LAST_YEAR) -> pl.DataFrame:
+    """
+    Gera a dimensão de calendário de 01/01/``first_year`` a 31/12/``last_year``.
+
+    Returns:
+        pl.DataFrame com ``data`` + ``CALENDAR_COLUMNS``, um dia por linha.
+
+    Raises:
+        ValueError: Se ``last_year < first_year``.
+    """
+    if last_year < first_year:
+        raise ValueError(f"Faixa de anos inválida: {first_year}–{last_year}")
+
+    import holidays
+
+    # O ano seguinte entra para que 31/12 do último ano saiba se é véspera
+    feriados = list(holidays.BR(years=range(first_year, last_year + 2)).keys())
+    feriados_br = pl.Series("feriado", feriados, dtype=pl.Date)
+    vesperas_br = pl.Series(
+        "vespera", [d - datetime.timedelta(days=1) for d in feriados], dtype=pl.Date
+    )
+    datas = pl.date_range(
+        datetime.date(first_year, 1, 1), datetime.date(last_year, 12, 31), eager=True
+    ).alias("data")
+
+    is_feriado = pl.col("data").is_in(feriados_br.implode())
+    return pl.DataFrame(datas).with_columns(
+        pl.col("data").dt.month().alias("mes"),
+        ((pl.col("data").dt.month() - 1) // 3 + 1).alias("trimestre"),
+        is_feriado.cast(pl.Int8).alias("is_feriado"),
+        pl.col("data").is_in(vesperas_br.implode()).cast(pl.Int8).alias("is_vespera_feriado"),
+        ((pl.col("data").dt.weekday() < 6) & ~is_feriado).cast(pl.Int8).alias("is_dia_util"),
+        pl.col("data").dt.month()
+          .replace_strict(_SEASON_BY_MONTH, return_dtype=pl.String)
+          .alias("estacao"),
+    )
+
+
+class CalendarTable:
+    """
+    Tabela de calendário indexada pela posição do dia.
+
+    Como as datas são contíguas, a linha de uma data é
+    ``data.to_physical() − primeiro_dia``: a consulta é um gather por coluna,
+    sem join nem hash.
+    """
+
+    def __init__(self, table: pl.DataFrame) -> None:
+        """
+        Args:
+            table: ``data`` + ``CALENDAR_COLUMNS``, como gerada por ``build_calendar``.
+
+        Raises:
+            ValueError: Colunas ausentes ou datas fora de ordem / com buracos.
+        """
+        missing = [c for c in ("data", *CALENDAR_COLUMNS) if c not in table.columns]
+        if missing:
+            raise ValueError(f"Tabela de calendário sem as colunas: {missing}")
+        days = table["data"].cast(pl.Date).to_physical()
+        if table.height == 0 or days.null_count() or not (days.diff().drop_nulls() == 1).all():
+            raise ValueError("Tabela de calendário precisa ser ordenada e contígua (um dia por linha)")
+
+        self._lock = threading.Lock()
+        # Estado substituído de uma vez: leitores concorrentes nunca veem metade de uma extensão
+        self._state: tuple[int, dict[str, pl.Series]] = (
+            int(days[0]), {c: table[c] for c in CALENDAR_COLUMNS}
+        )
+
+    @classmethod
+    def load(cls, path: str | Path = DEFAULT_CALENDAR_PATH) -> "CalendarTable":
+        """Carrega ``calendar.parquet`` (ver ``export_calendar``)."""
+        return cls(pl.read_parquet(path))
+
+    @property
+    def first_day(self) -> datetime.date:
+        return datetime.date(1970, 1, 1) + datetime.timedelta(days=self._state[0])
+
+    @property
+    def last_day(self) -> datetime.date:
+        start, columns = self._state
+        return datetime.date(1970, 1, 1) + datetime.timedelta(days=start + len(columns["mes"]) - 1)
+
+    def lookup(self, dates: pl.Series, columns: tuple[str, ...] = CALENDAR_COLUMNS) -> list[pl.Series]:
+        """
+        Features de calendário de cada data.
+
+        Args:
+            dates  : Série ``pl.Date`` (ou convertível); nulos viram linhas nulas.
+            columns: Subconjunto de ``CALENDAR_COLUMNS``, na ordem desejada.
+
+        Returns:
+            Uma ``pl.Series`` por coluna pedida, alinhada com ``dates``.
+        """
+        days = dates.cast(pl.Date).to_physical()
+        start, table = self._state
+        lo, hi = days.min(), days.max()
+        if lo is not None and (lo < start or hi >= start + len(table["mes"])):
+            start, table = self._extend(int(lo), int(hi))
+
+        index = (days - start).cast(pl.UInt32)
+        return [table[c].gather(index) for c in columns]
+
+    def _extend(self, lo: int, hi: int) -> tuple[int, dict[str, pl.Series]]:
+        """Reconstrói a tabela cobrindo também os dias ``lo``..``hi`` (ordinais desde 1970)."""
+        epoch = datetime.date(1970, 1, 1)
+        with self._lock:
+            first = min(self.first_day.year, (epoch + datetime.timedelta(days=lo)).year)
+            last = max(self.last_day.year, (epoch + datetime.timedelta(days=hi)).year)
+            if first < self.first_day.year or last > self.last_day.year:
+                _logger.warning(
+                    f"Datas fora do calendário pré-computado ({self.first_day}–{self.last_day}); "
+                    f"estendendo em memória para {first}–{last}"
+                )
+                table = build_calendar(first, last)
+                self._state = (
+                    int(table["data"].to_physical()[0]), {c: table[c] for c in CALENDAR_COLUMNS}
+                )
+            return self._state
+
+
+def export_calendar(
+    path: str | Path = DEFAULT_CALENDAR_PATH,
+    first_year: int = _FIRST_YEAR,
+    last_year: int = _LAST_YEAR,
+) -> Path:
+    """
+    Grava ``calendar.parquet``.
+
+    Returns:
+        Caminho do arquivo gravado.
+    """
+    path = Path(path)
+    table = build_calendar(first_year, last_year)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table.write_parquet(path)
+    _logger.info(
+        f"Calendário exportado para {path} ({table.height} dias, {first_year}–{last_year}, "
+        f"{path.stat().st_size / 1024:.0f} KB)"
+    )
+    return path
+
+
+_calendar: CalendarTable | None = None
+_calendar_lock = threading.Lock()
+
+
+def get_calendar() -> CalendarTable:
+    """
+    ``CalendarTable`` do processo, carregada no primeiro uso.
+
+    Sem ``calendar.parquet`` (ou com arquivo inválido) a tabela é gerada em
+    memória a partir de ``holidays`` — mesmo resultado, mais lento na carga.
+    """
+    global _calendar
+    if _calendar is None:
+        with _calendar_lock:
+            if _calendar is None:
+                try:
+                    _calendar = CalendarTable.load(DEFAULT_CALENDAR_PATH)
+                except (FileNotFoundError, ValueError) as exc:
+                    _logger.warning(f"{CALENDAR_NAME} indisponível ({exc}); gerando calendário em memória")
+                    _calendar = CalendarTable(build_calendar())
+    return _calendar
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  CLI — exportação, paridade e benchmark contra o cálculo por chamada
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _holidays_date_features(df: pl.DataFrame) -> pl.DataFrame:
+    """Cálculo antigo de ``add_date_features`` (``holidays.BR`` por chamada), como referência."""
+    import holidays
+
+    df = df.with_columns(pl.col("data").cast(pl.Date))
+    anos = df["data"].dt.year().unique().to_list()
+    feriados_br = pl.Series("feriado", list(holidays.BR(years=anos).keys()), dtype=pl.Date)
+    vesperas_br = pl.Series(
+        "vespera",
+        [d + datetime.timedelta(days=-1) for d in holidays.BR(years=anos).keys()],
+        dtype=pl.Date,
+    )
+    return df.with_columns([
+        pl.col("data").dt.month().alias("mes"),
+        ((pl.col("data").dt.month() - 1) // 3 + 1).alias("trimestre"),
+        pl.col("data").is_in(feriados_br).cast(pl.Int8).alias("is_feriado"),
+        pl.col("data").is_in(vesperas_br).cast(pl.Int8).alias("is_vespera_feriado"),
+        ((pl.col("data").dt.weekday() < 6) & ~pl.col("data").is_in(feriados_br))
+          .cast(pl.Int8).alias("is_dia_util"),
+    ])
+
+
+def _random_dates(n: int, first_year: int, last_year: int, seed: int = 0) -> pl.Series:
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    lo = (datetime.date(first_year, 1, 1) - datetime.date(1970, 1, 1)).days
+    hi = (datetime.date(last_year, 12, 31) - datetime.date(1970, 1, 1)).days
+    return pl.Series("data", rng.integers(lo, hi + 1, n, dtype=np.int32)).cast(pl.Date)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    import numpy as np
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Dimensão de calendário (features de data)")
+    parser.add_argument("command", choices=("export", "parity", "bench"))
+    parser.add_argument("--path", type=Path, default=DEFAULT_CALENDAR_PATH)
+    parser.add_argument("--first-year", type=int, default=_FIRST_YEAR)
+    parser.add_argument("--last-year", type=int, default=_LAST_YEAR)
+    parser.add_argument("--sizes", default="1,64,4096,262144,8000000")
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_calendar(args.path, args.first_year, args.last_year)
+    elif args.command == "parity":
+        calendar = CalendarTable.load(args.path)
+        # Ano a ano: é o caso em que o cálculo antigo também enxerga o ano seguinte
+        differ = 0
+        for year in range(calendar.first_day.year, calendar.last_day.year + 1):
+            dates = pl.date_range(datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1), eager=True)
+            expected = _holidays_date_features(pl.DataFrame({"data": dates})).head(-1)
+            got = pl.DataFrame(calendar.lookup(dates.head(-1), CALENDAR_COLUMNS[:-1]))
+            differ += int((expected.select(CALENDAR_COLUMNS[:-1]) != got).sum_horizontal().gt(0).sum())
+        nulls = calendar.lookup(pl.Series("data", [None], dtype=pl.Date))
+        print(f"  {calendar.first_day}–{calendar.last_day}: {differ} dias diferentes do holidays.BR; "
+              f"data nula → {'nulo' if all(s.null_count() == 1 for s in nulls) else 'NÃO nulo'}")
+        raise SystemExit(1 if differ else 0)
+    else:
+        t0 = time.perf_counter()
+        calendar = CalendarTable.load(args.path)
+        print(f"  carga do calendar.parquet: {(time.perf_counter() - t0) * 1000:.2f} ms")
+        print(f"\n  {'':>14} {'holidays.BR':>13} {'tabela':>11} {'speedup':>9}")
+        for n in (int(s) for s in args.sizes.split(",")):
+            df = pl.DataFrame(_random_dates(n, 2019, 2025, seed=n))
+            ms = {}
+            for name, fn in (("old", lambda: _holidays_date_features(df)),
+                             ("new", lambda: df.with_columns(calendar.lookup(df["data"], CALENDAR_COLUMNS[:-1])))):
+                fn()
+                times = []
+                for _ in range(args.repeats if n < 100_000 else 3):
+                    t0 = time.perf_counter()
+                    fn()
+                    times.append(time.perf_counter() - t0)
+                ms[name] = float(np.median(times)) * 1000
+            print(f"  {f'n={n:,}':>14} {ms['old']:>11.3f}ms {ms['new']:>9.3f}ms {ms['old'] / ms['new']:>8.1f}×")
@@ -36,7 +36,77 @@ existem no arquivo consolidado:
 from __future__ import annotations
 
 import polars as pl
-import holidays
+
+try:
+    from .calendar_table import get_calendar
+except ImportError:
+    from calendar_table import get_calendar
+
+# Dicionário de mapeamento de machine_type (De -> Para), comparado em minúsculas
+MACHINE_TYPE_MAP: dict[str, str] = {
+    'split-wall': 'SPLIT HI-WALL',
+    'split wall': 'SPLIT HI-WALL',
+    'splitao-inverter': 'SPLITÃO INVERTER',
+    'splitao': 'SPLITÃO',
+    'rooftop': 'SPLITÃO ROOFTOP',
+    'ar condicionado de janela': 'AR CONDICIONADO DE JANELA (ACJ)',
+    'split-duto': 'SPLIT DUTO',
+    'self': 'SPLITÃO SELF CONTAINED',
+    'split-piso-teto': 'SPLIT PISO-TETO',
+    'split piso teto': 'SPLIT PISO-TETO',
+    'split-cassete': 'SPLIT CASSETE',
+    'split cassete': 'SPLIT CASSETE',
+    'Acj': 'AR CONDICIONADO DE JANELA (ACJ)',
+    'ACJ (ar condicionado de janela)': 'AR CONDICIONADO DE JANELA (ACJ)',
+    'ACJ (Ar condicionado Janela)': 'AR CONDICIONADO DE JANELA (ACJ)',
+    'Câmara Fria': 'CÂMARA FRIA',
+    'Cassete': 'SPLIT CASSETE',
+    'Chiller-Água': 'CHILLER ÁGUA',
+    'Chiller-Ar': 'CHILLER AR',
+    'Cold Head': 'COLD HEAD',
+    'Cortina de ar': 'CORTINA DE AR',
+    'Fan Coil': 'FANCOIL',
+    'Fancoil': 'FANCOIL',
+    'Fancolete': 'FANCOIL',
+    'Hi-Wall': 'SPLIT HI-WALL',
+    'Multisplit': 'MULTISPLIT',
+    'piso-teto': 'SPLIT PISO-TETO',
+    'Piso-Teto Embutido': 'SPLIT PISO-TETO',
+    'Rooftop': 'SPLITÃO ROOFTOP',
+    'Self': 'SPLITÃO SELF CONTAINED',
+    'Self Condensação A Água': 'SPLITÃO SELF CONTAINED ÁGUA',
+    'Self Containde': 'SPLITÃO SELF CONTAINED',
+    'Self Contaneid': 'SPLITÃO SELF CONTAINED',
+    'Self-Contained': 'SPLITÃO SELF CONTAINED',
+    'Spitão-Inverter': 'SPLITÃO INVERTER',
+    'Spli Hi-Wall': 'SPLIT HI-WALL',
+    'Spli K7': 'SPLIT CASSETE',
+    'Spli Tipo K7': 'SPLIT CASSETE',
+    'Split': 'SPLIT HI-WALL',
+    'Split Hi-Wall': 'SPLIT HI-WALL',
+    'Split Hi0wall': 'SPLIT HI-WALL',
+    'Split Hiwall': 'SPLIT HI-WALL',
+    'Split K7': 'SPLIT CASSETE',
+    'Split Kassete': 'SPLIT CASSETE',
+    'Split Tipo K7': 'SPLIT CASSETE',
+    'Split-Cassete': 'SPLIT CASSETE',
+    'Split-Duto': 'SPLIT DUTO',
+    'Split-Piso Teto': 'SPLIT PISO-TETO',
+    'Split-Wall': 'SPLIT HI-WALL',
+    'Splitão-Inverter': 'SPLITÃO INVERTER',
+    'SplitDuto': 'SPLIT DUTO',
+    'SplitWall': 'SPLIT HI-WALL',
+    'Splt Hi-Wall': 'SPLIT HI-WALL',
+    'tipo-split duto': 'SPLIT DUTO',
+    'tipo-split-cassete': 'SPLIT CASSETE',
+    'tipo-split-hi-wall': 'SPLIT HI-WALL',
+    'tipo-split-piso-teto': 'SPLIT PISO-TETO',
+    'tipo-split-teto': 'SPLIT PISO-TETO',
+    'TROCADOR': 'TROCADOR DE CALOR',
+    'Trocador de Calor': 'TROCADOR DE CALOR',
+    'VAV': 'VAV'
+}
+
 
 class ModelSchema:
     """
@@ -112,29 +182,30 @@ class ModelSchema:
 
     # ── Features de data ─────────────────────────────────────────────────────
 
-    def add_date_features(self) -> "ModelSchema":
+    def add_date_features(self, with_estacao: bool = False) -> "ModelSchema":
         """
         Adiciona features temporais derivadas da coluna 'data' e a remove.
 
-        Todas as expressões são avaliadas em paralelo em C/Rust pelo Polars
-        dentro de um único `with_columns`, minimizando overhead de cópia.
-        Ao final, a coluna 'data' é descartada — todas as informações
-        relevantes já foram decompostas em features numéricas/booleanas.
+        As features de calendário vêm da dimensão pré-computada
+        (``calendar_table.get_calendar``): um gather por coluna na posição do
+        dia, sem recalcular feriados a cada chamada. Ao final, a coluna 'data'
+        é descartada — todas as informações relevantes já foram decompostas
+        em features numéricas/booleanas.
 
         Features adicionadas
         --------------------
-        ano               : int  — Ano (ex: 2025).
         mes               : int  — Número do mês (1 a 12).
-        dia               : int  — Dia do mês (1 a 31).
         trimestre         : int  — Trimestre do ano (1 a 4).
-        dia_semana_num    : int  — Dia ISO da semana (1=Segunda … 7=Domingo).
-        dia_semana        : str  — Nome do dia em português.
         is_feriado        : bool — True se o dia é feriado nacional brasileiro.
         is_vespera_feriado: bool — True se o dia seguinte é feriado nacional.
         is_dia_util       : bool — True se é dia de semana e não é feriado.
+        periodo_dia       : str  — Madrugada/Manhã/Tarde/Noite, a partir de 'hora'.
+        estacao           : str  — Só com ``with_estacao=True`` (mapeamento por
+                                   mês da inferência); no treino a coluna
+                                   'estacao' já vem do dataset.
 
-        A lista de feriados é calculada uma única vez para os anos presentes
-        no DataFrame (otimização: evita chamadas repetidas à lib `holidays`).
+        Args:
+            with_estacao: Também (re)escreve 'estacao' a partir da data.
 
         Returns:
             Self (para method chaining).
@@ -144,49 +215,15 @@ class ModelSchema:
             pl.col("data").cast(pl.Date)
         )
 
-        # Extrai anos únicos e gera feriados brasileiros apenas para eles
-        anos = df["data"].dt.year().unique().to_list()
-        feriados_br = pl.Series(
-            "feriado",
-            list(holidays.BR(years=anos).keys()),
-            dtype=pl.Date,
-        )
-        vesperas_br = pl.Series(
-            "vespera",
-            [d + __import__("datetime").timedelta(days=-1)
-             for d in holidays.BR(years=anos).keys()],
-            dtype=pl.Date,
+        columns = ("mes", "trimestre", "is_feriado", "is_vespera_feriado", "is_dia_util")
+        calendar = get_calendar().lookup(
+            df["data"], (*columns, "estacao") if with_estacao else columns
         )
+        estacao = [calendar.pop().fill_null("desconhecida")] if with_estacao else []
 
         self.df = (
             df.with_columns([
-                # Componentes da data
-                pl.col("data").dt.year().alias("ano"),
-                pl.col("data").dt.month().alias("mes"),
-                pl.col("data").dt.day().alias("dia"),
-
-                # Trimestre
-                ((pl.col("data").dt.month() - 1) // 3 + 1).alias("trimestre"),
-
-                # Dia da semana numérico (ISO 8601: 1=Seg … 7=Dom)
-                #pl.col("data").dt.weekday().alias("dia_semana_num"),
-
-                # Nome do dia em português
-                #pl.col("data").dt.weekday()
-                #  .replace_strict(_WEEKDAY_MAP, return_dtype=pl.Utf8)
-                #  .alias("dia_semana"),
-
-                # Feriado nacional
-                pl.col("data").is_in(feriados_br).cast(pl.Int8).alias("is_feriado"),
-
-                # Véspera de feriado
-                pl.col("data").is_in(vesperas_br).cast(pl.Int8).alias("is_vespera_feriado"),
-
-                # Dia útil: seg–sex e não feriado
-                (
-                    (pl.col("data").dt.weekday() < 6) &
-                    ~pl.col("data").is_in(feriados_br)
-                ).cast(pl.Int8).alias("is_dia_util"),
+                *calendar,
 
                 # Período do dia — agrupa horas pelo comportamento do AC
                 pl.when(pl.col("hora").is_between(0, 6))
@@ -197,8 +234,11 @@ class ModelSchema:
                   .then(pl.lit("Tarde"))
                   .otherwise(pl.lit("Noite"))
                   .alias("periodo_dia"),
+
+                *estacao,
             ])
-            .drop(["data", "dia", "ano"])  # data completamente decomposta — coluna removida
+            # data completamente decomposta — coluna removida
+            .drop(["data", "dia", "ano"], strict=False)
         )
 
         return self
@@ -213,81 +253,30 @@ class ModelSchema:
         Returns:
             Self (para method chaining).
         """
-        # Dicionário de mapeamento (De -> Para)
-        dicionario_maquinas = {
-            'split-wall': 'SPLIT HI-WALL',
-            'split wall': 'SPLIT HI-WALL',
-            'splitao-inverter': 'SPLITÃO INVERTER',
-            'splitao': 'SPLITÃO',
-            'rooftop': 'SPLITÃO ROOFTOP',
-            'ar condicionado de janela': 'AR CONDICIONADO DE JANELA (ACJ)',
-            'split-duto': 'SPLIT DUTO',
-            'self': 'SPLITÃO SELF CONTAINED',
-            'split-piso-teto': 'SPLIT PISO-TETO',
-            'split piso teto': 'SPLIT PISO-TETO',
-            'split-cassete': 'SPLIT CASSETE',
-            'split cassete': 'SPLIT CASSETE',
-            'Acj': 'AR CONDICIONADO DE JANELA (ACJ)',
-            'ACJ (ar condicionado de janela)': 'AR CONDICIONADO DE JANELA (ACJ)',
-            'ACJ (Ar condicionado Janela)': 'AR CONDICIONADO DE JANELA (ACJ)',
-            'Câmara Fria': 'CÂMARA FRIA',
-            'Cassete': 'SPLIT CASSETE',
-            'Chiller-Água': 'CHILLER ÁGUA',
-            'Chiller-Ar': 'CHILLER AR',
-            'Cold Head': 'COLD HEAD',
-            'Cortina de ar': 'CORTINA DE AR',
-            'Fan Coil': 'FANCOIL',
-            'Fancoil': 'FANCOIL',
-            'Fancolete': 'FANCOIL',
-            'Hi-Wall': 'SPLIT HI-WALL',
-            'Multisplit': 'MULTISPLIT',
-            'piso-teto': 'SPLIT PISO-TETO',
-            'Piso-Teto Embutido': 'SPLIT PISO-TETO',
-            'Rooftop': 'SPLITÃO ROOFTOP',
-            'Self': 'SPLITÃO SELF CONTAINED',
-            'Self Condensação A Água': 'SPLITÃO SELF CONTAINED ÁGUA',
-            'Self Containde': 'SPLITÃO SELF CONTAINED',
-            'Self Contaneid': 'SPLITÃO SELF CONTAINED',
-            'Self-Contained': 'SPLITÃO SELF CONTAINED',
-            'Spitão-Inverter': 'SPLITÃO INVERTER',
-            'Spli Hi-Wall': 'SPLIT HI-WALL',
-            'Spli K7': 'SPLIT CASSETE',
-            'Spli Tipo K7': 'SPLIT CASSETE',
-            'Split': 'SPLIT HI-WALL',
-            'Split Hi-Wall': 'SPLIT HI-WALL',
-            'Split Hi0wall': 'SPLIT HI-WALL',
-            'Split Hiwall': 'SPLIT HI-WALL',
-            'Split K7': 'SPLIT CASSETE',
-            'Split Kassete': 'SPLIT CASSETE',
-            'Split Tipo K7': 'SPLIT CASSETE',
-            'Split-Cassete': 'SPLIT CASSETE',
-            'Split-Duto': 'SPLIT DUTO',
-            'Split-Piso Teto': 'SPLIT PISO-TETO',
-            'Split-Wall': 'SPLIT HI-WALL',
-            'Splitão-Inverter': 'SPLITÃO INVERTER',
-            'SplitDuto': 'SPLIT DUTO',
-            'SplitWall': 'SPLIT HI-WALL',
-            'Splt Hi-Wall': 'SPLIT HI-WALL',
-            'tipo-split duto': 'SPLIT DUTO',
-            'tipo-split-cassete': 'SPLIT CASSETE',
-            'tipo-split-hi-wall': 'SPLIT HI-WALL',
-            'tipo-split-piso-teto': 'SPLIT PISO-TETO',
-            'tipo-split-teto': 'SPLIT PISO-TETO',
-            'TROCADOR': 'TROCADOR DE CALOR',
-            'Trocador de Calor': 'TROCADOR DE CALOR',
-            'VAV': 'VAV'
-        }
-
         self.df = self.df.with_columns(
-            pl.col("machine_type")
-            .str.to_lowercase()
-            .replace(dicionario_maquinas)
-            .fill_null("Desconhecido")
-            .alias("tipo_maquina")
+            self.machine_type_expr().alias("tipo_maquina")
         ).drop("machine_type")
 
         return self
 
+    @staticmethod
+    def machine_type_expr(column: str = "machine_type") -> pl.Expr:
+        """
+        Expressão de ``adjust_machine_type`` (sem alias), para planos compilados.
+
+        Args:
+            column (str): Coluna com o tipo de máquina bruto.
+
+        Returns:
+            pl.Expr com o tipo padronizado ('Desconhecido' quando ausente).
+        """
+        return (
+            pl.col(column)
+            .str.to_lowercase()
+            .replace(MACHINE_TYPE_MAP)
+            .fill_null("Desconhecido")
+        )
+
     def make_categorical_columns(self, columns: list[str]) -> "ModelSchema":
         """
         Declara colunas ordinais/nominais como pl.Categorical.
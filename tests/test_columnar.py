@@ -0,0 +1,46 @@
+"""Validação colunar de ``tools.columnar.validate_frame``."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tools.columnar import ColumnarValidationError, validate_frame
+
+_RECORD = {
+    "hora": 14,
+    "data": "2025-07-03",
+    "machine_type": "splitao",
+    "latitude": -23.88,
+    "longitude": -46.42,
+    "temperatura_c": 25.7,
+    "temperatura_percebida_c": 24.9,
+    "umidade_relativa_pct": 57.0,
+    "precipitacao_mm": 0.0,
+    "velocidade_vento_kmh": 21.4,
+    "pressao_superficial_hpa": 969.8,
+    "irradiancia_direta_wm2": 520.0,
+    "irradiancia_difusa_wm2": 180.0,
+}
+
+
+def _frame(hora: list) -> pl.DataFrame:
+    return pl.DataFrame({k: [v] * len(hora) for k, v in _RECORD.items()}).with_columns(
+        hora=pl.Series(hora)
+    )
+
+
+def test_hora_nao_inteira_e_rejeitada():
+    with pytest.raises(ColumnarValidationError, match=r"hora: 1 valor\(es\) não inteiro\(s\) \(primeira linha=1\)"):
+        validate_frame(_frame([14.0, 14.7, 3.0]), {})
+
+
+def test_hora_float_inteira_e_aceita():
+    df = validate_frame(_frame([14.0, 0.0, 23.0]), {})
+    assert df["hora"].dtype == pl.Int64
+    assert df["hora"].to_list() == [14, 0, 23]
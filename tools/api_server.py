@@ -37,6 +37,9 @@ FastAPI server que expõe endpoints para predições com normalização automát
     - ReDoc:      https://SEU-DOMINIO.up.railway.app/redoc
 """
 
+import asyncio
+import contextvars
+import json
 import logging
 import os
 import sys
@@ -44,20 +47,124 @@ import threading
 import time
 import uuid
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
 import polars as pl
 from fastapi import FastAPI, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 
 # Import condicional: relativo se rodado como módulo, absoluto se rodado direto
 try:
+    from .batching import MicroBatchCoalescer
+    from .columnar import (
+        API_TO_FRAME_COLUMNS,
+        ARROW_STREAM_MEDIA_TYPE,
+        field_bounds,
+        frame_from_bytes,
+        frame_from_columns,
+        predictions_to_arrow,
+        validate_frame,
+        wants_arrow,
+    )
+    from .executor import ExecutorSaturatedError, InferenceExecutor
+    from .jobs import (
+        JobInputError,
+        JobRunner,
+        JobStore,
+        PredictorSpec,
+        SUCCEEDED as JOB_SUCCEEDED,
+        parse_cpus,
+        resolve_input_path,
+    )
+    from .streaming import (
+        NDJSON_MEDIA_TYPE,
+        ArrowChunkEncoder,
+        DuplexStreamingResponse,
+        arrow_frames,
+        ndjson_error,
+        ndjson_frames,
+        ndjson_lines,
+    )
     from .inference_runner import HVACDLInferenceAPI
+    from .model_registry import (
+        SegmentedModelRegistry,
+        predictor_artifact_files,
+    )
+    from .lag_store import LagFeatureStore
+    from .prediction_cache import PredictionCache, artifact_version
+    from .scenarios import Scenario, sweep_routed
+    from .warmup import WARMUP_MACHINE_TYPES, warm_up
+    from .normalizer import DLNormalizer, _get_geo_lookup
+    from .metrics import (
+        BATCH_SIZE,
+        CONTENT_TYPE as METRICS_CONTENT_TYPE,
+        ERRORS,
+        MODEL_LOAD_SECONDS,
+        MODEL_READY,
+        MODEL_RELOADS,
+        REGISTRY,
+        REQUEST_SECONDS,
+        ROWS_PREDICTED,
+        stage_timer,
+    )
 except ImportError:
+    from tools.batching import MicroBatchCoalescer
+    from tools.columnar import (
+        API_TO_FRAME_COLUMNS,
+        ARROW_STREAM_MEDIA_TYPE,
+        field_bounds,
+        frame_from_bytes,
+        frame_from_columns,
+        predictions_to_arrow,
+        validate_frame,
+        wants_arrow,
+    )
+    from tools.executor import ExecutorSaturatedError, InferenceExecutor
+    from tools.jobs import (
+        JobInputError,
+        JobRunner,
+        JobStore,
+        PredictorSpec,
+        SUCCEEDED as JOB_SUCCEEDED,
+        parse_cpus,
+        resolve_input_path,
+    )
+    from tools.streaming import (
+        NDJSON_MEDIA_TYPE,
+        ArrowChunkEncoder,
+        DuplexStreamingResponse,
+        arrow_frames,
+        ndjson_error,
+        ndjson_frames,
+        ndjson_lines,
+    )
     from tools.inference_runner import HVACDLInferenceAPI
+    from tools.model_registry import (
+        SegmentedModelRegistry,
+        predictor_artifact_files,
+    )
+    from tools.lag_store import LagFeatureStore
+    from tools.prediction_cache import PredictionCache, artifact_version
+    from tools.scenarios import Scenario, sweep_routed
+    from tools.warmup import WARMUP_MACHINE_TYPES, warm_up
+    from tools.normalizer import DLNormalizer, _get_geo_lookup
+    from tools.metrics import (
+        BATCH_SIZE,
+        CONTENT_TYPE as METRICS_CONTENT_TYPE,
+        ERRORS,
+        MODEL_LOAD_SECONDS,
+        MODEL_READY,
+        MODEL_RELOADS,
+        REGISTRY,
+        REQUEST_SECONDS,
+        ROWS_PREDICTED,
+        stage_timer,
+    )
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  CONFIGURAÇÃO DE LOGGING
@@ -84,10 +191,263 @@ _PORT = int(os.environ.get("PORT", 8000))
 # Caminhos de artefatos
 _ROOT = Path(__file__).resolve().parent.parent
 _ARTIFACT_PATH = _ROOT / "model" / "artifacts" / "dl_hvac" / "global"
+_DL_SEGMENTS_PATH = _ROOT / "model" / "artifacts" / "dl_hvac"
+_ML_SEGMENTS_PATH = _ROOT / "model" / "artifacts" / "ml_hvac"
+
+# Micro-batching de /predict — janela (ms) e tamanho máximo do lote coalescido.
+# PREDICT_COALESCE=0 desativa (cada requisição roda sozinha, como antes).
+_COALESCE_ENABLED = os.environ.get("PREDICT_COALESCE", "1") != "0"
+_BATCH_WINDOW_MS = float(os.environ.get("PREDICT_BATCH_WINDOW_MS", 3.0))
+_MAX_BATCH_SIZE = int(os.environ.get("PREDICT_MAX_BATCH", 64))
+
+# Executor de inferência — tira polars/TensorFlow do event loop.
+# Acima de WORKERS + MAX_QUEUE tarefas em voo, responde 503 + Retry-After.
+_INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", min(4, os.cpu_count() or 1)))
+_INFERENCE_MAX_QUEUE = int(os.environ.get("INFERENCE_MAX_QUEUE", 32))
+_INFERENCE_RETRY_AFTER_S = float(os.environ.get("INFERENCE_RETRY_AFTER_S", 1.0))
+
+# /predict_stream — linhas por chunk lido do corpo e inferido de uma vez.
+# Memória ~ constante em CHUNK_ROWS; time-to-first-byte ~ 1 chunk.
+_STREAM_CHUNK_ROWS = int(os.environ.get("PREDICT_STREAM_CHUNK_ROWS", 5000))
+
+# Modelos por tipo de máquina (manifestos dl_hvac/ml_hvac), carregados sob
+# demanda e descartados em LRU acima do orçamento. SEGMENT_ROUTING=0 serve
+# apenas o modelo global. SOURCE: dl | ml | best (menor RMSE do manifesto).
+_SEGMENT_ROUTING = os.environ.get("SEGMENT_ROUTING", "1") != "0"
+_SEGMENT_SOURCE = os.environ.get("SEGMENT_MODEL_SOURCE", "dl")
+_SEGMENT_MEMORY_BUDGET_MB = float(os.environ.get("SEGMENT_MEMORY_BUDGET_MB", 256))
+
+# Forward pass dos modelos DL (global, segmentos e jobs): keras | numpy.
+# numpy usa numpy_model.npz (python -m tools.numpy_engine export) e dispensa o TensorFlow.
+_INFERENCE_ENGINE = os.environ.get("INFERENCE_ENGINE", "keras")
+# Engine keras: lotes de até 512 linhas vão por uma tf.function com buckets
+# (1, 8, 64, 512); INFERENCE_JIT_COMPILE=1 compila esse atalho com XLA.
+_INFERENCE_JIT_COMPILE = os.environ.get("INFERENCE_JIT_COMPILE", "0") == "1"
+# Árvores dos segmentos ML: native (LightGBM/XGBoost) | numpy (tree_model.npz,
+# python -m tools.tree_engine export) — mais rápido em lotes pequenos e na carga.
+_ML_INFERENCE_ENGINE = os.environ.get("ML_INFERENCE_ENGINE", "native")
+
+# /predict_scenarios: limite de linhas do forward pass empilhado (registros × cenários)
+_SCENARIO_MAX_ROWS = int(os.environ.get("SCENARIO_MAX_ROWS", 1_000_000))
+
+# Cache de predições por linha (hash das 13 features + versão dos artefatos).
+# PREDICT_CACHE_SIZE=0 desativa; TTL=0 mantém as entradas até a evicção LRU.
+_CACHE_SIZE = int(os.environ.get("PREDICT_CACHE_SIZE", 100_000))
+_CACHE_TTL_S = float(os.environ.get("PREDICT_CACHE_TTL_S", 3600))
+
+# Jobs de scoring em massa (/jobs) — processos próprios, fora do executor online.
+# INPUT_ROOTS: diretórios (separados por os.pathsep) de onde {"path": ...} pode ler.
+_JOBS_DIR = Path(os.environ.get("JOBS_DIR", _ROOT / "jobs"))
+_JOBS_INPUT_ROOTS = [
+    Path(p) for p in os.environ.get("JOBS_INPUT_ROOTS", str(_JOBS_DIR)).split(os.pathsep) if p
+]
+_JOBS_WORKERS = int(os.environ.get("JOBS_WORKERS", 1))
+_JOBS_THREADS = int(os.environ.get("JOBS_THREADS", 1))
+_JOBS_CPUS = parse_cpus(os.environ.get("JOBS_CPUS"))
+_JOBS_NICE = int(os.environ.get("JOBS_NICE", 10))
+_JOBS_CHUNK_ROWS = int(os.environ.get("JOBS_CHUNK_ROWS", 50_000))
+# MAX_UPLOAD_MB: teto do Parquet no corpo de POST /jobs (0 = sem limite).
+# RETENTION_S: jobs finalizados há mais que isso são apagados com upload e
+# predições (0 = nunca). ADMIN_TOKEN (abaixo) também é exigido em /jobs.
+_JOBS_MAX_UPLOAD_MB = float(os.environ.get("JOBS_MAX_UPLOAD_MB", 2048))
+_JOBS_RETENTION_S = float(os.environ.get("JOBS_RETENTION_S", 7 * 24 * 3600))
+
+# Hot reload — MODEL_RELOAD_WATCH_S > 0 verifica os artefatos em disco a cada
+# N segundos e recarrega quando mudam; POST /admin/reload força a verificação.
+# ADMIN_TOKEN (se definido) é exigido em /admin/* e /jobs no header X-Admin-Token.
+_RELOAD_WATCH_S = float(os.environ.get("MODEL_RELOAD_WATCH_S", 0))
+_ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# Warm-up — lotes sintéticos rodados em todo modelo carregado (startup e reload)
+# antes de ele servir; /ready só responde 200 depois. Padrão: /predict isolado,
+# lote coalescido (PREDICT_MAX_BATCH), predict_batch e chunk do /predict_stream.
+_WARMUP_BATCH_SIZES = tuple(
+    int(n) for n in os.environ.get("WARMUP_BATCH_SIZES", "1,64,1024,5000").split(",") if n.strip()
+)
+
+# Lag store — consumo horário recente por (unit_id, machine_type), alimentado
+# por POST /lags/ingest, preenche consumo_lag_1h/24h e rolling_mean_3h das linhas
+# com unit_id. Snapshot Parquet a cada INTERVAL_S (se mudou) e no shutdown;
+# restaurado no startup. LAG_STORE=0 desativa (lags ficam zerados, como antes).
+_LAG_STORE_ENABLED = os.environ.get("LAG_STORE", "1") != "0"
+_LAG_SNAPSHOT_PATH = Path(os.environ.get("LAG_SNAPSHOT_PATH", _ROOT / "state" / "lag_store.parquet"))
+_LAG_SNAPSHOT_INTERVAL_S = float(os.environ.get("LAG_SNAPSHOT_INTERVAL_S", 300))
 
-_inference_api: Optional[HVACDLInferenceAPI] = None
+
+@dataclass(frozen=True)
+class _ServingModel:
+    """Modelo servido — trocado por inteiro, numa única atribuição, no hot reload."""
+
+    api:       HVACDLInferenceAPI
+    registry:  Optional[SegmentedModelRegistry]
+    version:   str
+    loaded_at: float
+    warmup_s:  dict[int, float]
+
+    @property
+    def predictor(self):
+        """Registro de segmentos se ativo, senão o modelo global."""
+        return self.registry or self.api
+
+
+_serving: Optional[_ServingModel] = None
+# Modelo fixado pelo middleware no início de cada requisição: quem chegou
+# antes de um reload termina inteiro (inclusive streams) no modelo antigo
+_request_model: contextvars.ContextVar[Optional[_ServingModel]] = contextvars.ContextVar(
+    "request_model", default=None,
+)
+_reload_lock = threading.Lock()
+_last_reload: dict[str, object] = {}
+_prediction_cache: Optional[PredictionCache] = (
+    PredictionCache(max_entries=_CACHE_SIZE, ttl_s=_CACHE_TTL_S) if _CACHE_SIZE > 0 else None
+)
 _model_load_error: Optional[str] = None
 _model_loading: bool = False
+_job_runner: Optional[JobRunner] = None
+_lag_store: Optional[LagFeatureStore] = LagFeatureStore() if _LAG_STORE_ENABLED else None
+_lag_store_off_reason = "LAG_STORE=0"
+# Normalizer pré-carregado pelo master do modo pre-fork (ver preload_fork_safe)
+_preloaded_normalizer: Optional[DLNormalizer] = None
+
+
+def _current_model() -> _ServingModel:
+    """Modelo fixado pela requisição em curso, ou o servido no momento."""
+    model = _request_model.get() or _serving
+    if model is None:
+        raise RuntimeError("Modelo não carregado")
+    return model
+
+
+def _predictor():
+    """Registro de segmentos se ativo, senão o modelo global."""
+    return _current_model().predictor
+
+
+def _with_lags(df: pl.DataFrame) -> pl.DataFrame:
+    """Features de lag do lag store para as linhas com ``unit_id`` (a coluna sai do lote)."""
+    if "unit_id" not in df.columns:
+        return df
+    if _lag_store is not None:
+        df = _lag_store.with_lags(df)
+    return df.drop("unit_id")
+
+
+def _predict_frame(df: pl.DataFrame):
+    """Inferência bloqueante sobre o modelo carregado (usada pelo coalescer)."""
+    model = _current_model()
+    df = _with_lags(df)
+    if _prediction_cache is None:
+        return model.predictor.predict(df)
+    # Só as linhas ausentes no cache chegam ao modelo
+    return _prediction_cache.predict(df, model.predictor.predict, model.version)
+
+
+def _model_version() -> str:
+    """Hash do conteúdo dos artefatos em disco (global + segmentos roteados)."""
+    if not _SEGMENT_ROUTING:
+        return artifact_version(predictor_artifact_files(_ARTIFACT_PATH))
+    return artifact_version(
+        predictor_artifact_files(_ARTIFACT_PATH, _DL_SEGMENTS_PATH, _ML_SEGMENTS_PATH, _SEGMENT_SOURCE)
+    )
+
+
+def _artifact_fingerprint() -> tuple:
+    """(caminho, mtime, tamanho) de cada arquivo de artefato — barato, para o watcher."""
+    roots = [_ARTIFACT_PATH]
+    if _SEGMENT_ROUTING:
+        roots += [_DL_SEGMENTS_PATH, _ML_SEGMENTS_PATH]
+    entries = set()
+    for root in roots:
+        for path in root.rglob("*") if root.exists() else ():
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.is_file():
+                entries.add((str(path), st.st_mtime_ns, st.st_size))
+    return tuple(sorted(entries))
+
+
+_executor = InferenceExecutor(
+    max_workers=_INFERENCE_WORKERS,
+    max_queue=_INFERENCE_MAX_QUEUE,
+    retry_after_s=_INFERENCE_RETRY_AFTER_S,
+)
+
+_coalescer = MicroBatchCoalescer(
+    _predict_frame,
+    max_wait_ms=_BATCH_WINDOW_MS,
+    max_batch_size=_MAX_BATCH_SIZE,
+    run_blocking=_executor.run,
+    passthrough_errors=(ExecutorSaturatedError,),
+)
+
+
+def _record_success(endpoint: str, n: int) -> None:
+    """Contabiliza uma predição bem-sucedida de ``n`` linhas em /metrics."""
+    BATCH_SIZE.observe(n, endpoint=endpoint)
+    ROWS_PREDICTED.inc(n, endpoint=endpoint)
+
+
+def _record_error(endpoint: str, exc: BaseException) -> None:
+    """Contabiliza um erro de predição por tipo de exceção em /metrics."""
+    ERRORS.inc(endpoint=endpoint, type=type(exc).__name__)
+
+
+def _saturated_exception(rid: str, endpoint: str, exc: ExecutorSaturatedError) -> HTTPException:
+    """Converte saturação do executor em 503 com Retry-After."""
+    _record_error(endpoint, exc)
+    _logger.warning(f"[{rid}] {endpoint}: {exc}")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servidor de inferência saturado, tente novamente",
+        headers={"Retry-After": str(max(1, round(exc.retry_after_s)))},
+    )
+
+
+def _build_model(version: str, normalizer: Optional[DLNormalizer] = None) -> _ServingModel:
+    """Carrega modelo global + registro de segmentos e aquece com lotes sintéticos."""
+    api = HVACDLInferenceAPI(
+        _ARTIFACT_PATH, normalizer=normalizer, engine=_INFERENCE_ENGINE, jit_compile=_INFERENCE_JIT_COMPILE
+    )
+    registry = None
+    if _SEGMENT_ROUTING:
+        # Só lê os manifestos: cada segmento é carregado no primeiro uso
+        registry = SegmentedModelRegistry(
+            api,
+            _DL_SEGMENTS_PATH,
+            _ML_SEGMENTS_PATH,
+            source=_SEGMENT_SOURCE,
+            memory_budget_mb=_SEGMENT_MEMORY_BUDGET_MB,
+            engine=_INFERENCE_ENGINE,
+            jit_compile=_INFERENCE_JIT_COMPILE,
+            ml_engine=_ML_INFERENCE_ENGINE,
+        )
+    # Caminho completo DLNormalizer.transform + model.predict em cada tamanho;
+    # com segmentos, lotes pelo registro carregam os tipos mais frequentes
+    timings: dict[int, float] = {}
+    if _WARMUP_BATCH_SIZES:
+        t0 = time.perf_counter()
+        timings = warm_up(api, _WARMUP_BATCH_SIZES, target="global")
+        if registry is not None:
+            # 1 linha por tipo (cada segmento traça o lote unitário do /predict) + o maior lote
+            sizes = (len(WARMUP_MACHINE_TYPES), max(_WARMUP_BATCH_SIZES))
+            warm_up(registry, sizes, target="segments")
+        _logger.info(
+            f"Warm-up do modelo {version} em {time.perf_counter() - t0:.2f}s: "
+            + ", ".join(f"{n} linhas={t * 1000:.0f}ms" for n, t in timings.items())
+        )
+    return _ServingModel(api, registry, version, time.time(), timings)
+
+
+def _swap_model(model: _ServingModel) -> None:
+    """Passa a servir ``model``. Requisições já em curso seguem no modelo anterior."""
+    global _serving
+    if _prediction_cache is not None:
+        # Antes da troca: nenhuma entrada do modelo anterior é servida pelo novo
+        _prediction_cache.invalidate(model.version)
+    _serving = model
+    MODEL_READY.set(1)
 
 
 def _load_model_sync():
@@ -95,7 +455,7 @@ def _load_model_sync():
     Carrega o modelo em thread separada para não bloquear o lifespan.
     Assim o servidor inicia imediatamente e Railway consegue bater /health.
     """
-    global _inference_api, _model_load_error, _model_loading
+    global _model_load_error, _model_loading
     _model_loading = True
 
     _logger.info("Iniciando carregamento do modelo em background thread...")
@@ -112,9 +472,11 @@ def _load_model_sync():
 
     t0 = time.perf_counter()
     try:
-        _inference_api = HVACDLInferenceAPI(_ARTIFACT_PATH)
+        with _reload_lock:
+            _swap_model(_build_model(_model_version(), normalizer=_preloaded_normalizer))
         elapsed = time.perf_counter() - t0
-        _logger.info(f"Modelo carregado com sucesso em {elapsed:.2f}s")
+        MODEL_LOAD_SECONDS.set(elapsed)
+        _logger.info(f"Modelo {_serving.version} carregado com sucesso em {elapsed:.2f}s")
     except Exception as e:
         _model_load_error = str(e)
         _logger.error(f"Erro ao carregar modelo: {e}", exc_info=True)
@@ -122,6 +484,132 @@ def _load_model_sync():
         _model_loading = False
 
 
+class ReloadInProgressError(RuntimeError):
+    """Já há uma carga/reload do modelo em andamento."""
+
+
+def _reload_model(reason: str, force: bool = False) -> dict[str, object]:
+    """
+    Hot reload: carrega e aquece o modelo do disco em paralelo ao tráfego e troca.
+
+    Se os artefatos não mudaram (mesmo hash) nada é carregado, a menos que
+    ``force``. Uma falha mantém o modelo atual servindo.
+
+    Raises:
+        ReloadInProgressError: Outro reload (ou a carga inicial) em andamento.
+    """
+    global _model_load_error, _last_reload
+    if not _reload_lock.acquire(blocking=False):
+        raise ReloadInProgressError("Carga do modelo já em andamento")
+    try:
+        previous = _serving.version if _serving is not None else None
+        result: dict[str, object] = {"reason": reason, "previous_version": previous, "at": time.time()}
+        t0 = time.perf_counter()
+        try:
+            version = _model_version()
+            if version == previous and not force:
+                result.update(status="unchanged", version=version)
+            else:
+                _logger.info(f"Reload ({reason}): carregando versão {version} (atual: {previous})")
+                _swap_model(_build_model(version))
+                result.update(status="ok", version=version)
+        except Exception as e:
+            _logger.error(f"Reload ({reason}) falhou — mantendo versão {previous}: {e}", exc_info=True)
+            result.update(status="failed", version=previous, error=f"{type(e).__name__}: {e}")
+        elapsed = time.perf_counter() - t0
+        result["elapsed_s"] = round(elapsed, 3)
+
+        MODEL_RELOADS.inc(result=result["status"])
+        if result["status"] == "ok":
+            _model_load_error = None
+            MODEL_LOAD_SECONDS.set(elapsed)
+            _logger.info(f"Reload ({reason}): versão {result['version']} servindo após {elapsed:.2f}s")
+        _last_reload = result
+        return result
+    finally:
+        _reload_lock.release()
+
+
+def _watch_artifacts(stop: threading.Event) -> None:
+    """
+    Recarrega o modelo quando os artefatos mudam em disco.
+
+    Uma mudança só dispara o reload depois de um intervalo sem novas
+    alterações — um ``keras_model.keras`` ainda sendo copiado não é lido.
+    """
+    seen = _artifact_fingerprint()
+    pending = None
+    while not stop.wait(_RELOAD_WATCH_S):
+        current = _artifact_fingerprint()
+        if current == seen:
+            pending = None
+            continue
+        if current != pending:
+            pending = current
+            continue
+        try:
+            _reload_model("watcher")
+        except ReloadInProgressError:
+            continue
+        seen, pending = current, None
+
+
+def _restore_lag_store() -> None:
+    """Restaura o lag store do último snapshot (falha → começa vazio)."""
+    global _lag_store
+    if _lag_store is None or not _LAG_SNAPSHOT_PATH.is_file():
+        return
+    try:
+        _lag_store = LagFeatureStore.from_snapshot(_LAG_SNAPSHOT_PATH)
+    except Exception as exc:
+        _logger.error(f"Snapshot do lag store ilegível ({_LAG_SNAPSHOT_PATH}): {exc}")
+
+
+def _snapshot_lags() -> None:
+    """Grava o lag store em LAG_SNAPSHOT_PATH se mudou desde o último snapshot."""
+    if _lag_store is None:
+        return
+    try:
+        n = _lag_store.snapshot(_LAG_SNAPSHOT_PATH)
+    except Exception as exc:
+        _logger.error(f"Falha no snapshot do lag store: {exc}")
+        return
+    if n is not None:
+        _logger.info(f"Snapshot do lag store: {n} slots em {_LAG_SNAPSHOT_PATH}")
+
+
+def _snapshot_lags_periodically(stop: threading.Event) -> None:
+    while not stop.wait(_LAG_SNAPSHOT_INTERVAL_S):
+        _snapshot_lags()
+
+
+def disable_lag_store(reason: str) -> None:
+    """
+    Desliga o lag store neste processo (antes do startup).
+
+    Usado pelo pre-fork com mais de um worker: cada worker teria um store
+    privado — a ingestão chegaria a um só e todos gravariam o mesmo snapshot.
+    """
+    global _lag_store, _lag_store_off_reason
+    _lag_store = None
+    _lag_store_off_reason = reason
+    _logger.warning(f"Lag store desativado: {reason}")
+
+
+def preload_fork_safe() -> None:
+    """
+    Pré-carrega, no master do modo pre-fork (``tools/prefork.py``), o estado
+    que os workers herdam copy-on-write: metadados do normalizer e a grade
+    geográfica. O modelo Keras continua sendo carregado por ``_load_model_sync``
+    em cada worker — o runtime TensorFlow não sobrevive a ``fork()`` depois de
+    executar operações.
+    """
+    global _preloaded_normalizer
+    _preloaded_normalizer = DLNormalizer.from_artifact(_ARTIFACT_PATH)
+    _get_geo_lookup()
+    _logger.info("Pré-carga para fork concluída (normalizer + referência geográfica)")
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 #  LIFESPAN (substitui @app.on_event deprecated)
 # ══════════════════════════════════════════════════════════════════════════════
@@ -132,8 +620,9 @@ async def lifespan(app: FastAPI):
     Gerencia startup e shutdown da aplicação.
 
     O carregamento do modelo roda em background thread para que o servidor
-    comece a aceitar requisições imediatamente. Isso é essencial para o
-    Railway, que precisa de HTTP 200 em /health dentro da janela de timeout.
+    comece a aceitar requisições imediatamente: /health (liveness) responde
+    desde o início e /ready passa a 200 quando o modelo termina de carregar
+    e aquecer — dentro do ``healthcheckTimeout`` do railway.json.
     """
     # ── Startup ───────────────────────────────────────────────────────────
     _logger.info("=== STARTUP INICIANDO ===")
@@ -143,13 +632,30 @@ async def lifespan(app: FastAPI):
     loader_thread = threading.Thread(target=_load_model_sync, daemon=True)
     loader_thread.start()
 
+    _restore_lag_store()
+
+    watch_stop = threading.Event()
+    if _lag_store is not None and _LAG_SNAPSHOT_INTERVAL_S > 0:
+        threading.Thread(
+            target=_snapshot_lags_periodically, args=(watch_stop,), name="hvac-lag-snapshot", daemon=True,
+        ).start()
+    if _RELOAD_WATCH_S > 0:
+        threading.Thread(
+            target=_watch_artifacts, args=(watch_stop,), name="hvac-artifact-watcher", daemon=True,
+        ).start()
+        _logger.info(f"Hot reload: verificando artefatos a cada {_RELOAD_WATCH_S:.0f}s")
+
     _logger.info("=== SERVIDOR HTTP PRONTO — modelo carregando em background ===")
 
     yield  # ── Aplicação rodando (modelo pode ainda estar carregando) ──
 
     # ── Shutdown ──────────────────────────────────────────────────────────
     _logger.info("=== SHUTDOWN — recebido sinal de parada ===")
-    _inference_api = None
+    watch_stop.set()
+    _executor.shutdown(wait=True)
+    if _job_runner is not None:
+        _job_runner.shutdown()
+    _snapshot_lags()
     _logger.info("=== SHUTDOWN COMPLETO ===")
 
 
@@ -195,6 +701,9 @@ async def request_logging_middleware(request: Request, call_next) -> Response:
 
     _logger.info(f"[{request_id}] >>> {method} {path} | client={client}")
 
+    # Fixa o modelo da requisição inteira (um hot reload no meio não a afeta)
+    model = _serving
+    token = _request_model.set(model)
     t0 = time.perf_counter()
     try:
         response = await call_next(request)
@@ -205,9 +714,17 @@ async def request_logging_middleware(request: Request, call_next) -> Response:
             f"exception={type(exc).__name__}: {exc} | {elapsed_ms:.1f}ms"
         )
         raise
+    finally:
+        _request_model.reset(token)
 
     elapsed_ms = (time.perf_counter() - t0) * 1000
     response.headers["X-Request-ID"] = request_id
+    if model is not None:
+        response.headers["X-Model-Version"] = model.version
+
+    # Rota casada (template) em vez do path cru — cardinalidade limitada
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    REQUEST_SECONDS.observe(elapsed_ms / 1000, route=route, status=str(response.status_code))
 
     log_fn = _logger.info if response.status_code < 400 else _logger.warning
     log_fn(
@@ -238,6 +755,9 @@ class PredictionRequest(BaseModel):
     pressao_superficial_hpa: float = Field(..., description="Pressão em hPa")
     irradiancia_direta_wm2: float = Field(..., ge=0, description="Irradiância direta normal em W/m²")
     irradiancia_difusa_wm2: float = Field(..., ge=0, description="Irradiância difusa horizontal em W/m²")
+    unit_id: Optional[int] = Field(
+        None, description="Unidade (opcional) — habilita as features de lag do consumo ingerido em /lags/ingest",
+    )
 
     class Config:
         json_schema_extra = {
@@ -280,12 +800,60 @@ class BatchPredictionResponse(BaseModel):
     timestamp: str = Field(..., description="Timestamp da predição (ISO 8601)")
 
 
+class ScenarioSpec(BaseModel):
+    """Cenário what-if: alterações de features densas do modelo, em unidade bruta."""
+
+    name: str = Field(..., min_length=1, description="Rótulo do cenário")
+    set: dict[str, float] = Field(default_factory=dict, description="{coluna: valor} — substitui")
+    scale: dict[str, float] = Field(default_factory=dict, description="{coluna: fator} — multiplica")
+    delta: dict[str, float] = Field(default_factory=dict, description="{coluna: incremento} — soma")
+
+
+class ScenarioRequest(BaseModel):
+    """Registros base + cenários avaliados sobre eles."""
+
+    records: list[PredictionRequest] = Field(..., description="Registros base")
+    scenarios: list[ScenarioSpec] = Field(..., description="Cenários, na ordem da resposta")
+    include_base: bool = Field(True, description="Inclui o cenário 'base' e delta_kwh (cenário − base)")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "records": [PredictionRequest.Config.json_schema_extra["example"]],
+                "scenarios": [
+                    {"name": "temp+2", "delta": {"Temperatura_C": 2, "Temperatura_Percebida_C": 2}},
+                    {"name": "feriado", "set": {"is_feriado": 1, "is_dia_util": 0}},
+                ],
+            }
+        }
+
+
+class ScenarioRow(BaseModel):
+    """Predição de um registro em um cenário."""
+
+    scenario: str
+    row: int = Field(..., description="Índice do registro em records")
+    consumo_kwh: float
+    delta_kwh: Optional[float] = Field(None, description="consumo_kwh − base (com include_base)")
+    model: str = Field(..., description="Segmento DL que predisse o registro ou 'global'")
+
+
+class ScenarioResponse(BaseModel):
+    """Tabela tidy cenário × registro."""
+
+    results: list[ScenarioRow]
+    scenarios: list[str] = Field(..., description="Cenários, na ordem de results")
+    n_records: int
+    timestamp: str
+
+
 class HealthResponse(BaseModel):
     """Resposta de health check."""
 
     status: str = Field(..., description="Status do serviço: healthy | loading | error")
     artifact_path: str = Field(..., description="Caminho do artefato carregado")
     model_loaded: bool = Field(..., description="Se o modelo está carregado")
+    model_version: Optional[str] = Field(None, description="Hash dos artefatos servidos")
     detail: Optional[str] = Field(None, description="Detalhes adicionais (erro, etc)")
 
 
@@ -296,6 +864,110 @@ class ErrorResponse(BaseModel):
     detail: Optional[str] = Field(None, description="Detalhes adicionais")
 
 
+class ReadyResponse(BaseModel):
+    """Resposta de readiness."""
+
+    status: str = Field(..., description="ready | loading | error")
+    model_version: Optional[str] = Field(None, description="Hash dos artefatos servidos")
+    warmup_ms: dict[str, float] = Field(default_factory=dict, description="Warm-up por tamanho de lote (ms)")
+    detail: Optional[str] = Field(None, description="Detalhes adicionais (erro, etc)")
+
+
+class ReloadResponse(BaseModel):
+    """Resultado de um hot reload do modelo."""
+
+    status: str = Field(..., description="ok | unchanged | failed")
+    version: Optional[str] = Field(None, description="Versão servindo após o reload")
+    previous_version: Optional[str] = Field(None, description="Versão servindo antes do reload")
+    reason: str = Field(..., description="Origem: admin | watcher")
+    at: float = Field(..., description="Início do reload (epoch s)")
+    elapsed_s: float = Field(..., description="Duração de carga + warm-up")
+    error: Optional[str] = Field(None, description="Erro, se falhou (o modelo anterior segue servindo)")
+
+
+class JobRequest(BaseModel):
+    """Job sobre um Parquet local ao servidor (dentro de JOBS_INPUT_ROOTS)."""
+
+    path: str = Field(..., description="Caminho do .parquet de entrada no servidor")
+
+
+class JobResponse(BaseModel):
+    """Estado de um job de scoring em massa."""
+
+    id: str = Field(..., description="Identificador do job")
+    status: str = Field(..., description="queued | running | succeeded | failed")
+    input_path: str = Field(..., description="Parquet de entrada")
+    output_path: str = Field(..., description="Parquet de predições (ao lado da entrada)")
+    rows_total: Optional[int] = Field(None, description="Linhas da entrada")
+    rows_done: int = Field(..., description="Linhas já preditas e gravadas")
+    progress: float = Field(..., description="Fração concluída (0–1)")
+    rows_per_s: Optional[float] = Field(None, description="Vazão média do job")
+    created_at: float = Field(..., description="Criação (epoch s)")
+    started_at: Optional[float] = Field(None, description="Início da execução (epoch s)")
+    finished_at: Optional[float] = Field(None, description="Fim da execução (epoch s)")
+    error: Optional[str] = Field(None, description="Erro, se falhou")
+    download_url: Optional[str] = Field(None, description="GET do resultado, quando concluído")
+
+
+class LagIngestResponse(BaseModel):
+    """Resultado de uma ingestão no lag store."""
+
+    rows_received: int = Field(..., description="Linhas no corpo")
+    rows_accepted: int = Field(..., description="Linhas gravadas (as anteriores à janela de 25 h são descartadas)")
+    n_keys: int = Field(..., description="Chaves (unit_id, machine_type) no store")
+
+
+def _jobs() -> JobRunner:
+    """Cria o JobRunner no primeiro uso (o diretório e os workers só existem se houver jobs)."""
+    global _job_runner
+    if _job_runner is None:
+        routing = _SEGMENT_ROUTING
+        spec = PredictorSpec(
+            artifact_path=str(_ARTIFACT_PATH),
+            dl_segments_path=str(_DL_SEGMENTS_PATH) if routing else None,
+            ml_segments_path=str(_ML_SEGMENTS_PATH) if routing else None,
+            segment_source=_SEGMENT_SOURCE,
+            segment_budget_mb=_SEGMENT_MEMORY_BUDGET_MB,
+            engine=_INFERENCE_ENGINE,
+            ml_engine=_ML_INFERENCE_ENGINE,
+        )
+        _job_runner = JobRunner(
+            JobStore(_JOBS_DIR),
+            spec,
+            _COLUMNAR_BOUNDS,
+            n_workers=_JOBS_WORKERS,
+            chunk_rows=_JOBS_CHUNK_ROWS,
+            threads=_JOBS_THREADS,
+            cpus=_JOBS_CPUS,
+            nice=_JOBS_NICE,
+            retention_s=_JOBS_RETENTION_S,
+        )
+    _job_runner.purge_expired()
+    return _job_runner
+
+
+def _job_response(job) -> JobResponse:
+    data = job.to_dict()
+    if job.status == JOB_SUCCEEDED:
+        data["download_url"] = f"/jobs/{job.id}/result"
+    return JobResponse(**{k: v for k, v in data.items() if k in JobResponse.model_fields})
+
+
+def _require_admin_token(raw_request: Request) -> None:
+    """401 se ``ADMIN_TOKEN`` estiver definido e o header ``X-Admin-Token`` não bater."""
+    if _ADMIN_TOKEN and raw_request.headers.get("X-Admin-Token") != _ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="X-Admin-Token inválido")
+
+
+def _request_to_record(request: PredictionRequest) -> dict:
+    """Converte a requisição Pydantic para uma linha no schema do normalizer."""
+    return {API_TO_FRAME_COLUMNS.get(k, k): v for k, v in request.model_dump().items()}
+
+
+# Limites ge/le de PredictionRequest, reaplicados vetorialmente nos payloads colunares
+_COLUMNAR_BOUNDS = field_bounds(PredictionRequest)
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 #  ENDPOINTS
 # ══════════════════════════════════════════════════════════════════════════════
@@ -303,14 +975,14 @@ class ErrorResponse(BaseModel):
 @app.get("/health", response_model=HealthResponse, tags=["Health"])
 async def health_check():
     """
-    Health check — verifica se o serviço está operacional.
-    Railway usa este endpoint para validar o deploy (configurado em railway.json).
+    Health check (liveness) — verifica se o processo está operacional.
 
-    Retorna HTTP 200 quando modelo está carregado OU ainda carregando
-    (Railway precisa de 200 para considerar o deploy saudável).
+    Retorna HTTP 200 quando modelo está carregado OU ainda carregando.
     Retorna HTTP 503 apenas se o carregamento falhou com erro.
+    Para saber se a réplica já pode receber tráfego, use ``/ready``
+    (healthcheck de deploy do Railway, em railway.json).
     """
-    if _model_load_error and _inference_api is None:
+    if _model_load_error and _serving is None:
         _logger.warning(f"Health check: ERROR — {_model_load_error}")
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -331,15 +1003,45 @@ async def health_check():
         status="healthy",
         artifact_path=str(_ARTIFACT_PATH),
         model_loaded=True,
+        model_version=_serving.version if _serving is not None else None,
     )
 
 
+@app.get(
+    "/ready",
+    response_model=ReadyResponse,
+    responses={503: {"model": ReadyResponse, "description": "Modelo carregando/aquecendo ou falhou"}},
+    tags=["Health"],
+)
+async def readiness_check(response: Response):
+    """
+    Readiness — 200 só com um modelo carregado **e aquecido** servindo.
+
+    Diferente de ``/health`` (liveness, 200 enquanto o modelo carrega), é o
+    endpoint para o balanceador/healthcheck de deploy: a réplica só recebe
+    tráfego depois do warm-up, sem as primeiras requisições lentas. Durante
+    um hot reload continua 200 — o modelo anterior segue servindo.
+    """
+    model = _serving
+    if model is not None:
+        return ReadyResponse(
+            status="ready",
+            model_version=model.version,
+            warmup_ms={str(n): round(t * 1000, 1) for n, t in model.warmup_s.items()},
+        )
+    response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    if _model_load_error:
+        return ReadyResponse(status="error", detail=_model_load_error)
+    return ReadyResponse(status="loading", detail="Modelo carregando/aquecendo em background")
+
+
 @app.post(
     "/predict",
     response_model=PredictionResponse,
     responses={
         400: {"model": ErrorResponse, "description": "Dados de entrada inválidos"},
         500: {"model": ErrorResponse, "description": "Erro interno do servidor"},
+        503: {"model": ErrorResponse, "description": "Modelo indisponível ou executor saturado (ver Retry-After)"},
     },
     tags=["Prediction"],
 )
@@ -355,7 +1057,7 @@ async def predict_single(request: PredictionRequest, raw_request: Request):
     """
     rid = getattr(raw_request.state, "request_id", "no-id")
 
-    if _inference_api is None:
+    if _serving is None:
         _logger.error(f"[{rid}] predict_single: modelo não carregado")
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -368,27 +1070,16 @@ async def predict_single(request: PredictionRequest, raw_request: Request):
     )
 
     try:
-        # Cria DataFrame a partir da requisição
-        df = pl.DataFrame({
-            "hora": [request.hora],
-            "data": [request.data],
-            "machine_type": [request.machine_type],
-            "latitude": [request.latitude],
-            "longitude": [request.longitude],
-            "Temperatura_C": [request.temperatura_c],
-            "Temperatura_Percebida_C": [request.temperatura_percebida_c],
-            "Umidade_Relativa_%": [request.umidade_relativa_pct],
-            "Precipitacao_mm": [request.precipitacao_mm],
-            "Velocidade_Vento_kmh": [request.velocidade_vento_kmh],
-            "Pressao_Superficial_hPa": [request.pressao_superficial_hpa],
-            "Irradiancia_Direta_Wm2": [request.irradiancia_direta_wm2],
-            "Irradiancia_Difusa_Wm2": [request.irradiancia_difusa_wm2],
-        }).with_columns(pl.col("data").cast(pl.Date))
-
-        _logger.info(f"[{rid}] DataFrame criado, executando inferência...")
+        record = _request_to_record(request)
 
         t0 = time.perf_counter()
-        pred = _inference_api.predict(df)[0]
+        if _COALESCE_ENABLED:
+            # Agrupa com requisições concorrentes em um único forward pass
+            pred = await _coalescer.submit(record)
+        else:
+            df = pl.DataFrame([record]).with_columns(pl.col("data").cast(pl.Date))
+            _logger.info(f"[{rid}] DataFrame criado, executando inferência...")
+            pred = (await _executor.run(_predict_frame, df))[0]
         elapsed_ms = (time.perf_counter() - t0) * 1000
 
         result = float(pred)
@@ -397,18 +1088,25 @@ async def predict_single(request: PredictionRequest, raw_request: Request):
             f"inferência={elapsed_ms:.1f}ms"
         )
 
-        return PredictionResponse(
-            consumo_kwh=result,
-            timestamp=datetime.now().isoformat(),
-        )
+        _record_success("predict_single", 1)
+        with stage_timer("serialize"):
+            body = PredictionResponse(
+                consumo_kwh=result,
+                timestamp=datetime.now().isoformat(),
+            ).model_dump_json()
+        return Response(content=body, media_type="application/json")
 
+    except ExecutorSaturatedError as e:
+        raise _saturated_exception(rid, "predict_single", e)
     except ValueError as e:
+        _record_error("predict_single", e)
         _logger.warning(f"[{rid}] predict_single ValueError: {e}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Dados inválidos: {str(e)}",
         )
     except Exception as e:
+        _record_error("predict_single", e)
         _logger.error(f"[{rid}] predict_single ERRO: {e}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -422,6 +1120,7 @@ async def predict_single(request: PredictionRequest, raw_request: Request):
     responses={
         400: {"model": ErrorResponse, "description": "Dados de entrada inválidos"},
         500: {"model": ErrorResponse, "description": "Erro interno do servidor"},
+        503: {"model": ErrorResponse, "description": "Modelo indisponível ou executor saturado (ver Retry-After)"},
     },
     tags=["Prediction"],
 )
@@ -437,7 +1136,7 @@ async def predict_batch(request: BatchPredictionRequest, raw_request: Request):
     """
     rid = getattr(raw_request.state, "request_id", "no-id")
 
-    if _inference_api is None:
+    if _serving is None:
         _logger.error(f"[{rid}] predict_batch: modelo não carregado")
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -455,51 +1154,40 @@ async def predict_batch(request: BatchPredictionRequest, raw_request: Request):
     _logger.info(f"[{rid}] predict_batch: {n} registros recebidos")
 
     try:
-        # Cria DataFrame a partir da lista de requisições
-        data_dict = {
-            "hora": [r.hora for r in request.records],
-            "data": [r.data for r in request.records],
-            "machine_type": [r.machine_type for r in request.records],
-            "latitude": [r.latitude for r in request.records],
-            "longitude": [r.longitude for r in request.records],
-            "Temperatura_C": [r.temperatura_c for r in request.records],
-            "Temperatura_Percebida_C": [r.temperatura_percebida_c for r in request.records],
-            "Umidade_Relativa_%": [r.umidade_relativa_pct for r in request.records],
-            "Precipitacao_mm": [r.precipitacao_mm for r in request.records],
-            "Velocidade_Vento_kmh": [r.velocidade_vento_kmh for r in request.records],
-            "Pressao_Superficial_hPa": [r.pressao_superficial_hpa for r in request.records],
-            "Irradiancia_Direta_Wm2": [r.irradiancia_direta_wm2 for r in request.records],
-            "Irradiancia_Difusa_Wm2": [r.irradiancia_difusa_wm2 for r in request.records],
-        }
-
-        df = pl.DataFrame(data_dict).with_columns(pl.col("data").cast(pl.Date))
+        df = _records_frame(request.records)
 
         _logger.info(f"[{rid}] DataFrame batch criado ({n} linhas), executando inferência...")
 
         t0 = time.perf_counter()
-        preds = _inference_api.predict(df)
+        preds = await _executor.run(_predict_frame, df)
         elapsed_ms = (time.perf_counter() - t0) * 1000
 
-        results = [float(p) for p in preds]
         _logger.info(
             f"[{rid}] predict_batch: {n} predições concluídas | "
             f"inferência={elapsed_ms:.1f}ms | "
-            f"min={min(results):.4f} max={max(results):.4f}"
-        )
-
-        return BatchPredictionResponse(
-            predictions=results,
-            n_records=n,
-            timestamp=datetime.now().isoformat(),
+            f"min={preds.min():.4f} max={preds.max():.4f}"
         )
 
+        _record_success("predict_batch", n)
+        with stage_timer("serialize"):
+            body = BatchPredictionResponse(
+                predictions=preds.astype(float).tolist(),
+                n_records=n,
+                timestamp=datetime.now().isoformat(),
+            ).model_dump_json()
+        return Response(content=body, media_type="application/json")
+
+    except ExecutorSaturatedError as e:
+        raise _saturated_exception(rid, "predict_batch", e)
     except ValueError as e:
+        _record_error("predict_batch", e)
         _logger.warning(f"[{rid}] predict_batch ValueError: {e}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Dados inválidos: {str(e)}",
         )
     except Exception as e:
+        _record_error("predict_batch", e)
         _logger.error(f"[{rid}] predict_batch ERRO: {e}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -507,6 +1195,691 @@ async def predict_batch(request: BatchPredictionRequest, raw_request: Request):
         )
 
 
+def _records_frame(records: list[PredictionRequest]) -> pl.DataFrame:
+    """DataFrame de input a partir da lista de registros."""
+    data_dict = {
+        "hora": [r.hora for r in records],
+        "data": [r.data for r in records],
+        "machine_type": [r.machine_type for r in records],
+        "latitude": [r.latitude for r in records],
+        "longitude": [r.longitude for r in records],
+        "Temperatura_C": [r.temperatura_c for r in records],
+        "Temperatura_Percebida_C": [r.temperatura_percebida_c for r in records],
+        "Umidade_Relativa_%": [r.umidade_relativa_pct for r in records],
+        "Precipitacao_mm": [r.precipitacao_mm for r in records],
+        "Velocidade_Vento_kmh": [r.velocidade_vento_kmh for r in records],
+        "Pressao_Superficial_hPa": [r.pressao_superficial_hpa for r in records],
+        "Irradiancia_Direta_Wm2": [r.irradiancia_direta_wm2 for r in records],
+        "Irradiancia_Difusa_Wm2": [r.irradiancia_difusa_wm2 for r in records],
+        "unit_id": [r.unit_id for r in records],
+    }
+    return pl.DataFrame(data_dict).with_columns(pl.col("data").cast(pl.Date))
+
+
+def _predict_scenarios(df: pl.DataFrame, scenarios: list[Scenario], include_base: bool) -> pl.DataFrame:
+    """Varredura de cenários com o roteamento por segmento de ``/predict`` (sem cache)."""
+    return sweep_routed(_current_model().predictor, _with_lags(df), scenarios, include_base)
+
+
+@app.post(
+    "/predict_scenarios",
+    response_model=ScenarioResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Dados de entrada ou cenários inválidos"},
+        500: {"model": ErrorResponse, "description": "Erro interno do servidor"},
+        503: {"model": ErrorResponse, "description": "Modelo indisponível ou executor saturado (ver Retry-After)"},
+    },
+    tags=["Prediction"],
+)
+async def predict_scenarios(request: ScenarioRequest, raw_request: Request):
+    """
+    Cenários what-if (ex: temperatura +1..+5 °C, operação em feriado).
+
+    Os registros são normalizados uma única vez; cada cenário reescreve só
+    as features densas que altera (com o clipping/min-max do treino) e todos
+    vão em um único forward pass por modelo (ver ``tools/scenarios.py``).
+
+    Com ``SEGMENT_ROUTING`` os registros seguem o roteamento de ``/predict``
+    para segmentos DL; registros de segmentos ML usam o modelo global
+    (``model`` de cada linha indica qual).
+
+    Returns:
+        ScenarioResponse com uma linha por (cenário, registro).
+    """
+    rid = getattr(raw_request.state, "request_id", "no-id")
+
+    if _serving is None:
+        _logger.error(f"[{rid}] predict_scenarios: modelo não carregado")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Modelo não carregado",
+        )
+
+    n = len(request.records)
+    n_scenarios = len(request.scenarios) + int(request.include_base)
+    if not request.records or not request.scenarios:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="records e scenarios não podem ser vazios",
+        )
+    if n * n_scenarios > _SCENARIO_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{n} registros × {n_scenarios} cenários excede SCENARIO_MAX_ROWS={_SCENARIO_MAX_ROWS}",
+        )
+
+    try:
+        scenarios = [Scenario(s.name, set=s.set, scale=s.scale, delta=s.delta) for s in request.scenarios]
+        t0 = time.perf_counter()
+        table = await _executor.run(_predict_scenarios, _records_frame(request.records), scenarios, request.include_base)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        _logger.info(
+            f"[{rid}] predict_scenarios: {n} registros × {n_scenarios} cenários | "
+            f"inferência={elapsed_ms:.1f}ms"
+        )
+
+        _record_success("predict_scenarios", table.height)
+        with stage_timer("serialize"):
+            body = ScenarioResponse(
+                results=table.to_dicts(),
+                scenarios=table["scenario"].unique(maintain_order=True).to_list(),
+                n_records=n,
+                timestamp=datetime.now().isoformat(),
+            ).model_dump_json()
+        return Response(content=body, media_type="application/json")
+
+    except ExecutorSaturatedError as e:
+        raise _saturated_exception(rid, "predict_scenarios", e)
+    except ValueError as e:
+        _record_error("predict_scenarios", e)
+        _logger.warning(f"[{rid}] predict_scenarios ValueError: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Dados inválidos: {str(e)}",
+        )
+    except Exception as e:
+        _record_error("predict_scenarios", e)
+        _logger.error(f"[{rid}] predict_scenarios ERRO: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao processar cenários: {str(e)}",
+        )
+
+
+async def _predict_columnar_payload(
+    rid: str,
+    endpoint: str,
+    parse_fn,
+    accept: Optional[str],
+):
+    """
+    Executa parse + validação vetorizada + inferência de um payload colunar
+    no executor e monta a resposta (JSON ou Arrow IPC conforme ``Accept``).
+    """
+    if _serving is None:
+        _logger.error(f"[{rid}] {endpoint}: modelo não carregado")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Modelo não carregado",
+        )
+
+    def _parse_and_predict():
+        df = validate_frame(parse_fn(), _COLUMNAR_BOUNDS)
+        return df.height, _predict_frame(df)
+
+    try:
+        t0 = time.perf_counter()
+        n, preds = await _executor.run(_parse_and_predict)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        _logger.info(
+            f"[{rid}] {endpoint}: {n} predições concluídas | "
+            f"parse+validação+inferência={elapsed_ms:.1f}ms"
+        )
+    except ExecutorSaturatedError as e:
+        raise _saturated_exception(rid, endpoint, e)
+    except ValueError as e:
+        _record_error(endpoint, e)
+        _logger.warning(f"[{rid}] {endpoint} ValueError: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Dados inválidos: {str(e)}",
+        )
+    except Exception as e:
+        _record_error(endpoint, e)
+        _logger.error(f"[{rid}] {endpoint} ERRO: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao processar predições em lote: {str(e)}",
+        )
+
+    _record_success(endpoint, n)
+    with stage_timer("serialize"):
+        if wants_arrow(accept):
+            return Response(
+                content=predictions_to_arrow(preds),
+                media_type=ARROW_STREAM_MEDIA_TYPE,
+                headers={"X-N-Records": str(n)},
+            )
+        body = BatchPredictionResponse(
+            predictions=preds.astype(float).tolist(),
+            n_records=n,
+            timestamp=datetime.now().isoformat(),
+        ).model_dump_json()
+    return Response(content=body, media_type="application/json")
+
+
+_COLUMNAR_RESPONSES = {
+    200: {
+        "model": BatchPredictionResponse,
+        "content": {ARROW_STREAM_MEDIA_TYPE: {}},
+        "description": "Predições em JSON, ou Arrow IPC com `Accept: "
+                       f"{ARROW_STREAM_MEDIA_TYPE}`",
+    },
+    400: {"model": ErrorResponse, "description": "Dados de entrada inválidos"},
+    500: {"model": ErrorResponse, "description": "Erro interno do servidor"},
+    503: {"model": ErrorResponse, "description": "Modelo indisponível ou executor saturado (ver Retry-After)"},
+}
+
+
+@app.post(
+    "/predict_columnar",
+    responses=_COLUMNAR_RESPONSES,
+    tags=["Prediction"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"example": {
+                "hora": [8, 14], "data": ["2025-07-03", "2025-07-03"],
+                "machine_type": ["splitao", "splitao"],
+                "latitude": [-23.88, -23.88], "longitude": [-46.42, -46.42],
+                "temperatura_c": [18.0, 25.7], "temperatura_percebida_c": [17.5, 24.9],
+                "umidade_relativa_pct": [70.0, 57.0], "precipitacao_mm": [0.0, 0.0],
+                "velocidade_vento_kmh": [10.2, 21.4], "pressao_superficial_hpa": [970.1, 969.8],
+                "irradiancia_direta_wm2": [120.0, 520.0], "irradiancia_difusa_wm2": [60.0, 180.0],
+            }}},
+        },
+    },
+)
+async def predict_columnar(raw_request: Request):
+    """
+    Predição em lote com payload colunar JSON ``{coluna: [valores]}``.
+
+    Evita a validação Pydantic objeto a objeto: o corpo vai direto para um
+    ``pl.DataFrame`` e as faixas de ``PredictionRequest`` são checadas com
+    expressões polars vetorizadas.
+    """
+    rid = getattr(raw_request.state, "request_id", "no-id")
+    body = await raw_request.body()
+    return await _predict_columnar_payload(
+        rid, "predict_columnar",
+        lambda: frame_from_columns(json.loads(body)),
+        raw_request.headers.get("accept"),
+    )
+
+
+@app.post(
+    "/predict_arrow",
+    responses=_COLUMNAR_RESPONSES,
+    tags=["Prediction"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                ARROW_STREAM_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+                "application/vnd.apache.arrow.file": {"schema": {"type": "string", "format": "binary"}},
+                "application/vnd.apache.parquet": {"schema": {"type": "string", "format": "binary"}},
+            },
+        },
+    },
+)
+async def predict_arrow(raw_request: Request):
+    """
+    Predição em lote com corpo binário Arrow IPC (stream/file) ou Parquet.
+
+    O corpo é lido direto para polars (sem JSON). Mesmas colunas e
+    checagens de ``/predict_columnar``.
+    """
+    rid = getattr(raw_request.state, "request_id", "no-id")
+    body = await raw_request.body()
+    content_type = raw_request.headers.get("content-type")
+    return await _predict_columnar_payload(
+        rid, "predict_arrow",
+        lambda: frame_from_bytes(body, content_type),
+        raw_request.headers.get("accept"),
+    )
+
+
+async def _predict_stream_chunk(df: pl.DataFrame):
+    """
+    Valida e infere um chunk do stream no executor.
+
+    Com o stream já aberto não há como responder 503: se o executor estiver
+    saturado, aguarda ``retry_after_s`` e tenta de novo (backpressure até o
+    cliente, que para de ser lido enquanto isso).
+    """
+    def _validate_and_predict():
+        chunk = _with_lags(validate_frame(df, _COLUMNAR_BOUNDS))
+        return _predictor().predict_batch(chunk, batch_size=_STREAM_CHUNK_ROWS)
+
+    while True:
+        try:
+            return await _executor.run(_validate_and_predict)
+        except ExecutorSaturatedError as e:
+            await asyncio.sleep(e.retry_after_s)
+
+
+@app.post(
+    "/predict_stream",
+    responses={
+        200: {
+            "content": {NDJSON_MEDIA_TYPE: {}, ARROW_STREAM_MEDIA_TYPE: {}},
+            "description": "Uma linha ``{\"consumo_kwh\": x}`` por registro, na ordem "
+                           "de entrada, ou Arrow IPC stream com `Accept: "
+                           f"{ARROW_STREAM_MEDIA_TYPE}`",
+        },
+        503: {"model": ErrorResponse, "description": "Modelo não carregado"},
+    },
+    tags=["Prediction"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                NDJSON_MEDIA_TYPE: {"schema": {"type": "string"}},
+                ARROW_STREAM_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+            },
+        },
+    },
+)
+async def predict_stream(raw_request: Request):
+    """
+    Predição em streaming para lotes muito grandes.
+
+    O corpo (NDJSON, ou Arrow IPC stream com ``Content-Type:
+    application/vnd.apache.arrow.stream``) é lido incrementalmente em chunks
+    de ``PREDICT_STREAM_CHUNK_ROWS`` linhas; cada chunk passa por
+    ``HVACDLInferenceAPI.predict_batch`` e suas predições são enviadas ao
+    cliente antes do próximo ser lido.
+
+    Como o status 200 sai com o primeiro chunk, um erro no meio do stream é
+    reportado como última linha ``{"error": ..., "rows_done": n}`` (NDJSON)
+    ou pelo corte do stream Arrow sem o marcador de fim.
+    """
+    rid = getattr(raw_request.state, "request_id", "no-id")
+    if _serving is None:
+        _logger.error(f"[{rid}] predict_stream: modelo não carregado")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Modelo não carregado",
+        )
+
+    content_type = (raw_request.headers.get("content-type") or "").split(";")[0].strip().lower()
+    read_frames = arrow_frames if content_type == ARROW_STREAM_MEDIA_TYPE else ndjson_frames
+    arrow_out = wants_arrow(raw_request.headers.get("accept"))
+
+    async def _body():
+        encoder = ArrowChunkEncoder() if arrow_out else None
+        rows_done, n_chunks = 0, 0
+        t0 = time.perf_counter()
+        frames = read_frames(raw_request.stream(), _STREAM_CHUNK_ROWS)
+        try:
+            async for df in frames:
+                preds = await _predict_stream_chunk(df)
+                rows_done += df.height
+                n_chunks += 1
+                _record_success("predict_stream", df.height)
+                with stage_timer("serialize"):
+                    chunk = encoder.encode(preds) if encoder else ndjson_lines(preds)
+                yield chunk
+            if encoder:
+                yield encoder.close()
+        except Exception as e:
+            _record_error("predict_stream", e)
+            if isinstance(e, ValueError):
+                _logger.warning(f"[{rid}] predict_stream ValueError após {rows_done} linhas: {e}")
+            else:
+                _logger.error(f"[{rid}] predict_stream ERRO após {rows_done} linhas: {e}", exc_info=True)
+            if not encoder:
+                yield ndjson_error(str(e), rows_done)
+            return
+        finally:
+            await frames.aclose()
+        _logger.info(
+            f"[{rid}] predict_stream: {rows_done} predições em {n_chunks} chunk(s) | "
+            f"total={(time.perf_counter() - t0) * 1000:.1f}ms"
+        )
+
+    return DuplexStreamingResponse(
+        _body(),
+        media_type=ARROW_STREAM_MEDIA_TYPE if arrow_out else NDJSON_MEDIA_TYPE,
+    )
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  ADMIN (hot reload)
+# ══════════════════════════════════════════════════════════════════════════════
+
+@app.post(
+    "/admin/reload",
+    response_model=ReloadResponse,
+    responses={
+        401: {"model": ErrorResponse, "description": "X-Admin-Token ausente ou inválido"},
+        409: {"model": ErrorResponse, "description": "Carga do modelo já em andamento"},
+    },
+    tags=["Admin"],
+)
+async def admin_reload(raw_request: Request, force: bool = False):
+    """
+    Recarrega o modelo do disco sem downtime.
+
+    O modelo novo (global + registro de segmentos) é carregado e aquecido com
+    lotes sintéticos em background enquanto o atual continua servindo; depois
+    a referência é trocada atomicamente. Requisições em curso terminam no
+    modelo antigo e o cache de predições é esvaziado. Sem mudança nos
+    artefatos (mesmo hash) nada é recarregado, exceto com ``force=true``.
+
+    Com pre-fork (``WEB_CONCURRENCY`` > 1) só o worker que atendeu recarrega —
+    use ``MODEL_RELOAD_WATCH_S`` para que todos acompanhem o disco.
+    """
+    _require_admin_token(raw_request)
+    try:
+        result = await asyncio.to_thread(_reload_model, "admin", force)
+    except ReloadInProgressError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return ReloadResponse(**result)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  LAG STORE (consumo horário recente)
+# ══════════════════════════════════════════════════════════════════════════════
+
+@app.post(
+    "/lags/ingest",
+    response_model=LagIngestResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Leituras inválidas"},
+        503: {"model": ErrorResponse, "description": "Lag store desativado (LAG_STORE=0) ou executor saturado"},
+    },
+    tags=["Lags"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"example": {
+                    "unit_id": [101, 101], "machine_type": ["splitao", "splitao"],
+                    "data": ["2025-07-03", "2025-07-03"], "hora": [12, 13],
+                    "consumo_kwh": [3.42, 3.87],
+                }},
+                ARROW_STREAM_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+                "application/vnd.apache.parquet": {"schema": {"type": "string", "format": "binary"}},
+            },
+        },
+    },
+)
+async def ingest_lags(raw_request: Request):
+    """
+    Registra o consumo horário medido por (unit_id, machine_type).
+
+    Corpo colunar JSON ``{coluna: [valores]}``, Arrow IPC ou Parquet com
+    ``unit_id``, ``machine_type``, ``data``, ``hora`` e ``consumo_kwh``.
+    Leituras da mesma unidade/hora (ex: um device por linha) entram pela
+    média. Predições com ``unit_id`` passam a usar as últimas 24 h.
+    """
+    rid = getattr(raw_request.state, "request_id", "no-id")
+    if _lag_store is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Lag store desativado ({_lag_store_off_reason})",
+        )
+    body = await raw_request.body()
+    content_type = raw_request.headers.get("content-type")
+
+    def _parse_and_ingest():
+        if (content_type or "").split(";")[0].strip().lower() == "application/json":
+            df = frame_from_columns(json.loads(body))
+        else:
+            df = frame_from_bytes(body, content_type)
+        return df.height, _lag_store.ingest(df)
+
+    try:
+        received, accepted = await _executor.run(_parse_and_ingest)
+    except ExecutorSaturatedError as e:
+        raise _saturated_exception(rid, "lags_ingest", e)
+    except ValueError as e:  # ColumnarValidationError, JSON e leituras inválidas
+        _logger.warning(f"[{rid}] /lags/ingest rejeitado: {e}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    _logger.info(f"[{rid}] /lags/ingest: {accepted}/{received} leituras aceitas")
+    return LagIngestResponse(
+        rows_received=received, rows_accepted=accepted, n_keys=_lag_store.n_keys,
+    )
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  JOBS (scoring em massa assíncrono)
+# ══════════════════════════════════════════════════════════════════════════════
+
+_PARQUET_MAGIC = b"PAR1"
+
+
+def _has_parquet_magic(path: Path) -> bool:
+    with path.open("rb") as fh:
+        head = fh.read(len(_PARQUET_MAGIC))
+        fh.seek(-len(_PARQUET_MAGIC), os.SEEK_END)
+        return head == fh.read(len(_PARQUET_MAGIC)) == _PARQUET_MAGIC
+
+
+def _upload_too_large() -> HTTPException:
+    # 413 literal: o nome da constante mudou entre versões do Starlette
+    return HTTPException(
+        status_code=413,
+        detail=f"Upload excede JOBS_MAX_UPLOAD_MB={_JOBS_MAX_UPLOAD_MB:g}",
+    )
+
+
+async def _save_upload(raw_request: Request, dest: Path) -> int:
+    """
+    Grava o corpo em ``dest`` em streaming (sem manter o upload em memória).
+
+    Raises:
+        HTTPException: 413 se o corpo passar de ``JOBS_MAX_UPLOAD_MB`` — pelo
+                       ``Content-Length`` antes de ler, ou no meio do stream
+                       (o ``.tmp`` parcial é apagado).
+    """
+    max_bytes = int(_JOBS_MAX_UPLOAD_MB * 1024 * 1024)
+    declared = raw_request.headers.get("content-length", "")
+    if max_bytes and declared.isdigit() and int(declared) > max_bytes:
+        raise _upload_too_large()
+
+    tmp = dest.with_name(dest.name + ".tmp")
+    size = 0
+    fh = await asyncio.to_thread(tmp.open, "wb")
+    try:
+        async for chunk in raw_request.stream():
+            if chunk:
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise _upload_too_large()
+                await asyncio.to_thread(fh.write, chunk)
+    except BaseException:
+        # Corpo acima do limite ou cliente desconectou no meio do upload
+        tmp.unlink(missing_ok=True)
+        raise
+    finally:
+        await asyncio.to_thread(fh.close)
+    if size < 2 * len(_PARQUET_MAGIC) or not await asyncio.to_thread(_has_parquet_magic, tmp):
+        tmp.unlink(missing_ok=True)
+        raise JobInputError("Corpo não é um arquivo Parquet")
+    os.replace(tmp, dest)
+    return size
+
+
+@app.post(
+    "/jobs",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={
+        400: {"model": ErrorResponse, "description": "Parquet inválido ou caminho não permitido"},
+        401: {"model": ErrorResponse, "description": "X-Admin-Token ausente ou inválido"},
+        413: {"model": ErrorResponse, "description": "Upload acima de JOBS_MAX_UPLOAD_MB"},
+    },
+    tags=["Jobs"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/vnd.apache.parquet": {"schema": {"type": "string", "format": "binary"}},
+                "application/json": {"example": {"path": "/data/portfolio_2025_07.parquet"}},
+            },
+        },
+    },
+)
+async def create_job(raw_request: Request):
+    """
+    Enfileira um job de scoring em massa (Parquet → Parquet de predições).
+
+    O corpo é um arquivo Parquet (gravado em ``JOBS_DIR``) ou um JSON
+    ``{"path": ...}`` apontando para um Parquet local ao servidor, dentro de
+    ``JOBS_INPUT_ROOTS``. O job roda em processos worker próprios, com
+    orçamento de CPU separado do tráfego online; acompanhe por
+    ``GET /jobs/{id}``. As predições (colunas de entrada + ``consumo_kwh``)
+    são gravadas ao lado da entrada, em ``*.predictions.parquet``.
+
+    Com ``ADMIN_TOKEN`` definido, todo ``/jobs`` exige ``X-Admin-Token``.
+    Jobs finalizados há mais de ``JOBS_RETENTION_S`` são apagados (estado,
+    upload e predições).
+    """
+    _require_admin_token(raw_request)
+    rid = getattr(raw_request.state, "request_id", "no-id")
+    runner = _jobs()
+    content_type = (raw_request.headers.get("content-type") or "").split(";")[0].strip().lower()
+    try:
+        if content_type == "application/json":
+            payload = JobRequest(**json.loads(await raw_request.body()))
+            job = runner.submit(resolve_input_path(payload.path, _JOBS_INPUT_ROOTS))
+        else:
+            job_id = runner.store.new_id()
+            upload = runner.store.upload_path(job_id)
+            size = await _save_upload(raw_request, upload)
+            job = runner.submit(upload, runner.store.create(upload, job_id))
+            _logger.info(f"[{rid}] upload de {size / 1e6:.1f} MB para o job {job.id}")
+    except ValueError as e:  # JobInputError, JSON e validação Pydantic
+        _logger.warning(f"[{rid}] POST /jobs rejeitado: {e}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return _job_response(job)
+
+
+@app.get(
+    "/jobs",
+    response_model=list[JobResponse],
+    responses={401: {"model": ErrorResponse, "description": "X-Admin-Token ausente ou inválido"}},
+    tags=["Jobs"],
+)
+async def list_jobs(raw_request: Request):
+    """Todos os jobs conhecidos em ``JOBS_DIR``, do mais antigo ao mais recente."""
+    _require_admin_token(raw_request)
+    runner = _jobs()
+    return [_job_response(runner.get(j.id) or j) for j in runner.store.list()]
+
+
+@app.get(
+    "/jobs/{job_id}",
+    response_model=JobResponse,
+    responses={
+        401: {"model": ErrorResponse, "description": "X-Admin-Token ausente ou inválido"},
+        404: {"model": ErrorResponse, "description": "Job inexistente"},
+    },
+    tags=["Jobs"],
+)
+async def get_job(job_id: str, raw_request: Request):
+    """Estado, progresso (fração e linhas) e vazão (linhas/s) de um job."""
+    _require_admin_token(raw_request)
+    job = _jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} não encontrado")
+    return _job_response(job)
+
+
+@app.get(
+    "/jobs/{job_id}/result",
+    response_class=FileResponse,
+    responses={
+        200: {"content": {"application/vnd.apache.parquet": {}}},
+        401: {"model": ErrorResponse, "description": "X-Admin-Token ausente ou inválido"},
+        404: {"model": ErrorResponse, "description": "Job inexistente"},
+        409: {"model": ErrorResponse, "description": "Job ainda não concluído com sucesso"},
+    },
+    tags=["Jobs"],
+)
+async def get_job_result(job_id: str, raw_request: Request):
+    """Download do Parquet de predições de um job concluído."""
+    _require_admin_token(raw_request)
+    job = _jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} não encontrado")
+    if job.status != JOB_SUCCEEDED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job {job_id} está '{job.status}'" + (f": {job.error}" if job.error else ""),
+        )
+    return FileResponse(
+        job.output_path,
+        media_type="application/vnd.apache.parquet",
+        filename=Path(job.output_path).name,
+    )
+
+
+@app.get("/stats", tags=["Health"])
+async def stats():
+    """
+    Estatísticas operacionais para tuning de throughput × latência p99.
+
+    ``batching`` reporta a janela/tamanho configurados do micro-batching de
+    /predict e os tamanhos de lote efetivamente realizados. ``executor``
+    reporta profundidade da fila, rejeições e tempos de espera/execução
+    do pool de inferência — base para dimensionar réplicas. ``segments``
+    lista os modelos por tipo de máquina residentes e a memória estimada;
+    ``cache`` reporta hits/misses do cache de predições; ``model`` a versão
+    servida e o resultado do último hot reload; ``lags`` o tamanho do lag store.
+    """
+    return {
+        "batching": {"enabled": _COALESCE_ENABLED, **_coalescer.stats()},
+        "executor": _executor.stats(),
+        "cache": (
+            {"enabled": True, **_prediction_cache.stats()}
+            if _prediction_cache is not None
+            else {"enabled": False}
+        ),
+        "model": {
+            "version": _serving.version if _serving is not None else None,
+            "loaded_at": _serving.loaded_at if _serving is not None else None,
+            "last_reload": _last_reload or None,
+        },
+        "segments": (
+            {"enabled": True, **_serving.registry.stats()}
+            if _serving is not None and _serving.registry is not None
+            else {"enabled": False}
+        ),
+        "lags": (
+            {"enabled": True, **_lag_store.stats()}
+            if _lag_store is not None
+            else {"enabled": False}
+        ),
+    }
+
+
+@app.get("/metrics", tags=["Health"], response_class=Response)
+async def metrics():
+    """
+    Métricas no formato texto do Prometheus.
+
+    Histogramas por estágio da inferência (``derive``, ``geo_lookup``,
+    ``schema_transform``, ``model_predict``, ``serialize``) e por rota HTTP,
+    tamanhos de lote, linhas preditas, erros por tipo e tempo de carga do
+    modelo — para separar regressões de pré-processamento polars das do
+    TensorFlow.
+    """
+    return Response(content=REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/", tags=["Info"])
 async def root():
     """Informações gerais da API."""
@@ -515,9 +1888,20 @@ async def root():
         "version": "1.0.0",
         "docs": "/docs",
         "health": "/health",
+        "ready": "/ready",
+        "stats": "/stats",
+        "metrics": "/metrics",
         "endpoints": {
             "predict": "POST /predict",
             "predict_batch": "POST /predict_batch",
+            "predict_columnar": "POST /predict_columnar",
+            "predict_arrow": "POST /predict_arrow",
+            "predict_stream": "POST /predict_stream",
+            "predict_scenarios": "POST /predict_scenarios",
+            "jobs": "POST /jobs",
+            "job_status": "GET /jobs/{id}",
+            "reload": "POST /admin/reload",
+            "lags_ingest": "POST /lags/ingest",
         },
     }
 
@@ -606,6 +1990,10 @@ if __name__ == "__main__":
             print(f"  status       : {h.get('status')}")
             print(f"  model_loaded : {h.get('model_loaded')}")
             print(f"  artifact_path: {h.get('artifact_path')}")
+            print(f"  model_version: {h.get('model_version')}")
+        r = _req_test("GET", "/ready")
+        if r:
+            print(f"  ready        : {r.json().get('status')}  warm-up={r.json().get('warmup_ms')}")
 
         # ── POST /predict ─────────────────────────────────────────────────────
         print("\n" + "─" * W)
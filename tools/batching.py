@@ -0,0 +1,233 @@
+"""
+Micro-batching — Coalescência de requisições unitárias de /predict
+===================================================================
+
+Sob carga, clientes disparam milhares de chamadas ``/predict`` de um único
+registro por minuto. Cada uma paga FeatureDeriver + ModelSchema +
+``model.predict`` sozinha. O ``MicroBatchCoalescer`` agrupa as requisições
+concorrentes que chegam dentro de uma janela curta (ex: 2–5 ms) ou até
+``max_batch_size`` registros, executa **uma** normalização vetorizada +
+**um** forward pass Keras e devolve a predição de cada linha ao seu
+awaiter original.
+
+Fluxo:
+
+    req A ─┐
+    req B ─┼─► buffer ──(janela expira OU buffer cheio)──► flush
+    req C ─┘                                                 │
+                                   pl.DataFrame (n linhas) ◄─┘
+                                              │
+                                   predict_fn(df) → np.ndarray (n,)
+                                              │
+                    future A ◄── preds[0]     │
+                    future B ◄── preds[1] ◄───┘
+                    future C ◄── preds[2]
+
+Se o lote falha (ex: uma linha com data inválida), cada registro é
+re-executado individualmente para que apenas o registro problemático
+receba a exceção — os demais seguem com sucesso.
+
+Uso:
+    >>> coalescer = MicroBatchCoalescer(api.predict, max_wait_ms=3, max_batch_size=64)
+    >>> pred = await coalescer.submit({"hora": 14, "data": "2025-07-03", ...})
+    >>> coalescer.stats()["mean_batch_size"]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Awaitable, Callable
+
+import numpy as np
+import polars as pl
+
+_logger = logging.getLogger(__name__)
+
+
+class MicroBatchCoalescer:
+    """
+    Agrupa requisições unitárias concorrentes em lotes vetorizados.
+
+    Attributes:
+        predict_fn     : Função bloqueante ``pl.DataFrame → np.ndarray`` (ex:
+                         ``HVACDLInferenceAPI.predict``).
+        max_wait_ms    : Janela máxima (ms) que o primeiro registro do lote
+                         espera por companheiros antes do flush.
+        max_batch_size : Nº máximo de registros por lote (flush imediato ao atingir).
+        run_blocking   : Executor assíncrono da chamada bloqueante. Por padrão
+                         usa o thread pool do event loop, liberando o loop
+                         durante a inferência.
+        passthrough_errors : Exceções repassadas a todo o lote sem re-execução
+                         linha a linha (ex: executor saturado).
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[pl.DataFrame], np.ndarray],
+        max_wait_ms: float = 3.0,
+        max_batch_size: int = 64,
+        run_blocking: Callable[..., Awaitable] | None = None,
+        passthrough_errors: tuple[type[BaseException], ...] = (),
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size deve ser >= 1")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms deve ser >= 0")
+
+        self.predict_fn     = predict_fn
+        self.max_wait_ms    = float(max_wait_ms)
+        self.max_batch_size = int(max_batch_size)
+        self.run_blocking   = run_blocking
+        self.passthrough_errors = passthrough_errors
+
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        # Referências fortes às tasks de flush (o loop só guarda weakrefs)
+        self._tasks: set[asyncio.Task] = set()
+
+        # Estatísticas de tamanho de lote realizado (para tuning throughput × p99)
+        self._stats_lock = threading.Lock()
+        self._batch_sizes: Counter[int] = Counter()
+        self._n_batches = 0
+        self._n_records = 0
+        self._n_fallbacks = 0
+        self._last_batch_size = 0
+        self._max_seen = 0
+
+    # ── API pública ──────────────────────────────────────────────────────
+
+    async def submit(self, record: dict) -> float:
+        """
+        Enfileira um registro e aguarda sua predição.
+
+        Args:
+            record: Dict com as colunas de input no schema do normalizer
+                    (hora, data, machine_type, latitude, longitude, clima).
+
+        Returns:
+            float: Predição de consumo em kWh para o registro.
+        """
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        self._pending.append((record, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush_now()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(
+                self.max_wait_ms / 1000.0, self._flush_now,
+            )
+
+        return await future
+
+    def stats(self) -> dict[str, object]:
+        """
+        Retorna estatísticas de coalescência para tuning.
+
+        Returns:
+            dict com:
+                - ``"max_wait_ms"``       : janela configurada
+                - ``"max_batch_size"``    : limite configurado
+                - ``"n_batches"``         : lotes executados
+                - ``"n_records"``         : registros atendidos
+                - ``"mean_batch_size"``   : tamanho médio realizado
+                - ``"last_batch_size"``   : tamanho do último lote
+                - ``"max_batch_seen"``    : maior lote realizado
+                - ``"n_fallbacks"``       : lotes re-executados linha a linha após erro
+                - ``"batch_size_counts"`` : {tamanho: nº de lotes}
+        """
+        with self._stats_lock:
+            mean = self._n_records / self._n_batches if self._n_batches else 0.0
+            return {
+                "max_wait_ms":       self.max_wait_ms,
+                "max_batch_size":    self.max_batch_size,
+                "n_batches":         self._n_batches,
+                "n_records":         self._n_records,
+                "mean_batch_size":   round(mean, 3),
+                "last_batch_size":   self._last_batch_size,
+                "max_batch_seen":    self._max_seen,
+                "n_fallbacks":       self._n_fallbacks,
+                "batch_size_counts": dict(sorted(self._batch_sizes.items())),
+            }
+
+    # ── Internos ─────────────────────────────────────────────────────────
+
+    def _flush_now(self) -> None:
+        """Retira o buffer atual e agenda sua execução como um único lote."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_blocking(self, fn: Callable, *args):
+        if self.run_blocking is not None:
+            return await self.run_blocking(fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def _run_batch(self, batch: list[tuple[dict, asyncio.Future]]) -> None:
+        """Executa um lote e distribui os resultados aos awaiters."""
+        n = len(batch)
+        self._record_batch(n)
+
+        records = [rec for rec, _ in batch]
+        t0 = time.perf_counter()
+        try:
+            preds = await self._run_blocking(self._predict_records, records)
+        except Exception as exc:
+            if n == 1 or isinstance(exc, self.passthrough_errors):
+                for _, fut in batch:
+                    _set_exception(fut, exc)
+                return
+            # Isola a(s) linha(s) problemática(s): re-executa individualmente
+            _logger.warning(
+                "Micro-batch de %d registros falhou (%s: %s) — re-executando linha a linha",
+                n, type(exc).__name__, exc,
+            )
+            with self._stats_lock:
+                self._n_fallbacks += 1
+            for rec, fut in batch:
+                try:
+                    pred = await self._run_blocking(self._predict_records, [rec])
+                    _set_result(fut, float(pred[0]))
+                except Exception as row_exc:
+                    _set_exception(fut, row_exc)
+            return
+
+        _logger.debug(
+            "Micro-batch: %d registros em %.1fms",
+            n, (time.perf_counter() - t0) * 1000,
+        )
+        for (_, fut), pred in zip(batch, preds):
+            _set_result(fut, float(pred))
+
+    def _predict_records(self, records: list[dict]) -> np.ndarray:
+        df = pl.DataFrame(records).with_columns(pl.col("data").cast(pl.Date))
+        return self.predict_fn(df)
+
+    def _record_batch(self, n: int) -> None:
+        with self._stats_lock:
+            self._batch_sizes[n] += 1
+            self._n_batches += 1
+            self._n_records += n
+            self._last_batch_size = n
+            self._max_seen = max(self._max_seen, n)
+
+
+def _set_result(fut: asyncio.Future, value: float) -> None:
+    # O awaiter pode ter sido cancelado (ex: cliente desconectou)
+    if not fut.done():
+        fut.set_result(value)
+
+
+def _set_exception(fut: asyncio.Future, exc: BaseException) -> None:
+    if not fut.done():
+        fut.set_exception(exc)
@@ -0,0 +1,292 @@
+"""
+Columnar — Payloads colunares (JSON / Arrow IPC / Parquet) para predição em lote
+================================================================================
+
+``/predict_batch`` valida uma ``list[PredictionRequest]`` objeto a objeto via
+Pydantic e depois reconstrói 13 listas Python antes de criar o DataFrame —
+em lotes de 50k linhas, parsing + validação dominam o tempo de inferência.
+
+Este módulo recebe os dados **já em colunas** e os entrega direto ao polars:
+
+    JSON  {"hora": [...], "data": [...], ...}   ─► pl.DataFrame(dict)
+    Arrow IPC (stream ou file)                  ─► pl.read_ipc / read_ipc_stream
+    Parquet                                     ─► pl.read_parquet
+                                                        │
+                                        validate_frame() — checagens vetorizadas
+                                        (mesmos ge/le de PredictionRequest)
+                                                        │
+                                        DataFrame no schema do normalizer
+
+Nomes de coluna aceitos: os do contrato da API (``temperatura_c``,
+``umidade_relativa_pct``, ...) ou os do normalizer (``Temperatura_C``,
+``Umidade_Relativa_%``, ...).
+
+Uso:
+    >>> bounds = field_bounds(PredictionRequest)
+    >>> df = validate_frame(frame_from_columns(payload), bounds)
+    >>> body = predictions_to_arrow(preds)
+"""
+
+from __future__ import annotations
+
+import io
+import math
+
+import numpy as np
+import polars as pl
+
+# ── Content types ────────────────────────────────────────────────────────────
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+ARROW_FILE_MEDIA_TYPE = "application/vnd.apache.arrow.file"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+# Nome no contrato da API → nome esperado pelo normalizer
+API_TO_FRAME_COLUMNS: dict[str, str] = {
+    "hora":                    "hora",
+    "data":                    "data",
+    "machine_type":            "machine_type",
+    "latitude":                "latitude",
+    "longitude":               "longitude",
+    "temperatura_c":           "Temperatura_C",
+    "temperatura_percebida_c": "Temperatura_Percebida_C",
+    "umidade_relativa_pct":    "Umidade_Relativa_%",
+    "precipitacao_mm":         "Precipitacao_mm",
+    "velocidade_vento_kmh":    "Velocidade_Vento_kmh",
+    "pressao_superficial_hpa": "Pressao_Superficial_hPa",
+    "irradiancia_direta_wm2":  "Irradiancia_Direta_Wm2",
+    "irradiancia_difusa_wm2":  "Irradiancia_Difusa_Wm2",
+}
+
+_FRAME_DTYPES: dict[str, pl.DataType] = {
+    "hora":                    pl.Int64,
+    "machine_type":            pl.Utf8,
+    "latitude":                pl.Float64,
+    "longitude":               pl.Float64,
+    "Temperatura_C":           pl.Float64,
+    "Temperatura_Percebida_C": pl.Float64,
+    "Umidade_Relativa_%":      pl.Float64,
+    "Precipitacao_mm":         pl.Float64,
+    "Velocidade_Vento_kmh":    pl.Float64,
+    "Pressao_Superficial_hPa": pl.Float64,
+    "Irradiancia_Direta_Wm2":  pl.Float64,
+    "Irradiancia_Difusa_Wm2":  pl.Float64,
+}
+
+# Colunas opcionais mantidas no lote (nulos permitidos): ``unit_id`` identifica
+# a unidade no lag store (tools/lag_store.py)
+OPTIONAL_FRAME_COLUMNS: dict[str, pl.DataType] = {
+    "unit_id": pl.Int64,
+}
+
+# Schema no contrato da API (usado para parsing tipado de NDJSON)
+API_SCHEMA: dict[str, pl.DataType] = {
+    **{
+        api: (pl.Utf8 if frame == "data" else _FRAME_DTYPES[frame])
+        for api, frame in API_TO_FRAME_COLUMNS.items()
+    },
+    **OPTIONAL_FRAME_COLUMNS,
+}
+
+
+class ColumnarValidationError(ValueError):
+    """Payload colunar inválido (colunas ausentes, tipos ou faixas)."""
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  LIMITES (espelham Field(ge/le) do modelo Pydantic)
+# ══════════════════════════════════════════════════════════════════════════════
+
+def field_bounds(model: type) -> dict[str, tuple[float, float]]:
+    """
+    Extrai os limites ``ge``/``le`` dos campos de um modelo Pydantic.
+
+    Mantém as checagens vetorizadas sincronizadas com ``PredictionRequest``
+    sem duplicar os números.
+
+    Returns:
+        {coluna_do_normalizer: (lower, upper)} — ``±inf`` quando não há limite.
+    """
+    bounds: dict[str, tuple[float, float]] = {}
+    for name, info in model.model_fields.items():
+        lower, upper = -math.inf, math.inf
+        for meta in info.metadata:
+            if getattr(meta, "ge", None) is not None:
+                lower = float(meta.ge)
+            if getattr(meta, "le", None) is not None:
+                upper = float(meta.le)
+        if lower != -math.inf or upper != math.inf:
+            bounds[API_TO_FRAME_COLUMNS.get(name, name)] = (lower, upper)
+    return bounds
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  PARSING
+# ══════════════════════════════════════════════════════════════════════════════
+
+def frame_from_columns(payload: dict) -> pl.DataFrame:
+    """
+    Constrói o DataFrame a partir de ``{coluna: [valores]}``.
+
+    Raises:
+        ColumnarValidationError: Payload não é um objeto de arrays de mesmo tamanho.
+    """
+    if not isinstance(payload, dict) or not payload:
+        raise ColumnarValidationError("Payload colunar deve ser um objeto {coluna: [valores]}")
+    lengths = {k: len(v) for k, v in payload.items() if isinstance(v, list)}
+    if len(lengths) != len(payload):
+        bad = sorted(set(payload) - set(lengths))
+        raise ColumnarValidationError(f"Colunas devem ser arrays: {bad}")
+    if len(set(lengths.values())) > 1:
+        raise ColumnarValidationError(f"Colunas com tamanhos diferentes: {lengths}")
+    try:
+        return pl.DataFrame(payload, strict=False)
+    except Exception as exc:
+        raise ColumnarValidationError(f"Payload colunar inválido: {exc}") from exc
+
+
+def frame_from_bytes(body: bytes, content_type: str | None = None) -> pl.DataFrame:
+    """
+    Lê um corpo binário Arrow IPC (stream/file) ou Parquet.
+
+    O formato é inferido do ``Content-Type`` e, na ausência dele, dos
+    magic bytes (``PAR1`` / ``ARROW1``).
+
+    Raises:
+        ColumnarValidationError: Formato não reconhecido ou corpo corrompido.
+    """
+    ctype = (content_type or "").split(";")[0].strip().lower()
+    buf = io.BytesIO(body)
+    try:
+        if ctype == PARQUET_MEDIA_TYPE or body[:4] == b"PAR1":
+            return pl.read_parquet(buf)
+        if ctype == ARROW_FILE_MEDIA_TYPE or body[:6] == b"ARROW1":
+            return pl.read_ipc(buf, memory_map=False)
+        if ctype in (ARROW_STREAM_MEDIA_TYPE, "application/octet-stream", ""):
+            return pl.read_ipc_stream(buf)
+    except Exception as exc:
+        raise ColumnarValidationError(f"Corpo binário ilegível: {exc}") from exc
+    raise ColumnarValidationError(
+        f"Content-Type não suportado: {content_type!r}. Use "
+        f"{ARROW_STREAM_MEDIA_TYPE}, {ARROW_FILE_MEDIA_TYPE} ou {PARQUET_MEDIA_TYPE}."
+    )
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  VALIDAÇÃO VETORIZADA
+# ══════════════════════════════════════════════════════════════════════════════
+
+def validate_frame(
+    df: pl.DataFrame,
+    bounds: dict[str, tuple[float, float]],
+) -> pl.DataFrame:
+    """
+    Normaliza nomes/tipos e valida o lote inteiro com expressões polars.
+
+    Etapas (todas colunares, sem laço por linha):
+        1. Renomeia colunas do contrato da API para o schema do normalizer
+        2. Verifica presença das 13 colunas obrigatórias
+        3. Converte tipos (``data`` → pl.Date, numéricos → Int64/Float64),
+           rejeitando ``hora`` não inteira (o cast truncaria 14.7 → 14)
+        4. Rejeita nulos e valores fora de ``bounds`` — um único ``select``
+
+    Colunas de ``OPTIONAL_FRAME_COLUMNS`` presentes são mantidas (após as 13).
+
+    Returns:
+        DataFrame com as 13 colunas no schema do normalizer (+ opcionais presentes).
+
+    Raises:
+        ColumnarValidationError: Descreve coluna, nº de violações e primeira linha.
+    """
+    rename = {
+        c: API_TO_FRAME_COLUMNS[c]
+        for c in df.columns
+        if c in API_TO_FRAME_COLUMNS and API_TO_FRAME_COLUMNS[c] != c
+    }
+    if rename:
+        df = df.rename(rename)
+
+    required = list(API_TO_FRAME_COLUMNS.values())
+    optional = [c for c in OPTIONAL_FRAME_COLUMNS if c in df.columns]
+    missing = [c for c in required if c not in df.columns]
+    if missing:
+        raise ColumnarValidationError(f"Colunas obrigatórias ausentes: {missing}")
+    if df.height == 0:
+        raise ColumnarValidationError("Lote vazio")
+    if df.schema["hora"].is_float():
+        # Mesmo contrato de PredictionRequest.hora: int (422 para 14.7)
+        fractional = (pl.col("hora") != pl.col("hora").floor()).fill_null(False)
+        bad = df.select(fractional).to_series().to_numpy()
+        if bad.any():
+            raise ColumnarValidationError(
+                f"hora: {int(bad.sum())} valor(es) não inteiro(s) (primeira linha={int(np.argmax(bad))})"
+            )
+
+    try:
+        data_expr = (
+            pl.col("data")
+            if df.schema["data"] == pl.Date
+            else pl.col("data").cast(pl.Utf8).str.to_date("%Y-%m-%d")
+        )
+        df = df.select(
+            pl.col("hora").cast(pl.Int64),
+            data_expr.alias("data"),
+            *[
+                pl.col(c).cast(dt)
+                for c, dt in _FRAME_DTYPES.items()
+                if c != "hora"
+            ],
+            *[pl.col(c).cast(OPTIONAL_FRAME_COLUMNS[c]) for c in optional],
+        ).select(required + optional)
+    except Exception as exc:
+        raise ColumnarValidationError(f"Tipos inválidos: {exc}") from exc
+
+    # Contagem de violações por coluna em uma única passada
+    checks: list[pl.Expr] = [
+        pl.col(c).is_null().sum().alias(f"{c}|null") for c in required
+    ]
+    for c, (lower, upper) in bounds.items():
+        if c in df.columns:
+            checks.append(_out_of_range(df, c, lower, upper).sum().alias(f"{c}|range"))
+    counts = df.select(checks).row(0, named=True)
+    failures = {k: v for k, v in counts.items() if v}
+    if failures:
+        details = []
+        for key, n in failures.items():
+            col, kind = key.split("|")
+            if kind == "null":
+                bad = pl.col(col).is_null()
+                what = "nulo(s)"
+            else:
+                lower, upper = bounds[col]
+                bad = _out_of_range(df, col, lower, upper)
+                what = f"fora de [{lower:g}, {upper:g}]"
+            first = int(np.argmax(df.select(bad.fill_null(False)).to_series().to_numpy()))
+            details.append(f"{col}: {n} valor(es) {what} (primeira linha={first})")
+        raise ColumnarValidationError("; ".join(details))
+
+    return df
+
+
+def _out_of_range(df: pl.DataFrame, col: str, lower: float, upper: float) -> pl.Expr:
+    """Máscara de violação de faixa (NaN conta como violação em colunas float)."""
+    expr = (pl.col(col) < lower) | (pl.col(col) > upper)
+    if df.schema[col] in (pl.Float32, pl.Float64):
+        expr = expr | pl.col(col).is_nan()
+    return expr
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  RESPOSTA
+# ══════════════════════════════════════════════════════════════════════════════
+
+def predictions_to_arrow(preds: np.ndarray) -> bytes:
+    """Serializa as predições como Arrow IPC stream (coluna ``consumo_kwh``)."""
+    buf = io.BytesIO()
+    pl.DataFrame({"consumo_kwh": np.asarray(preds, dtype=np.float64)}).write_ipc_stream(buf)
+    return buf.getvalue()
+
+
+def wants_arrow(accept: str | None) -> bool:
+    """True se o cliente pediu a resposta em Arrow IPC via header ``Accept``."""
+    return bool(accept) and ARROW_STREAM_MEDIA_TYPE in accept.lower()
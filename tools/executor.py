@@ -0,0 +1,199 @@
+"""
+Inference Executor — Pool dedicado com concorrência limitada e backpressure
+===========================================================================
+
+Os endpoints de predição são ``async def``, mas ``HVACDLInferenceAPI.predict``
+é bloqueante (polars + TensorFlow). Chamado direto no event loop, um lote
+grande congela o uvicorn e o ``/health`` do Railway começa a estourar timeout.
+
+O ``InferenceExecutor`` tira a inferência do event loop:
+
+    endpoint ──► run(fn, *args) ──► admissão ──► ThreadPoolExecutor(max_workers)
+                                       │
+                        em voo ≥ max_workers + max_queue
+                                       │
+                                       ▼
+                            ExecutorSaturatedError  → HTTP 503 + Retry-After
+
+Threads (e não processos) porque polars e TensorFlow liberam o GIL durante o
+trabalho pesado e o modelo carregado é compartilhado sem cópia.
+
+Observabilidade (``stats()``): profundidade da fila, workers ocupados,
+rejeições e tempos de espera na fila / execução (média, p50, p99, máx)
+sobre uma janela das últimas execuções — para dimensionar réplicas.
+
+Uso:
+    >>> executor = InferenceExecutor(max_workers=4, max_queue=32)
+    >>> preds = await executor.run(api.predict, df)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import numpy as np
+
+_logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """
+    Fila do executor cheia — a requisição foi rejeitada sem executar.
+
+    Attributes:
+        retry_after_s : Sugestão de espera (s) para o header ``Retry-After``.
+    """
+
+    def __init__(self, message: str, retry_after_s: float) -> None:
+        super().__init__(message)
+        self.retry_after_s = retry_after_s
+
+
+class InferenceExecutor:
+    """
+    Thread pool dedicado à inferência com fila limitada.
+
+    Attributes:
+        max_workers   : Execuções simultâneas de inferência.
+        max_queue     : Tarefas que podem aguardar além das em execução.
+                        Acima disso, ``run()`` rejeita com ExecutorSaturatedError.
+        retry_after_s : Valor sugerido de ``Retry-After`` ao rejeitar.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_queue: int = 32,
+        retry_after_s: float = 1.0,
+        window: int = 1024,
+    ) -> None:
+        if max_workers < 1:
+            raise ValueError("max_workers deve ser >= 1")
+        if max_queue < 0:
+            raise ValueError("max_queue deve ser >= 0")
+
+        self.max_workers   = int(max_workers)
+        self.max_queue     = int(max_queue)
+        self.retry_after_s = float(retry_after_s)
+
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="inference",
+        )
+        self._lock = threading.Lock()
+        self._in_flight = 0      # na fila + executando
+        self._running = 0
+        self._n_submitted = 0
+        self._n_completed = 0
+        self._n_failed = 0
+        self._n_rejected = 0
+        self._wait_ms: deque[float] = deque(maxlen=window)
+        self._exec_ms: deque[float] = deque(maxlen=window)
+
+    # ── API pública ──────────────────────────────────────────────────────
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Executa ``fn(*args)`` no pool e aguarda o resultado sem bloquear o loop.
+
+        ``fn`` roda com uma cópia dos ``contextvars`` de quem chamou (como em
+        ``asyncio.to_thread``).
+
+        Raises:
+            ExecutorSaturatedError: Se a fila estiver cheia.
+        """
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self._n_rejected += 1
+                raise ExecutorSaturatedError(
+                    f"Executor de inferência saturado "
+                    f"({self._in_flight} tarefas em voo, limite "
+                    f"{self.max_workers + self.max_queue})",
+                    self.retry_after_s,
+                )
+            self._in_flight += 1
+            self._n_submitted += 1
+
+        submitted_at = time.perf_counter()
+        ctx = contextvars.copy_context()
+        try:
+            future = self._pool.submit(ctx.run, self._execute, submitted_at, fn, *args)
+        except BaseException:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict[str, object]:
+        """
+        Retorna o estado atual do executor.
+
+        Returns:
+            dict com:
+                - ``"max_workers"`` / ``"max_queue"`` : limites configurados
+                - ``"queue_depth"``  : tarefas aguardando worker
+                - ``"running"``      : tarefas em execução
+                - ``"submitted"`` / ``"completed"`` / ``"failed"`` / ``"rejected"``
+                - ``"wait_ms"``      : {mean, p50, p99, max} do tempo na fila
+                - ``"exec_ms"``      : {mean, p50, p99, max} do tempo de execução
+        """
+        with self._lock:
+            wait = np.fromiter(self._wait_ms, dtype=np.float64)
+            exe = np.fromiter(self._exec_ms, dtype=np.float64)
+            return {
+                "max_workers": self.max_workers,
+                "max_queue":   self.max_queue,
+                "queue_depth": self._in_flight - self._running,
+                "running":     self._running,
+                "submitted":   self._n_submitted,
+                "completed":   self._n_completed,
+                "failed":      self._n_failed,
+                "rejected":    self._n_rejected,
+                "wait_ms":     _summary(wait),
+                "exec_ms":     _summary(exe),
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Encerra o pool (tarefas em execução terminam se ``wait=True``)."""
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+
+    # ── Internos ─────────────────────────────────────────────────────────
+
+    def _execute(self, submitted_at: float, fn: Callable[..., Any], *args: Any) -> Any:
+        started_at = time.perf_counter()
+        with self._lock:
+            self._running += 1
+            self._wait_ms.append((started_at - submitted_at) * 1000)
+        ok = False
+        try:
+            result = fn(*args)
+            ok = True
+            return result
+        finally:
+            elapsed_ms = (time.perf_counter() - started_at) * 1000
+            with self._lock:
+                self._running -= 1
+                self._in_flight -= 1
+                self._exec_ms.append(elapsed_ms)
+                if ok:
+                    self._n_completed += 1
+                else:
+                    self._n_failed += 1
+
+
+def _summary(arr: np.ndarray) -> dict[str, float]:
+    """Resumo {mean, p50, p99, max} em ms (zeros se não houver amostras)."""
+    if arr.size == 0:
+        return {"mean": 0.0, "p50": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "mean": round(float(arr.mean()), 3),
+        "p50":  round(float(np.percentile(arr, 50)), 3),
+        "p99":  round(float(np.percentile(arr, 99)), 3),
+        "max":  round(float(arr.max()), 3),
+    }
@@ -0,0 +1,86 @@
+"""
+Orçamento de import — consumidores só-ML não carregam TensorFlow
+================================================================
+
+Quem usa apenas ``HVACMLInferenceAPI`` (segmentos LightGBM/XGBoost, scripts
+batch, ``testing/ml_model.py``) não deve pagar o import do TensorFlow
+(segundos e centenas de MB de RSS) nem o de sklearn/scipy. Os frameworks
+pesados são importados por backend, no primeiro uso:
+
+    tensorflow  → HVACDLInferenceAPI(engine="keras") / BucketedKerasPredictor
+    joblib, lightgbm, xgboost → HVACMLInferenceAPI / MLNormalizer.from_artifact
+
+Este módulo mede cada import em um interpretador novo (sem cache de módulos)
+e falha se passar do orçamento ou se carregar algum módulo proibido. Rodar
+antes de publicar mudanças em ``tools/``:
+
+    python -m tools.import_budget                 # exit 1 se estourar
+    python -m tools.import_budget --max-s 0.5 --repeats 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parent.parent
+
+# Imports verificados: nenhum deles pode carregar os frameworks de FORBIDDEN_MODULES
+BUDGET_IMPORTS: tuple[str, ...] = (
+    "from tools.inference_runner import HVACMLInferenceAPI",
+    "from tools.normalizer import MLNormalizer",
+)
+FORBIDDEN_MODULES: tuple[str, ...] = ("tensorflow", "keras", "sklearn", "lightgbm", "xgboost")
+DEFAULT_MAX_S = 1.0
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"seconds": elapsed, "modules": sorted({{m.split(".")[0] for m in sys.modules}})}}))
+"""
+
+
+def measure_import(statement: str, repeats: int = 3) -> dict:
+    """
+    Executa ``statement`` em ``repeats`` interpretadores novos.
+
+    Returns:
+        dict com ``seconds`` (melhor tempo — a 1ª execução inclui o cache de
+        disco frio) e ``forbidden`` (módulos de ``FORBIDDEN_MODULES`` carregados).
+    """
+    best, forbidden = float("inf"), set()
+    for _ in range(max(1, repeats)):
+        proc = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(statement=statement)],
+            cwd=_ROOT, capture_output=True, text=True, check=True,
+        )
+        probe = json.loads(proc.stdout.strip().splitlines()[-1])
+        best = min(best, probe["seconds"])
+        forbidden |= set(FORBIDDEN_MODULES) & set(probe["modules"])
+    return {"seconds": best, "forbidden": sorted(forbidden)}
+
+
+def check(max_s: float = DEFAULT_MAX_S, repeats: int = 3) -> bool:
+    """Mede cada import de ``BUDGET_IMPORTS``; imprime o resultado e diz se todos passaram."""
+    ok = True
+    for statement in BUDGET_IMPORTS:
+        result = measure_import(statement, repeats)
+        passed = result["seconds"] <= max_s and not result["forbidden"]
+        ok &= passed
+        extra = f"  carregou: {', '.join(result['forbidden'])}" if result["forbidden"] else ""
+        print(f"  {'OK ' if passed else 'FALHA'}  {result['seconds'] * 1000:>7.0f} ms  {statement}{extra}")
+    print(f"\n  orçamento: {max_s * 1000:.0f} ms, sem {', '.join(FORBIDDEN_MODULES)}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Orçamento de import dos consumidores só-ML")
+    parser.add_argument("--max-s", type=float, default=DEFAULT_MAX_S, help="Tempo máximo por import (s)")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    sys.exit(0 if check(args.max_s, args.repeats) else 1)
@@ -6,7 +6,7 @@ Fornece interface simples para predições com normalização automática
 usando o DLNormalizer integrado em tools/normalizer.py.
 
 **NOVO (Message 13):** predict_single() agora permite inferencia com valores
-manuais, derivando automaticamente grupo_regional via BallTree Haversine
+manuais, derivando automaticamente grupo_regional via grade geográfica (Haversine)
 do arquivo geo_reference.parquet (sem re-treinamento DBSCAN).
 
 **REFATORAÇÃO (Message 15):** inference_api.py substitui predictor.py.
@@ -17,10 +17,11 @@ HVACPredictor é agora um alias para HVACInferenceAPI para compatibilidade.
 
 Fluxo:
   1. DLNormalizer.from_artifact() carrega metadata do treinamento
-  2. Carrega modelo keras_model.keras
+  2. Carrega modelo keras_model.keras (ou numpy_model.npz com engine="numpy")
   3. DLNormalizer.transform() normaliza dados (com auto-feature derivation via lat/lon)
      - Lê geo_reference.parquet (use_case\files\) para atribuir grupo_regional
-  4. model.predict(inputs) executa inferencia
+  4. model.predict(inputs) executa inferencia (lotes ate 512 linhas: tf.function
+     com buckets de BucketedKerasPredictor, sem o overhead do Model.predict)
   5. Retorna predicoes (kWh)
 
 Uso como modulo:
@@ -41,6 +42,11 @@ Uso como modulo:
   >>> # Predicao em batch
   >>> predictions = api.predict(df_batch)
 
+DL + ML com uma única derivação de features (ensemble):
+  >>> ens = HVACEnsembleInferenceAPI("model/artifacts/dl_hvac/global",
+  ...                                "model/artifacts/ml_hvac/global", dl_weight=0.5)
+  >>> result = ens.predict(df_batch)    # result.dl, result.ml, result.blend, result.timings_ms
+
 Compatibilidade legada (predictor.py):
   >>> from tools.inference_api import HVACPredictor
   >>> pred = HVACPredictor("model/artifacts/dl_hvac/global")  # Alias para HVACInferenceAPI
@@ -50,20 +56,159 @@ Uso direto (para testes):
 """
 
 import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict
+from typing import Callable, Dict, Iterable, TypeVar
 import numpy as np
 import polars as pl
-import tensorflow as tf
 
 # Import condicional: relativo se rodado como módulo, absoluto se rodado direto
 try:
-    from .normalizer import DLNormalizer, MLNormalizer
+    from .metrics import MODEL_BATCH_ROWS, stage_timer
+    from .normalizer import DLNormalizer, FeatureDeriver, MLNormalizer, load_ml_pipeline
+    from .numpy_engine import NumpyWideDeep, dl_model_file
+    from .tree_engine import NumpyTreeEnsemble
 except ImportError:
-    from normalizer import DLNormalizer, MLNormalizer
+    from metrics import MODEL_BATCH_ROWS, stage_timer
+    from normalizer import DLNormalizer, FeatureDeriver, MLNormalizer, load_ml_pipeline
+    from numpy_engine import NumpyWideDeep, dl_model_file
+    from tree_engine import NumpyTreeEnsemble
 
 _logger = logging.getLogger(__name__)
 
+# Forward pass do modelo DL: Keras (keras_model.keras) ou NumPy (numpy_model.npz)
+ENGINES = ("keras", "numpy")
+
+# Árvores do modelo ML: booster LightGBM/XGBoost (best_pipeline.joblib) ou NumPy (tree_model.npz)
+ML_ENGINES = ("native", "numpy")
+
+# Lotes até o maior bucket vão pelo tf.function compilado, com padding até o
+# bucket seguinte (um formato por bucket — sem retracing); acima, Model.predict
+FAST_PATH_BUCKETS: tuple[int, ...] = (1, 8, 64, 512)
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+_DONE = object()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  PIPELINE PRODUTOR/CONSUMIDOR (predict_batch com prefetch)
+# ══════════════════════════════════════════════════════════════════════════════
+
+def run_pipelined(
+    items: Iterable[_T],
+    prepare: Callable[[_T], object],
+    consume: Callable[[object], _R],
+    prefetch: int,
+) -> list[_R]:
+    """
+    ``[consume(prepare(x)) for x in items]`` com as duas etapas sobrepostas.
+
+    Uma thread produtora aplica ``prepare`` (normalização — polars roda em
+    threads nativas, fora do GIL) e deixa até ``prefetch`` itens prontos numa
+    fila limitada; a thread chamadora aplica ``consume`` (forward pass) na
+    ordem de chegada. Com um único produtor a ordem de saída é a de ``items``.
+
+    Uma exceção em ``prepare`` é relançada na chamadora; uma em ``consume``
+    para o produtor antes de propagar.
+    """
+    if prefetch < 1:
+        raise ValueError("prefetch deve ser >= 1")
+    ready: queue.Queue = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def _put(entry: tuple[bool, object]) -> bool:
+        while not stop.is_set():
+            try:
+                ready.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce() -> None:
+        try:
+            for item in items:
+                if not _put((True, prepare(item))):
+                    return
+        except BaseException as exc:
+            _put((False, exc))
+            return
+        _put((True, _DONE))
+
+    producer = threading.Thread(target=_produce, name="predict-batch-prefetch", daemon=True)
+    producer.start()
+    results: list[_R] = []
+    try:
+        while True:
+            ok, payload = ready.get()
+            if not ok:
+                raise payload  # type: ignore[misc]
+            if payload is _DONE:
+                return results
+            results.append(consume(payload))
+    finally:
+        stop.set()
+        producer.join()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  ATALHO COMPILADO PARA LOTES PEQUENOS (engine keras)
+# ══════════════════════════════════════════════════════════════════════════════
+
+class BucketedKerasPredictor:
+    """
+    ``Model.predict`` com atalho ``tf.function`` para lotes pequenos.
+
+    A cada chamada, ``Model.predict`` monta um data adapter e um iterador —
+    para poucas centenas de linhas esse overhead domina o tempo. Lotes de até
+    ``buckets[-1]`` linhas chamam direto uma ``tf.function`` com assinatura
+    fixa, completados com linhas de índice 0 até o próximo bucket (as linhas
+    de padding são descartadas na saída). Os buckets são traçados (e, com
+    ``jit_compile``, compilados pelo XLA) na construção.
+
+    Mesma interface ``predict(inputs, verbose=0) → (n, 1)`` do Keras e do
+    ``NumpyWideDeep``.
+    """
+
+    def __init__(
+        self,
+        model,
+        buckets: tuple[int, ...] = FAST_PATH_BUCKETS,
+        jit_compile: bool = False,
+    ) -> None:
+        import tensorflow as tf
+
+        self.model = model
+        self.buckets = tuple(sorted(buckets))
+        signature = {
+            t.name: tf.TensorSpec((None, *t.shape[1:]), t.dtype, name=t.name)
+            for t in model.inputs
+        }
+        self._fn = tf.function(
+            lambda inputs: model(inputs, training=False),
+            input_signature=[signature],
+            jit_compile=jit_compile,
+        )
+        self._specs = {name: (spec.shape[1:], spec.dtype.as_numpy_dtype) for name, spec in signature.items()}
+        for size in self.buckets:
+            self._fn({name: np.zeros((size, *shape), dtype) for name, (shape, dtype) in self._specs.items()})
+
+    def predict(self, inputs: dict[str, np.ndarray], verbose: int = 0) -> np.ndarray:
+        n = len(next(iter(inputs.values())))
+        if not self.buckets or n > self.buckets[-1]:
+            return self.model.predict(inputs, verbose=verbose)
+        size = next(b for b in self.buckets if b >= n)
+        padded = {
+            name: np.pad(np.asarray(inputs[name], dtype=dtype), [(0, size - n)] + [(0, 0)] * len(shape))
+            for name, (shape, dtype) in self._specs.items()
+        }
+        return self._fn(padded).numpy()[:n]
+
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  API DE INFERÊNCIA
@@ -80,34 +225,63 @@ class HVACDLInferenceAPI:
     Attributes:
         model_path      : Caminho da pasta com artefatos (contém keras_model.keras e meta.json).
         normalizer      : Instância de DLNormalizer carregada.
-        model           : Modelo Keras carregado.
+        engine          : ``"keras"`` ou ``"numpy"``.
+        model           : Modelo Keras ou ``NumpyWideDeep`` (mesmo ``predict``).
+        runner          : Quem executa o forward pass — ``BucketedKerasPredictor``
+                          (engine keras) ou o próprio ``NumpyWideDeep``.
     """
 
-    def __init__(self, model_path: str | Path):
+    def __init__(
+        self,
+        model_path: str | Path,
+        normalizer: DLNormalizer | None = None,
+        engine: str = "keras",
+        fast_path_buckets: tuple[int, ...] = FAST_PATH_BUCKETS,
+        jit_compile: bool = False,
+    ):
         """
         Inicializa a API carregando modelo e normalizer.
 
         Args:
             model_path: Caminho para diretório contendo:
-                        - keras_model.keras
+                        - keras_model.keras (engine keras) ou numpy_model.npz (engine numpy)
                         - meta.json (gerado por DLPipeline.save())
+            normalizer: DLNormalizer já carregado do mesmo artefato (ex: pelo
+                        master do modo pre-fork). Se None, lê de ``meta.json``.
+            engine    : ``"keras"`` carrega ``keras_model.keras`` (importa o
+                        TensorFlow); ``"numpy"`` carrega ``numpy_model.npz``
+                        (``tools/numpy_engine.py``) e dispensa o TensorFlow.
+            fast_path_buckets: Buckets do atalho ``tf.function`` (engine keras);
+                        vazio usa sempre ``Model.predict``.
+            jit_compile: Compila o atalho com XLA.
 
         Raises:
             FileNotFoundError: Se arquivos não forem encontrados
-            ValueError: Se meta.json inválido
+            ValueError: Se meta.json inválido ou engine desconhecido
         """
+        if engine not in ENGINES:
+            raise ValueError(f"engine deve ser um de {ENGINES}, recebido {engine!r}")
         self.model_path = Path(model_path)
+        self.engine = engine
         
         # Carrega normalizer (implicitamente carrega meta.json)
-        self.normalizer = DLNormalizer.from_artifact(self.model_path)
-        
-        # Carrega modelo Keras
-        model_file = self.model_path / "keras_model.keras"
-        if not model_file.exists():
-            raise FileNotFoundError(f"Modelo não encontrado em: {model_file}")
+        self.normalizer = normalizer or DLNormalizer.from_artifact(self.model_path)
         
-        self.model = tf.keras.models.load_model(model_file)
-        _logger.info(f"Modelo carregado de {model_file}")
+        # Carrega o modelo — engine numpy só precisa do numpy_model.npz
+        # (NumpyWideDeep.from_artifact levanta FileNotFoundError sem ele)
+        if engine == "numpy":
+            self.model = NumpyWideDeep.from_artifact(self.model_path)
+            self.runner = self.model
+            model_file = dl_model_file(self.model_path)
+        else:
+            model_file = self.model_path / "keras_model.keras"
+            if not model_file.exists():
+                raise FileNotFoundError(f"Modelo não encontrado em: {model_file}")
+            import tensorflow as tf
+
+            self.model = tf.keras.models.load_model(model_file)
+            self.runner = BucketedKerasPredictor(self.model, fast_path_buckets, jit_compile)
+        _logger.info(f"Modelo carregado de {model_file} (engine={engine})")
 
     def predict(self, df: pl.DataFrame) -> np.ndarray:
         """
@@ -132,10 +306,22 @@ class HVACDLInferenceAPI:
             np.ndarray de predições (consumo em kWh) de shape (n,)
         """
         # Normaliza com DLNormalizer (que já inclui auto-feature derivation)
-        inputs = self.normalizer.transform(df)
-        
-        # Executa predição
-        predictions = self.model.predict(inputs, verbose=0).flatten()
+        return self._predict_inputs(self.normalizer.transform(df))
+
+    def predict_derived(self, df: pl.DataFrame) -> np.ndarray:
+        """
+        Predição sobre um DataFrame já passado por ``FeatureDeriver.derive()``.
+
+        Usado pelo registro de segmentos, que deriva o lote uma única vez
+        e distribui as linhas entre os modelos.
+        """
+        return self._predict_inputs(self.normalizer.transform_derived(df))
+
+    def _predict_inputs(self, inputs: dict[str, np.ndarray]) -> np.ndarray:
+        """Executa o forward pass sobre os inputs já normalizados."""
+        with stage_timer("model_predict"):
+            predictions = self.runner.predict(inputs, verbose=0).flatten()
+        MODEL_BATCH_ROWS.observe(len(predictions))
         
         _logger.debug(f"Predições: {len(predictions)} linhas, "
                       f"min={predictions.min():.4f}, max={predictions.max():.4f}")
@@ -146,6 +332,7 @@ class HVACDLInferenceAPI:
         self,
         df: pl.DataFrame,
         batch_size: int = 1024,
+        prefetch: int = 0,
     ) -> np.ndarray:
         """
         Executa predição em lotes para otimizar memória.
@@ -153,18 +340,25 @@ class HVACDLInferenceAPI:
         Args:
             df: DataFrame com as features
             batch_size: Número de linhas por lote
+            prefetch: 0 = sequencial (normaliza e prediz um lote de cada vez).
+                      N > 0 = pipeline: o lote i+1 é normalizado enquanto o
+                      lote i está no modelo, com até N lotes normalizados à
+                      frente (ver ``run_pipelined``). A ordem é preservada.
 
         Returns:
             np.ndarray com todas as predições concatenadas
         """
         n_rows = len(df)
-        predictions = []
-        
-        for i in range(0, n_rows, batch_size):
-            batch = df.slice(i, min(batch_size, n_rows - i))
-            batch_preds = self.predict(batch)
-            predictions.append(batch_preds)
-            _logger.debug(f"Lote {i//batch_size + 1}: {len(batch_preds)} predições")
+        batches = (df.slice(i, min(batch_size, n_rows - i)) for i in range(0, n_rows, batch_size))
+
+        if prefetch > 0:
+            predictions = run_pipelined(batches, self.normalizer.transform, self._predict_inputs, prefetch)
+        else:
+            predictions = []
+            for batch in batches:
+                batch_preds = self.predict(batch)
+                predictions.append(batch_preds)
+                _logger.debug(f"Lote {len(predictions)}: {len(batch_preds)} predições")
         
         return np.concatenate(predictions) if predictions else np.array([])
 
@@ -279,39 +473,55 @@ class HVACMLInferenceAPI:
     Attributes:
         model_path : Caminho da pasta contendo best_pipeline.joblib.
         normalizer : Instância de MLNormalizer carregada.
-        pipeline   : Pipeline sklearn/XGBoost/LGBM carregado.
+        engine     : ``"native"`` ou ``"numpy"``.
+        pipeline   : Pipeline sklearn/XGBoost/LGBM carregado (None com engine numpy).
+        runner     : Quem avalia as árvores — o booster do pipeline (engine
+                     native) ou ``NumpyTreeEnsemble`` (mesmo ``predict(X)``).
     """
 
-    def __init__(self, model_path: str | Path):
+    def __init__(self, model_path: str | Path, mmap_mode: str | None = None, engine: str = "native"):
         """
         Inicializa a API carregando pipeline e normalizer.
 
         Args:
             model_path: Caminho para diretório contendo best_pipeline.joblib.
+            mmap_mode : Repassado a ``load_ml_pipeline`` (ex: ``"r"`` mapeia
+                        os arrays NumPy do pickle em vez de copiá-los).
+            engine    : ``"native"`` desserializa o pipeline e usa o booster
+                        LightGBM/XGBoost; ``"numpy"`` carrega ``tree_model.npz``
+                        (``tools/tree_engine.py``) e o sidecar do normalizer,
+                        sem unpickle nem lightgbm/xgboost/sklearn.
 
         Raises:
-            FileNotFoundError: Se best_pipeline.joblib não for encontrado.
+            FileNotFoundError: Se best_pipeline.joblib (ou tree_model.npz) não for encontrado.
+            ValueError: Se engine desconhecido.
         """
-        import joblib
-
+        if engine not in ML_ENGINES:
+            raise ValueError(f"engine deve ser um de {ML_ENGINES}, recebido {engine!r}")
         self.model_path = Path(model_path)
+        self.engine = engine
         joblib_file = self.model_path / "best_pipeline.joblib"
         if not joblib_file.exists():
             raise FileNotFoundError(f"Modelo ML não encontrado em: {joblib_file}")
 
-        # from_artifact registra MLPipeline/MLPipelineConfig em __main__ antes
-        # do segundo joblib.load — sem isso o pickle falha ao desserializar.
-        self.normalizer = MLNormalizer.from_artifact(joblib_file)
-        self.pipeline   = joblib.load(joblib_file)
-        _logger.info(f"Modelo ML carregado de {joblib_file}")
+        if engine == "numpy":
+            self.pipeline   = None
+            self.normalizer = MLNormalizer.from_artifact(joblib_file)
+            self.runner     = NumpyTreeEnsemble.from_artifact(self.model_path)
+        else:
+            # Uma única desserialização: o normalizer sai do pipeline em memória
+            self.pipeline   = load_ml_pipeline(joblib_file, mmap_mode=mmap_mode)
+            self.normalizer = MLNormalizer.from_pipeline(self.pipeline)
+            self.runner     = self.pipeline.model
+        _logger.info(f"Modelo ML carregado de {joblib_file} (engine={engine})")
 
     def predict(self, df: pl.DataFrame) -> np.ndarray:
         """
         Executa predição em um DataFrame.
 
-        MLPipeline.predict() espera um pl.DataFrame sem a coluna target e
-        aplica internamente normalização + predição. Não usar self.normalizer
-        aqui — ele existe apenas para registrar MLPipeline em __main__ no __init__.
+        Engine native: MLPipeline.predict() espera um pl.DataFrame sem a
+        coluna target e aplica internamente normalização + predição. Engine
+        numpy: ``self.normalizer.transform`` (mesma normalização) + árvores em NumPy.
 
         Args:
             df: DataFrame com as features de input (mesmo schema de HVACDLInferenceAPI.predict).
@@ -325,14 +535,38 @@ class HVACMLInferenceAPI:
         # MLPipeline.predict() proíbe consumo_kwh no input
         df_input = df.drop("consumo_kwh") if "consumo_kwh" in df.columns else df
 
-        with warnings.catch_warnings():
-            warnings.filterwarnings("ignore")
-            predictions = self.pipeline.predict(df_input).flatten()
+        if self.pipeline is None:
+            predictions = self._predict_matrix(self.normalizer.transform(df_input))
+        else:
+            with warnings.catch_warnings():
+                warnings.filterwarnings("ignore")
+                predictions = self.pipeline.predict(df_input).flatten()
 
         _logger.debug(f"Predições ML: {len(predictions)} linhas, "
                       f"min={predictions.min():.4f}, max={predictions.max():.4f}")
         return predictions
 
+    def predict_derived(self, df: pl.DataFrame) -> np.ndarray:
+        """
+        Predição sobre um DataFrame já passado por ``FeatureDeriver.derive()``.
+
+        Equivale a ``MLPipeline.predict()`` sem a etapa de derivação:
+        ``self.normalizer`` tem os mesmos feature_columns_, mapa de Target
+        Encoding e clipping_limits do pipeline.
+        """
+        return self._predict_matrix(self.normalizer.transform_derived(df))
+
+    def _predict_matrix(self, X: np.ndarray) -> np.ndarray:
+        """Executa as árvores (``self.runner``) sobre a matriz já normalizada (sem o MLPipeline)."""
+        import warnings
+
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore")
+            with stage_timer("model_predict"):
+                predictions = np.asarray(self.runner.predict(X)).flatten()
+        MODEL_BATCH_ROWS.observe(len(predictions))
+        return predictions
+
     def predict_single(
         self,
         hora: int,
@@ -376,6 +610,195 @@ class HVACMLInferenceAPI:
         return float(self.predict(df)[0])
 
 
+# ══════════════════════════════════════════════════════════════════════════════
+#  API DE INFERÊNCIA ENSEMBLE (DL + ML)
+# ══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class EnsemblePrediction:
+    """
+    Resultado de ``HVACEnsembleInferenceAPI.predict``.
+
+    Attributes:
+        dl         : Predições do modelo DL (n,).
+        ml         : Predições do modelo ML (n,).
+        blend      : ``dl_weight · dl + (1 − dl_weight) · ml`` (n,).
+        timings_ms : Tempo por etapa: derive, dl_normalize, dl_predict,
+                     ml_normalize, ml_predict e total (ms). As etapas dl_* e
+                     ml_* rodam em paralelo, então total < soma das etapas.
+    """
+
+    dl:         np.ndarray
+    ml:         np.ndarray
+    blend:      np.ndarray
+    timings_ms: dict[str, float] = field(default_factory=dict)
+
+
+class HVACEnsembleInferenceAPI:
+    """
+    DL e ML lado a lado com uma única derivação de features.
+
+    ``HVACDLInferenceAPI.predict`` e ``HVACMLInferenceAPI.predict`` chamam
+    ``FeatureDeriver.derive`` cada um — feriados, geo lookup (grade geográfica) e
+    features de data rodariam duas vezes. Aqui o frame derivado é calculado
+    uma vez e passado às etapas finais dos dois normalizers
+    (``transform_derived``); o ramo ML roda numa thread enquanto o DL roda
+    na thread chamadora (polars, TensorFlow/NumPy e LightGBM/XGBoost liberam
+    o GIL).
+
+    Attributes:
+        dl        : ``HVACDLInferenceAPI``.
+        ml        : ``HVACMLInferenceAPI``.
+        dl_weight : Peso do DL no ``blend`` (0–1).
+    """
+
+    def __init__(
+        self,
+        dl: HVACDLInferenceAPI | str | Path,
+        ml: HVACMLInferenceAPI | str | Path,
+        dl_weight: float = 0.5,
+        engine: str = "keras",
+        ml_engine: str = "native",
+    ):
+        """
+        Args:
+            dl       : API DL já carregada ou diretório do artefato DL.
+            ml       : API ML já carregada ou diretório com ``best_pipeline.joblib``.
+            dl_weight: Peso do DL no ``blend``; o ML recebe ``1 − dl_weight``.
+            engine   : Engine do DL quando ``dl`` é um caminho.
+            ml_engine: Engine do ML quando ``ml`` é um caminho.
+
+        Raises:
+            ValueError: Se ``dl_weight`` fora de [0, 1].
+        """
+        if not 0.0 <= dl_weight <= 1.0:
+            raise ValueError(f"dl_weight deve estar em [0, 1], recebido {dl_weight}")
+        self.dl = dl if isinstance(dl, HVACDLInferenceAPI) else HVACDLInferenceAPI(dl, engine=engine)
+        self.ml = ml if isinstance(ml, HVACMLInferenceAPI) else HVACMLInferenceAPI(ml, engine=ml_engine)
+        self.dl_weight = float(dl_weight)
+        self._ml_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ensemble-ml")
+
+    def predict(self, df: pl.DataFrame) -> EnsemblePrediction:
+        """
+        Predição DL + ML sobre um DataFrame bruto (mesmo schema de
+        ``HVACDLInferenceAPI.predict``).
+
+        Returns:
+            EnsemblePrediction com as predições de cada modelo, o blend e os
+            tempos por etapa.
+        """
+        t0 = time.perf_counter()
+        derived = FeatureDeriver.derive(df)
+        timings = {"derive": (time.perf_counter() - t0) * 1000}
+
+        def _timed(stage: str, fn, arg):
+            start = time.perf_counter()
+            out = fn(arg)
+            timings[stage] = (time.perf_counter() - start) * 1000
+            return out
+
+        def _ml_branch() -> np.ndarray:
+            X = _timed("ml_normalize", self.ml.normalizer.transform_derived, derived)
+            return _timed("ml_predict", self.ml._predict_matrix, X)
+
+        ml_future = self._ml_executor.submit(_ml_branch)
+        try:
+            inputs = _timed("dl_normalize", self.dl.normalizer.transform_derived, derived)
+            pred_dl = _timed("dl_predict", self.dl._predict_inputs, inputs)
+        except BaseException:
+            # Erro no DL: espera o ramo ML terminar antes de propagar
+            wait([ml_future])
+            raise
+        pred_ml = ml_future.result()
+
+        pred_dl = pred_dl.astype(np.float64)
+        blend = self.dl_weight * pred_dl + (1.0 - self.dl_weight) * pred_ml
+        timings["total"] = (time.perf_counter() - t0) * 1000
+        return EnsemblePrediction(dl=pred_dl, ml=pred_ml, blend=blend, timings_ms=timings)
+
+    def predict_single(
+        self,
+        hora: int,
+        data: str,
+        machine_type: str,
+        latitude: float,
+        longitude: float,
+        Temperatura_C: float,
+        Temperatura_Percebida_C: float,
+        Umidade_Relativa_pct: float,
+        Precipitacao_mm: float,
+        Velocidade_Vento_kmh: float,
+        Pressao_Superficial_hPa: float,
+        Irradiancia_Direta_Wm2: float,
+        Irradiancia_Difusa_Wm2: float,
+    ) -> dict[str, float]:
+        """
+        Executa predição para um único registro com valores manuais.
+
+        Mesma assinatura de HVACDLInferenceAPI.predict_single.
+
+        Returns:
+            {"dl": kWh, "ml": kWh, "blend": kWh}
+        """
+        df = pl.DataFrame({
+            "hora":                   [hora],
+            "data":                   [data],
+            "machine_type":           [machine_type],
+            "latitude":               [latitude],
+            "longitude":              [longitude],
+            "Temperatura_C":          [Temperatura_C],
+            "Temperatura_Percebida_C":[Temperatura_Percebida_C],
+            "Umidade_Relativa_%":     [Umidade_Relativa_pct],
+            "Precipitacao_mm":        [Precipitacao_mm],
+            "Velocidade_Vento_kmh":   [Velocidade_Vento_kmh],
+            "Pressao_Superficial_hPa":[Pressao_Superficial_hPa],
+            "Irradiancia_Direta_Wm2": [Irradiancia_Direta_Wm2],
+            "Irradiancia_Difusa_Wm2": [Irradiancia_Difusa_Wm2],
+        }).with_columns(pl.col("data").cast(pl.Date))
+        result = self.predict(df)
+        return {"dl": float(result.dl[0]), "ml": float(result.ml[0]), "blend": float(result.blend[0])}
+
+    def close(self) -> None:
+        """Encerra a thread do ramo ML."""
+        self._ml_executor.shutdown(wait=True)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  BENCHMARK — predict_batch sequencial vs pipeline
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _bench_pipeline(
+    artifact_dir: Path,
+    engine: str,
+    n_rows: int,
+    batch_size: int,
+    depths: list[int],
+) -> None:
+    """Throughput de ``predict_batch`` (linhas/s) sequencial e com cada ``prefetch``."""
+    try:
+        from .warmup import synthetic_frame
+    except ImportError:
+        from warmup import synthetic_frame
+
+    api = HVACDLInferenceAPI(artifact_dir, engine=engine)
+    df = synthetic_frame(n_rows)
+    api.predict_batch(df.head(batch_size), batch_size=batch_size)  # tracing, geo lookup, calendário
+
+    print(f"\n  {n_rows:,} linhas, batch_size={batch_size}, engine={engine}, polars threads={pl.thread_pool_size()}")
+    print(f"  {'modo':>14} {'tempo (s)':>10} {'linhas/s':>12} {'speedup':>8}")
+    baseline, reference = None, None
+    for depth in [0, *depths]:
+        t0 = time.perf_counter()
+        preds = api.predict_batch(df, batch_size=batch_size, prefetch=depth)
+        elapsed = time.perf_counter() - t0
+        if reference is None:
+            baseline, reference = elapsed, preds
+        elif not np.array_equal(preds, reference):
+            raise AssertionError(f"prefetch={depth} diverge do modo sequencial")
+        label = "sequencial" if depth == 0 else f"prefetch={depth}"
+        print(f"  {label:>14} {elapsed:>10.2f} {n_rows / elapsed:>12,.0f} {baseline / elapsed:>7.2f}×")
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 #  TESTE / EXECUÇÃO DIRETA
 # ══════════════════════════════════════════════════════════════════════════════
@@ -392,6 +815,23 @@ if __name__ == "__main__":
     root_dir     = Path(__file__).resolve().parent.parent
     sys.path.insert(0, str(root_dir))
 
+    # python -m tools.inference_runner bench-pipeline [--rows N --batch-size N --prefetch 1,2,4 --engine numpy]
+    if sys.argv[1:2] == ["bench-pipeline"]:
+        import argparse
+
+        parser = argparse.ArgumentParser(prog="python -m tools.inference_runner bench-pipeline")
+        parser.add_argument("--artifact", type=Path, default=root_dir / "model" / "artifacts" / "dl_hvac" / "global")
+        parser.add_argument("--engine", choices=ENGINES, default="keras")
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--batch-size", type=int, default=50_000)
+        parser.add_argument("--prefetch", default="1,2,4")
+        args = parser.parse_args(sys.argv[2:])
+        _bench_pipeline(
+            args.artifact, args.engine, args.rows, args.batch_size,
+            [int(d) for d in args.prefetch.split(",") if d.strip()],
+        )
+        sys.exit(0)
+
     dl_path      = root_dir / "model" / "artifacts" / "dl_hvac" / "global"
     ml_path      = root_dir / "model" / "artifacts" / "ml_hvac" / "global"
     parquet_path = root_dir / "use_case" / "files" / "final_dataframe.parquet"
@@ -0,0 +1,566 @@
+"""
+Jobs — Scoring em massa assíncrono (Parquet → Parquet) fora do tráfego online
+=============================================================================
+
+Pontuar o portfólio inteiro de um mês por ``/predict_batch`` significa corpos
+JSON de centenas de MB e timeouts HTTP. Aqui o lote vira um *job*:
+
+    POST /jobs (Parquet no corpo, ou {"path": ...} local ao servidor)
+        │  grava o upload em JOBS_DIR e o estado em {id}.json → 202 + id
+        ▼
+    fila (multiprocessing) ──► processo worker de jobs (spawn)
+                                 ├─ os.nice / sched_setaffinity / threads limitadas
+                                 ├─ ParquetFile.iter_batches(chunk_rows)
+                                 │     validate_frame → predict_batch
+                                 │     ParquetWriter: colunas de entrada + consumo_kwh
+                                 └─ atualiza {id}.json a cada chunk
+        ▲
+    GET /jobs/{id}          progresso, linhas/s
+    GET /jobs/{id}/result   download do Parquet de predições
+
+Os jobs rodam em **processos** separados, não no executor da API: o thread
+pool do TensorFlow e o do polars são globais por processo, então só um
+processo próprio tem orçamento de CPU próprio (``JOBS_THREADS``,
+``JOBS_CPUS`` e prioridade reduzida via ``JOBS_NICE``). O processo é criado
+com ``spawn`` — ``fork()`` depois do TensorFlow executar trava (ver
+``tools/prefork.py``) — e só na primeira submissão.
+
+O estado de cada job é um JSON em ``JOBS_DIR`` escrito pelo worker: qualquer
+processo da API (inclusive os do modo pre-fork) responde ao polling, e jobs
+concluídos continuam consultáveis após reinícios — até ``retention_s``
+depois de finalizados, quando estado, upload e predições são apagados.
+
+Uso:
+    >>> runner = JobRunner(JobStore("jobs"), PredictorSpec(artifact_path), bounds)
+    >>> job = runner.submit(Path("jobs/portfolio.parquet"))
+    >>> runner.get(job.id).to_dict()["progress"]
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing as mp
+import os
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+_logger = logging.getLogger(__name__)
+
+# Estados de um job
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+_FINAL_STATES = (SUCCEEDED, FAILED)
+
+# Sufixo do Parquet de saída, gravado ao lado do de entrada
+_OUTPUT_SUFFIX = ".predictions.parquet"
+
+_WATCHDOG_INTERVAL_S = 2.0
+_PURGE_INTERVAL_S = 60.0
+
+
+class JobInputError(ValueError):
+    """Entrada de job inválida (caminho fora das raízes permitidas, arquivo ausente)."""
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  ESTADO
+# ══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class Job:
+    """
+    Estado persistido de um job de scoring.
+
+    Attributes:
+        id          : Identificador (hex de 12 caracteres).
+        input_path  : Parquet de entrada.
+        output_path : Parquet de predições (escrito ao lado da entrada).
+        status      : queued | running | succeeded | failed.
+        rows_total  : Linhas da entrada (lidas do metadata do Parquet).
+        rows_done   : Linhas já preditas e gravadas.
+        owner_pid   : PID do processo da API que enfileirou o job.
+        worker_pid  : PID do processo que está executando o job.
+    """
+
+    id:          str
+    input_path:  str
+    output_path: str
+    status:      str = QUEUED
+    rows_total:  Optional[int] = None
+    rows_done:   int = 0
+    created_at:  float = field(default_factory=time.time)
+    started_at:  Optional[float] = None
+    finished_at: Optional[float] = None
+    owner_pid:   Optional[int] = None
+    worker_pid:  Optional[int] = None
+    error:       Optional[str] = None
+
+    @property
+    def rows_per_s(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return round(self.rows_done / elapsed, 1) if elapsed > 0 else None
+
+    def to_dict(self) -> dict[str, object]:
+        """Estado + campos derivados (progresso, linhas/s) para a API."""
+        progress = (
+            round(self.rows_done / self.rows_total, 4)
+            if self.rows_total
+            else (1.0 if self.status == SUCCEEDED else 0.0)
+        )
+        return {**asdict(self), "progress": progress, "rows_per_s": self.rows_per_s}
+
+
+class JobStore:
+    """Jobs como arquivos ``{id}.json`` em ``root`` (escrita atômica)."""
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex[:12]
+
+    def create(self, input_path: Path, job_id: Optional[str] = None) -> Job:
+        job_id = job_id or self.new_id()
+        output = input_path.with_name(input_path.name.removesuffix(".parquet") + _OUTPUT_SUFFIX)
+        job = Job(
+            id=job_id, input_path=str(input_path), output_path=str(output),
+            owner_pid=os.getpid(),
+        )
+        self.save(job)
+        return job
+
+    def upload_path(self, job_id: str) -> Path:
+        """Destino de um Parquet enviado no corpo de ``POST /jobs``."""
+        return self.root / f"{job_id}.parquet"
+
+    def get(self, job_id: str) -> Optional[Job]:
+        if not job_id.isalnum():
+            return None
+        path = self.root / f"{job_id}.json"
+        try:
+            with path.open(encoding="utf-8") as fh:
+                return Job(**json.load(fh))
+        except FileNotFoundError:
+            return None
+
+    def save(self, job: Job) -> None:
+        tmp = self.root / f".{job.id}.json.tmp"
+        with tmp.open("w", encoding="utf-8") as fh:
+            json.dump(asdict(job), fh)
+        os.replace(tmp, self.root / f"{job.id}.json")
+
+    def list(self) -> list[Job]:
+        jobs = [self.get(p.stem) for p in self.root.glob("*.json")]
+        return sorted((j for j in jobs if j is not None), key=lambda j: j.created_at)
+
+    def purge(self, max_age_s: float, now: Optional[float] = None) -> list[str]:
+        """
+        Apaga jobs finalizados há mais de ``max_age_s`` segundos.
+
+        Remove o Parquet de predições, o upload (só se veio no corpo de
+        ``POST /jobs`` — entradas ``{"path": ...}`` são do cliente) e o
+        ``{id}.json``, nessa ordem: uma falha no meio é refeita na próxima vez.
+
+        Returns:
+            Ids dos jobs apagados.
+        """
+        cutoff = (now or time.time()) - max_age_s
+        purged = []
+        for job in self.list():
+            if job.status not in _FINAL_STATES or (job.finished_at or job.created_at) > cutoff:
+                continue
+            Path(job.output_path).unlink(missing_ok=True)
+            if Path(job.input_path) == self.upload_path(job.id):
+                Path(job.input_path).unlink(missing_ok=True)
+            (self.root / f"{job.id}.json").unlink(missing_ok=True)
+            purged.append(job.id)
+        return purged
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  EXECUÇÃO (processo worker)
+# ══════════════════════════════════════════════════════════════════════════════
+
+@dataclass(frozen=True)
+class PredictorSpec:
+    """
+    Receita picklável do preditor da API, reconstruída no processo worker.
+
+    Mesma configuração do tráfego online (modelo global + registro de
+    segmentos), para que job e ``/predict_batch`` deem o mesmo resultado.
+    """
+
+    artifact_path:    str
+    dl_segments_path: Optional[str] = None
+    ml_segments_path: Optional[str] = None
+    segment_source:   str = "dl"
+    segment_budget_mb: float = 256.0
+    engine:           str = "keras"
+    ml_engine:        str = "native"
+
+    def fingerprint(self) -> tuple:
+        """
+        (mtime, tamanho) dos arquivos que versionam a API (``predictor_artifact_files``):
+        global, manifestos e artefatos dos segmentos — muda a cada re-treino,
+        inclusive de um único segmento.
+        """
+        from tools.model_registry import predictor_artifact_files
+
+        files = predictor_artifact_files(
+            self.artifact_path, self.dl_segments_path, self.ml_segments_path, self.segment_source,
+        )
+        stats = []
+        for path in files:
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            stats.append((str(path), st.st_mtime_ns, st.st_size))
+        return tuple(stats)
+
+    def build(self):
+        from tools.inference_runner import HVACDLInferenceAPI
+
+        api = HVACDLInferenceAPI(self.artifact_path, engine=self.engine)
+        if self.dl_segments_path is None and self.ml_segments_path is None:
+            return api
+        from tools.model_registry import SegmentedModelRegistry
+
+        return SegmentedModelRegistry(
+            api,
+            self.dl_segments_path,
+            self.ml_segments_path,
+            source=self.segment_source,
+            memory_budget_mb=self.segment_budget_mb,
+            engine=self.engine,
+            ml_engine=self.ml_engine,
+        )
+
+
+def run_job(store: JobStore, job: Job, predictor, bounds: dict, chunk_rows: int) -> Job:
+    """
+    Executa um job: lê a entrada em chunks, prediz e grava o Parquet de saída.
+
+    A saída é escrita em ``{output}.tmp`` e renomeada só no fim — um arquivo
+    em ``output_path`` está sempre completo.
+    """
+    import polars as pl
+    import pyarrow.parquet as pq
+
+    from tools.columnar import validate_frame
+
+    job.status = RUNNING
+    job.started_at = time.time()
+    job.worker_pid = os.getpid()
+    store.save(job)
+
+    output = Path(job.output_path)
+    tmp = output.with_name(output.name + ".tmp")
+    writer = None
+    try:
+        source = pq.ParquetFile(job.input_path)
+        job.rows_total = source.metadata.num_rows
+        store.save(job)
+
+        for batch in source.iter_batches(batch_size=chunk_rows):
+            df = pl.from_arrow(batch)
+            preds = predictor.predict_batch(validate_frame(df, bounds), batch_size=chunk_rows)
+            table = df.with_columns(pl.Series("consumo_kwh", preds, dtype=pl.Float64)).to_arrow()
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, table.schema)
+            writer.write_table(table)
+            job.rows_done += df.height
+            store.save(job)
+
+        if writer is None:
+            raise JobInputError("Parquet de entrada vazio")
+        writer.close()
+        writer = None
+        os.replace(tmp, output)
+        job.status = SUCCEEDED
+    except Exception as exc:
+        _logger.error("Job %s falhou após %d linhas: %s", job.id, job.rows_done, exc)
+        job.status = FAILED
+        job.error = f"{type(exc).__name__}: {exc}"
+        if writer is not None:
+            writer.close()
+        tmp.unlink(missing_ok=True)
+    job.finished_at = time.time()
+    store.save(job)
+    return job
+
+
+def _worker_main(
+    tasks: "mp.Queue",
+    jobs_dir: str,
+    spec: PredictorSpec,
+    bounds: dict,
+    chunk_rows: int,
+    threads: int,
+    cpus: Optional[tuple[int, ...]],
+    nice: int,
+) -> None:
+    """Corpo do processo worker: limita CPU, carrega o modelo no 1º job e consome a fila."""
+    # Antes de importar polars/NumPy/TensorFlow: os thread pools nascem no primeiro uso
+    for var in ("POLARS_MAX_THREADS", "OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    if nice:
+        os.nice(nice)
+
+    if spec.engine == "keras":
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [jobs] %(message)s")
+    store = JobStore(jobs_dir)
+    predictor, fingerprint = None, None
+    while True:
+        job_id = tasks.get()
+        if job_id is None:
+            return
+        job = store.get(job_id)
+        if job is None or job.status != QUEUED:
+            continue
+        # Artefatos trocados desde o último job (hot reload da API) → recarrega;
+        # um job em andamento termina inteiro no modelo com que começou
+        if predictor is None or spec.fingerprint() != fingerprint:
+            fingerprint = spec.fingerprint()
+            predictor = spec.build()
+        t0 = time.perf_counter()
+        job = run_job(store, job, predictor, bounds, chunk_rows)
+        _logger.info(
+            "Job %s: %s — %d linhas em %.1fs",
+            job.id, job.status, job.rows_done, time.perf_counter() - t0,
+        )
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  SUPERVISÃO (processo da API)
+# ══════════════════════════════════════════════════════════════════════════════
+
+class JobRunner:
+    """
+    Fila de jobs + pool de processos worker com orçamento de CPU próprio.
+
+    Attributes:
+        store      : JobStore compartilhado com os workers.
+        spec       : Receita do preditor usada pelos workers.
+        bounds     : Limites de validação (``field_bounds(PredictionRequest)``).
+        n_workers  : Processos worker (jobs simultâneos).
+        chunk_rows : Linhas lidas/preditas/gravadas por vez.
+        threads    : Threads de TensorFlow/NumPy/polars por worker.
+        cpus       : Núcleos permitidos aos workers (None = todos).
+        nice       : Incremento de nice dos workers (prioridade abaixo da API).
+        retention_s: Idade (s) a partir da qual jobs finalizados e seus
+                     arquivos são apagados (0 = nunca).
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        spec: PredictorSpec,
+        bounds: dict,
+        n_workers: int = 1,
+        chunk_rows: int = 50_000,
+        threads: int = 1,
+        cpus: Optional[tuple[int, ...]] = None,
+        nice: int = 10,
+        retention_s: float = 0.0,
+    ) -> None:
+        if n_workers < 1:
+            raise ValueError("n_workers deve ser >= 1")
+        self.store = store
+        self.spec = spec
+        self.bounds = bounds
+        self.n_workers = n_workers
+        self.chunk_rows = chunk_rows
+        self.threads = threads
+        self.cpus = cpus
+        self.nice = nice
+        self.retention_s = retention_s
+
+        self._ctx = mp.get_context("spawn")
+        self._tasks = self._ctx.Queue()
+        self._procs: list[mp.Process] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+        self._last_purge = 0.0
+
+    # ── API pública ──────────────────────────────────────────────────────
+
+    def submit(self, input_path: Path, job: Optional[Job] = None) -> Job:
+        """
+        Enfileira um job para ``input_path`` (cria o registro se ``job`` for None).
+
+        Raises:
+            JobInputError: Arquivo inexistente.
+        """
+        if not input_path.is_file():
+            raise JobInputError(f"Arquivo não encontrado: {input_path}")
+        if job is None:
+            job = self.store.create(input_path)
+        self.purge_expired()
+        self._ensure_workers()
+        self._tasks.put(job.id)
+        _logger.info("Job %s enfileirado (%s)", job.id, input_path)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        Estado atual do job.
+
+        Um job não finalizado cujo processo responsável (worker, ou a API que
+        o enfileirou) não existe mais é marcado como falho — ex: a API foi
+        reiniciada com o job na fila.
+        """
+        job = self.store.get(job_id)
+        if job is None or job.status in _FINAL_STATES:
+            return job
+        pid = job.worker_pid if job.status == RUNNING else job.owner_pid
+        if pid is not None and not _pid_alive(pid):
+            job.status = FAILED
+            job.error = "Processo responsável pelo job encerrado antes da conclusão"
+            job.finished_at = time.time()
+            self.store.save(job)
+        return job
+
+    def purge_expired(self, force: bool = False) -> list[str]:
+        """Aplica ``retention_s`` (no máximo a cada ``_PURGE_INTERVAL_S``, salvo ``force``)."""
+        now = time.time()
+        with self._lock:
+            if not self.retention_s or (not force and now - self._last_purge < _PURGE_INTERVAL_S):
+                return []
+            self._last_purge = now
+        purged = self.store.purge(self.retention_s, now)
+        if purged:
+            _logger.info("Retenção de jobs: %d job(s) apagado(s) (%s)", len(purged), ", ".join(purged))
+        return purged
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            alive = sum(p.is_alive() for p in self._procs)
+        return {
+            "workers": self.n_workers,
+            "workers_alive": alive,
+            "threads_per_worker": self.threads,
+            "cpus": list(self.cpus) if self.cpus else None,
+            "nice": self.nice,
+            "chunk_rows": self.chunk_rows,
+            "retention_s": self.retention_s,
+        }
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Pede parada dos workers (terminam o job atual) e encerra os que não saírem."""
+        self._stop.set()
+        with self._lock:
+            procs, self._procs = self._procs, []
+        for _ in procs:
+            self._tasks.put(None)
+        for proc in procs:
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.terminate()
+
+    # ── Internos ─────────────────────────────────────────────────────────
+
+    def _spawn(self) -> mp.Process:
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(
+                self._tasks, str(self.store.root), self.spec, self.bounds,
+                self.chunk_rows, self.threads, self.cpus, self.nice,
+            ),
+            name="hvac-job-worker",
+            daemon=True,
+        )
+        proc.start()
+        _logger.info("Worker de jobs iniciado (pid=%s)", proc.pid)
+        return proc
+
+    def _ensure_workers(self) -> None:
+        # Workers só existem depois do primeiro job: cada um carrega um TensorFlow
+        with self._lock:
+            if self._procs:
+                return
+            self._procs = [self._spawn() for _ in range(self.n_workers)]
+            self._watchdog = threading.Thread(
+                target=self._watch, name="hvac-job-watchdog", daemon=True,
+            )
+            self._watchdog.start()
+
+    def _watch(self) -> None:
+        """Marca como falho o job de um worker que morreu (ex: OOM) e recria o worker."""
+        while not self._stop.wait(_WATCHDOG_INTERVAL_S):
+            with self._lock:
+                dead = [p for p in self._procs if not p.is_alive()]
+                for proc in dead:
+                    self._procs.remove(proc)
+                    self._procs.append(self._spawn())
+            for proc in dead:
+                _logger.error("Worker de jobs pid=%s morreu (exitcode=%s)", proc.pid, proc.exitcode)
+                self._fail_jobs_of(proc.pid)
+            self.purge_expired()
+
+    def _fail_jobs_of(self, pid: Optional[int]) -> None:
+        for job in self.store.list():
+            if job.status == RUNNING and job.worker_pid == pid:
+                job.status = FAILED
+                job.error = "Worker de jobs encerrado durante a execução"
+                job.finished_at = time.time()
+                self.store.save(job)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def parse_cpus(value: Optional[str]) -> Optional[tuple[int, ...]]:
+    """``"2,3"`` / ``"2-5"`` → (2, 3) / (2, 3, 4, 5); vazio → None."""
+    if not value:
+        return None
+    cpus: list[int] = []
+    for part in value.split(","):
+        lo, _, hi = part.strip().partition("-")
+        cpus.extend(range(int(lo), int(hi or lo) + 1))
+    return tuple(cpus)
+
+
+def resolve_input_path(raw: str, allowed_roots: list[Path]) -> Path:
+    """
+    Resolve um caminho local informado pelo cliente, restrito a ``allowed_roots``.
+
+    Raises:
+        JobInputError: Fora das raízes permitidas, não é .parquet ou não existe.
+    """
+    path = Path(raw).expanduser().resolve()
+    if not any(path.is_relative_to(root.resolve()) for root in allowed_roots):
+        raise JobInputError(
+            f"Caminho fora das raízes permitidas (JOBS_INPUT_ROOTS): {raw}"
+        )
+    if path.suffix != ".parquet":
+        raise JobInputError(f"Esperado um arquivo .parquet: {raw}")
+    if not path.is_file():
+        raise JobInputError(f"Arquivo não encontrado: {raw}")
+    return path
@@ -0,0 +1,335 @@
+"""
+Lag Store — Consumo horário recente por (unit_id, machine_type) para inferência online
+======================================================================================
+
+Os modelos foram treinados com ``consumo_lag_1h``, ``consumo_lag_24h`` e
+``consumo_rolling_mean_3h`` (``dataframe/complementary_features/lag_features.py``),
+mas ``PredictionRequest`` não os traz — sem eles o normalizer preenche as
+três features com zero. Este store mantém o histórico recente de consumo e
+calcula as features no momento da predição:
+
+    POST /lags/ingest  (unit_id, machine_type, data, hora, consumo_kwh)
+        │  soma + contagem por hora  → média entre devices, como no treino
+        ▼
+    ring buffer por chave: 25 slots = 24 h anteriores + a hora corrente
+        │   slot = hora_absoluta % 25, com a hora absoluta gravada ao lado
+        ▼
+    with_lags(df)  ─► lag_1h = média em h−1, lag_24h = média em h−24,
+                      rolling_mean_3h = média de h−2, h−1 e h (as presentes)
+
+A busca é O(1) por linha (indexação NumPy em arrays 2-D). Uma hora ausente
+(sem ingestão, ou já sobrescrita no ring) vira NaN — que o normalizer trata
+exatamente como a feature ausente, então uma unidade sem histórico recebe a
+mesma predição de antes.
+
+Diferença para o treino: lá a média móvel de 3 h é sobre as linhas do grupo
+e inclui o consumo da própria hora; aqui entra ``h`` só se já tiver sido
+ingerido (em geral a hora prevista ainda não tem medição).
+
+``snapshot(path)`` grava os slots válidos em Parquet (escrita atômica) e
+``from_snapshot(path)`` restaura o store após um reinício, sem recalcular a
+partir do dataset consolidado.
+
+Uso:
+    >>> store = LagFeatureStore()
+    >>> store.ingest(readings)            # pl.DataFrame com as 5 colunas
+    >>> df = store.with_lags(requests)    # + 3 colunas de lag (NaN sem histórico)
+    >>> store.snapshot("state/lag_store.parquet")
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import warnings
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+try:
+    from .metrics import LAG_KEYS, LAG_LOOKUP_ROWS, LAG_ROWS_INGESTED
+except ImportError:
+    from metrics import LAG_KEYS, LAG_LOOKUP_ROWS, LAG_ROWS_INGESTED
+
+_logger = logging.getLogger(__name__)
+
+# Features de lag (nomes e ordem de lag_features.py / meta.json)
+LAG_COLUMNS: tuple[str, ...] = ("consumo_lag_1h", "consumo_lag_24h", "consumo_rolling_mean_3h")
+
+INGEST_COLUMNS: dict[str, pl.DataType] = {
+    "unit_id":      pl.Int64,
+    "machine_type": pl.Utf8,
+    "data":         pl.Date,
+    "hora":         pl.Int64,
+    "consumo_kwh":  pl.Float64,
+}
+
+# 24 h anteriores + a hora corrente: lag_24h continua disponível depois que a
+# própria hora h é ingerida
+_SLOTS = 25
+
+_EPOCH = date(1970, 1, 1)
+
+
+def _absolute_hours(df: pl.DataFrame) -> np.ndarray:
+    """Horas desde 1970-01-01 00h (``data`` como pl.Date, ``hora`` 0–23)."""
+    days = df["data"].cast(pl.Date).cast(pl.Int64).to_numpy()
+    return days * 24 + df["hora"].cast(pl.Int64).to_numpy()
+
+
+def _canonical_machine_types(df: pl.DataFrame) -> pl.Series:
+    # Mesma chave para "Splitao" e "splitao " (o normalizer já ignora a caixa)
+    return df["machine_type"].cast(pl.Utf8).str.strip_chars().str.to_lowercase()
+
+
+class LagFeatureStore:
+    """
+    Ring buffers de consumo horário médio por (unit_id, machine_type).
+
+    Cada chave ocupa uma linha de três arrays ``(n_chaves, 25)``: soma e
+    contagem das leituras da hora e a hora absoluta que o slot guarda. A
+    capacidade dobra quando surgem chaves novas.
+
+    Attributes:
+        n_keys : Nº de chaves (unit_id, machine_type) com histórico.
+    """
+
+    def __init__(self, initial_keys: int = 1024) -> None:
+        if initial_keys < 1:
+            raise ValueError("initial_keys deve ser >= 1")
+        self._index: dict[tuple[int, str], int] = {}
+        self._sum = np.zeros((initial_keys, _SLOTS), dtype=np.float64)
+        self._count = np.zeros((initial_keys, _SLOTS), dtype=np.int32)
+        self._hour = np.full((initial_keys, _SLOTS), -1, dtype=np.int64)
+        self._lock = threading.Lock()
+        self._version = 0          # incrementa a cada ingestão (snapshot só se mudou)
+        self._snapshot_version = 0
+
+    @property
+    def n_keys(self) -> int:
+        return len(self._index)
+
+    # ── Escrita ──────────────────────────────────────────────────────────
+
+    def ingest(self, df: pl.DataFrame) -> int:
+        """
+        Registra leituras horárias de consumo.
+
+        Várias leituras da mesma (chave, hora) — ex: um device por linha —
+        são somadas e a feature usa a média, como ``lag_features.py``.
+        Leituras mais antigas que a janela de 25 h do slot são descartadas.
+
+        Args:
+            df: Colunas de ``INGEST_COLUMNS`` (``data`` como pl.Date ou "YYYY-MM-DD").
+
+        Returns:
+            Nº de linhas aceitas.
+
+        Raises:
+            ValueError: Colunas ausentes, tipos inválidos, nulos ou hora fora de 0–23.
+        """
+        missing = [c for c in INGEST_COLUMNS if c not in df.columns]
+        if missing:
+            raise ValueError(f"Colunas obrigatórias ausentes: {missing}")
+        try:
+            data_expr = (
+                pl.col("data")
+                if df.schema["data"] == pl.Date
+                else pl.col("data").cast(pl.Utf8).str.to_date("%Y-%m-%d")
+            )
+            df = df.select(
+                pl.col("unit_id").cast(pl.Int64),
+                pl.col("machine_type").cast(pl.Utf8),
+                data_expr.alias("data"),
+                pl.col("hora").cast(pl.Int64),
+                pl.col("consumo_kwh").cast(pl.Float64),
+            )
+        except Exception as exc:
+            raise ValueError(f"Tipos inválidos: {exc}") from exc
+        if df.null_count().sum_horizontal().item():
+            raise ValueError("Leituras com valores nulos")
+        if not df["hora"].is_between(0, 23).all():
+            raise ValueError("hora fora de [0, 23]")
+        if not df["consumo_kwh"].is_finite().all():
+            raise ValueError("consumo_kwh não finito")
+
+        # Uma linha por (chave, hora), em ordem cronológica: no ring, uma hora
+        # mais nova sobrescreve a de 25 h antes no mesmo slot
+        agg = (
+            df.with_columns(
+                _canonical_machine_types(df).alias("machine_type"),
+                pl.Series("_h", _absolute_hours(df)),
+            )
+            .group_by("unit_id", "machine_type", "_h")
+            .agg(pl.col("consumo_kwh").sum().alias("_sum"), pl.len().alias("_n"))
+            .sort("_h")
+        )
+
+        accepted = 0
+        with self._lock:
+            for unit, mt, h, total, n in agg.iter_rows():
+                k = self._slot_for((unit, mt))
+                s = h % _SLOTS
+                if self._hour[k, s] < h:
+                    self._hour[k, s] = h
+                    self._sum[k, s] = total
+                    self._count[k, s] = n
+                elif self._hour[k, s] == h:
+                    self._sum[k, s] += total
+                    self._count[k, s] += n
+                else:
+                    continue
+                accepted += n
+            self._version += 1
+            n_keys = len(self._index)
+
+        LAG_ROWS_INGESTED.inc(accepted)
+        LAG_KEYS.set(n_keys)
+        return accepted
+
+    # ── Leitura ──────────────────────────────────────────────────────────
+
+    def lookup(
+        self,
+        unit_ids: list[int | None],
+        machine_types: list[str],
+        hours: np.ndarray,
+    ) -> dict[str, np.ndarray]:
+        """
+        Features de lag para cada linha (NaN onde não há histórico).
+
+        Args:
+            unit_ids     : unit_id de cada linha (None = sem unidade).
+            machine_types: n tipos de máquina já canônicos (minúsculas, sem espaços nas pontas).
+            hours        : (n,) hora absoluta prevista (ver ``_absolute_hours``).
+
+        Returns:
+            {coluna de LAG_COLUMNS: np.ndarray float64 (n,)}
+        """
+        n = len(hours)
+        with self._lock:
+            idx = np.fromiter(
+                (self._index.get((u, mt), -1) for u, mt in zip(unit_ids, machine_types)),
+                dtype=np.int64,
+                count=n,
+            )
+            known = idx >= 0
+            k = np.where(known, idx, 0)
+
+            def mean_at(offset: int) -> np.ndarray:
+                h = hours - offset
+                s = h % _SLOTS
+                valid = known & (self._hour[k, s] == h)
+                return np.where(valid, self._sum[k, s] / np.maximum(self._count[k, s], 1), np.nan)
+
+            current, lag_1h, lag_2h, lag_24h = mean_at(0), mean_at(1), mean_at(2), mean_at(24)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # nanmean de linha toda NaN
+            rolling = np.nanmean(np.stack([lag_2h, lag_1h, current]), axis=0)
+
+        features = {
+            "consumo_lag_1h":          np.round(lag_1h, 4),
+            "consumo_lag_24h":         np.round(lag_24h, 4),
+            "consumo_rolling_mean_3h": np.round(rolling, 4),
+        }
+        n_found = np.isfinite(np.stack(list(features.values()))).sum(axis=0)
+        LAG_LOOKUP_ROWS.inc(int((n_found == 3).sum()), result="hit")
+        LAG_LOOKUP_ROWS.inc(int(((n_found > 0) & (n_found < 3)).sum()), result="partial")
+        LAG_LOOKUP_ROWS.inc(int((n_found == 0).sum()), result="miss")
+        return features
+
+    def with_lags(self, df: pl.DataFrame) -> pl.DataFrame:
+        """
+        Acrescenta as colunas de ``LAG_COLUMNS`` a um lote no schema do normalizer.
+
+        Sem coluna ``unit_id`` (ou com ela toda nula) o lote volta inalterado
+        — o comportamento anterior ao store.
+        """
+        if "unit_id" not in df.columns or df["unit_id"].null_count() == df.height:
+            return df
+        units = df["unit_id"].cast(pl.Int64).to_list()
+        features = self.lookup(
+            units,
+            _canonical_machine_types(df).to_list(),
+            _absolute_hours(df),
+        )
+        return df.with_columns(
+            pl.Series(name, values, dtype=pl.Float64) for name, values in features.items()
+        )
+
+    # ── Persistência ─────────────────────────────────────────────────────
+
+    def snapshot(self, path: str | Path, force: bool = False) -> int | None:
+        """
+        Grava os slots válidos em Parquet (``{path}.tmp`` + rename).
+
+        Returns:
+            Nº de slots gravados, ou None se nada mudou desde o último snapshot.
+        """
+        with self._lock:
+            if self._version == self._snapshot_version and not force:
+                return None
+            keys = list(self._index)
+            rows, slots = np.nonzero(self._hour[: len(keys)] >= 0)
+            snap = pl.DataFrame({
+                "unit_id":      pl.Series([keys[r][0] for r in rows], dtype=pl.Int64),
+                "machine_type": pl.Series([keys[r][1] for r in rows], dtype=pl.Utf8),
+                "hour":         self._hour[rows, slots],
+                "consumo_sum":  self._sum[rows, slots],
+                "count":        self._count[rows, slots],
+            })
+            version = self._version
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        snap.write_parquet(tmp)
+        os.replace(tmp, path)
+        with self._lock:
+            self._snapshot_version = version
+        return snap.height
+
+    @classmethod
+    def from_snapshot(cls, path: str | Path) -> "LagFeatureStore":
+        """Restaura um store gravado por ``snapshot()``."""
+        snap = pl.read_parquet(path)
+        store = cls(initial_keys=max(1, snap.select("unit_id", "machine_type").n_unique()))
+        for unit, mt, h, total, n in snap.select(
+            "unit_id", "machine_type", "hour", "consumo_sum", "count"
+        ).iter_rows():
+            k = store._slot_for((unit, mt))
+            s = h % _SLOTS
+            store._hour[k, s], store._sum[k, s], store._count[k, s] = h, total, n
+        LAG_KEYS.set(store.n_keys)
+        _logger.info("Lag store restaurado de %s: %d chaves, %d slots", path, store.n_keys, snap.height)
+        return store
+
+    def stats(self) -> dict[str, object]:
+        """``keys``, ``capacity`` e ``slots_filled`` para ``/stats``."""
+        with self._lock:
+            return {
+                "keys":         len(self._index),
+                "capacity":     self._hour.shape[0],
+                "slots_filled": int((self._hour[: len(self._index)] >= 0).sum()),
+                "window_hours": _SLOTS,
+            }
+
+    # ── Internos ─────────────────────────────────────────────────────────
+
+    def _slot_for(self, key: tuple[int, str]) -> int:
+        """Linha da chave nos arrays (aloca e, se preciso, dobra a capacidade). Chamar sob lock."""
+        k = self._index.get(key)
+        if k is not None:
+            return k
+        k = len(self._index)
+        if k == self._hour.shape[0]:
+            grow = self._hour.shape[0]
+            self._sum = np.vstack([self._sum, np.zeros((grow, _SLOTS), dtype=np.float64)])
+            self._count = np.vstack([self._count, np.zeros((grow, _SLOTS), dtype=np.int32)])
+            self._hour = np.vstack([self._hour, np.full((grow, _SLOTS), -1, dtype=np.int64)])
+        self._index[key] = k
+        return k
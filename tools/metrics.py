@@ -0,0 +1,367 @@
+"""
+Metrics — Contadores e histogramas no formato texto do Prometheus
+=================================================================
+
+O middleware de ``api_server.py`` só loga o tempo total de cada requisição —
+não dá para saber se uma regressão de p99 vem do pré-processamento polars ou
+do TensorFlow. Este módulo mede cada estágio da inferência e expõe tudo em
+``GET /metrics`` (formato de exposição texto 0.0.4, sem dependência externa):
+
+    FeatureDeriver.derive ─┬─ stage="derive"
+                           └─ stage="geo_lookup"        (grade KNN-1)
+    ModelSchema (DL/ML)   ─── stage="schema_transform"
+    model.predict         ─── stage="model_predict"
+    resposta da API       ─── stage="serialize"
+    modelo de segmento    ─── stage="segment_load"     (carga sob demanda)
+
+Métricas registradas em ``REGISTRY``:
+    - ``hvac_stage_duration_seconds{stage}``            histograma por estágio
+    - ``hvac_request_duration_seconds{route,status}``   histograma por rota HTTP
+    - ``hvac_batch_size_rows{endpoint}``                linhas por requisição
+    - ``hvac_model_batch_rows``                         linhas por forward pass
+    - ``hvac_rows_predicted_total{endpoint}``           contador de linhas
+    - ``hvac_errors_total{endpoint,type}``              erros por tipo de exceção
+    - ``hvac_model_load_seconds``                       duração da última carga
+    - ``hvac_model_reloads_total{result}``              hot reloads (ok, unchanged, failed)
+    - ``hvac_warmup_seconds{target,batch_size}``        warm-up da última carga por lote
+    - ``hvac_model_ready``                              1 quando há modelo aquecido servindo
+    - ``hvac_segment_rows_total{segment,model}``        linhas por segmento/modelo
+    - ``hvac_segment_loads_total{segment}``             cargas sob demanda
+    - ``hvac_segment_evictions_total{segment}``         evicções LRU
+    - ``hvac_segment_resident_bytes``                   memória estimada dos segmentos
+    - ``hvac_prediction_cache_{hits,misses}_total``     linhas servidas/computadas
+    - ``hvac_prediction_cache_entries``                 tamanho atual do cache
+    - ``hvac_lag_rows_ingested_total``                  leituras aceitas pelo lag store
+    - ``hvac_lag_lookup_rows_total{result}``            linhas com lags (hit, partial, miss)
+    - ``hvac_lag_keys``                                 chaves (unit_id, machine_type) no store
+
+Uso:
+    >>> with stage_timer("model_predict"):
+    ...     preds = model.predict(inputs)
+    >>> ROWS_PREDICTED.inc(len(preds), endpoint="predict_batch")
+    >>> body = REGISTRY.render()
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Iterator
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Buckets em segundos: de 0.5 ms (geo lookup de 1 linha) a 30 s (lote de 50k)
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+# Buckets em linhas: potências de 4 de 1 a 64k
+ROW_BUCKETS: tuple[float, ...] = tuple(float(4 ** i) for i in range(9))
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  TIPOS DE MÉTRICA
+# ══════════════════════════════════════════════════════════════════════════════
+
+class _Metric:
+    """Base: nome, help, labels e um lock por métrica."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name}: labels esperados {self.labelnames}, recebidos {tuple(labels)}"
+            )
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _fmt_labels(self, key: tuple[str, ...], extra: tuple[tuple[str, str], ...] = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Contador monotônico (``*_total``)."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        # Série sem labels é exposta desde o início (valor 0)
+        self._values: dict[tuple[str, ...], float] = {} if labelnames else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counter só pode ser incrementado")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._fmt_labels(k)} {_num(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Valor instantâneo (pode subir e descer)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        # Série sem labels é exposta desde o início (valor 0)
+        self._values: dict[tuple[str, ...], float] = {} if labelnames else {(): 0.0}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._fmt_labels(k)} {_num(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    """
+    Histograma com buckets fixos (``_bucket`` cumulativo, ``_sum``, ``_count``).
+
+    ``observe()`` é O(log n_buckets) sob lock — barato o bastante para rodar
+    em cada estágio de cada requisição.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        # {labels: [contagens por bucket (+Inf no fim), soma, n]}
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observa a duração (s) do bloco ``with``, inclusive se ele levantar."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[2] if series else 0
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._series.items())
+        lines: list[str] = []
+        for key, (counts, total, n) in items:
+            cumulative = 0
+            for bound, c in zip((*self.buckets, math.inf), counts):
+                cumulative += c
+                le = "+Inf" if bound == math.inf else _num(bound)
+                lines.append(
+                    f"{self.name}_bucket{self._fmt_labels(key, (('le', le),))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{self._fmt_labels(key)} {_num(total)}")
+            lines.append(f"{self.name}_count{self._fmt_labels(key)} {n}")
+        return lines
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  REGISTRO
+# ══════════════════════════════════════════════════════════════════════════════
+
+class MetricsRegistry:
+    """Coleção de métricas renderizada em conjunto por ``/metrics``."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica já registrada: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "hvac_stage_duration_seconds",
+    "Duração de cada estágio da inferência (derive, geo_lookup, schema_transform, model_predict, serialize, segment_load).",
+    ("stage",),
+))
+REQUEST_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "hvac_request_duration_seconds",
+    "Duração total das requisições HTTP por rota e status.",
+    ("route", "status"),
+))
+BATCH_SIZE: Histogram = REGISTRY.register(Histogram(
+    "hvac_batch_size_rows",
+    "Linhas por requisição de predição.",
+    ("endpoint",),
+    buckets=ROW_BUCKETS,
+))
+MODEL_BATCH_ROWS: Histogram = REGISTRY.register(Histogram(
+    "hvac_model_batch_rows",
+    "Linhas por chamada a model.predict (após micro-batching/chunking).",
+    buckets=ROW_BUCKETS,
+))
+ROWS_PREDICTED: Counter = REGISTRY.register(Counter(
+    "hvac_rows_predicted_total",
+    "Linhas preditas com sucesso.",
+    ("endpoint",),
+))
+ERRORS: Counter = REGISTRY.register(Counter(
+    "hvac_errors_total",
+    "Erros de predição por endpoint e tipo de exceção.",
+    ("endpoint", "type"),
+))
+MODEL_LOAD_SECONDS: Gauge = REGISTRY.register(Gauge(
+    "hvac_model_load_seconds",
+    "Duração (s) da última carga do modelo.",
+))
+MODEL_RELOADS: Counter = REGISTRY.register(Counter(
+    "hvac_model_reloads_total",
+    "Hot reloads do modelo por resultado (ok, unchanged, failed).",
+    ("result",),
+))
+WARMUP_SECONDS: Gauge = REGISTRY.register(Gauge(
+    "hvac_warmup_seconds",
+    "Duração (s) de cada lote sintético do warm-up da última carga (global ou segments).",
+    ("target", "batch_size"),
+))
+MODEL_READY: Gauge = REGISTRY.register(Gauge(
+    "hvac_model_ready",
+    "1 quando um modelo aquecido está servindo (mesmo critério de /ready).",
+))
+
+SEGMENT_ROWS: Counter = REGISTRY.register(Counter(
+    "hvac_segment_rows_total",
+    "Linhas roteadas por tipo de máquina normalizado e modelo que as atendeu (dl, ml, global).",
+    ("segment", "model"),
+))
+SEGMENT_LOADS: Counter = REGISTRY.register(Counter(
+    "hvac_segment_loads_total",
+    "Cargas sob demanda de modelos de segmento.",
+    ("segment",),
+))
+SEGMENT_EVICTIONS: Counter = REGISTRY.register(Counter(
+    "hvac_segment_evictions_total",
+    "Modelos de segmento descarregados pelo orçamento de memória (LRU).",
+    ("segment",),
+))
+SEGMENT_RESIDENT_BYTES: Gauge = REGISTRY.register(Gauge(
+    "hvac_segment_resident_bytes",
+    "Memória estimada dos modelos de segmento carregados.",
+))
+CACHE_HITS: Counter = REGISTRY.register(Counter(
+    "hvac_prediction_cache_hits_total",
+    "Linhas servidas pelo cache de predições.",
+))
+CACHE_MISSES: Counter = REGISTRY.register(Counter(
+    "hvac_prediction_cache_misses_total",
+    "Linhas ausentes (ou expiradas) no cache de predições.",
+))
+CACHE_ENTRIES: Gauge = REGISTRY.register(Gauge(
+    "hvac_prediction_cache_entries",
+    "Linhas atualmente no cache de predições.",
+))
+LAG_ROWS_INGESTED: Counter = REGISTRY.register(Counter(
+    "hvac_lag_rows_ingested_total",
+    "Leituras de consumo aceitas pelo lag store.",
+))
+LAG_LOOKUP_ROWS: Counter = REGISTRY.register(Counter(
+    "hvac_lag_lookup_rows_total",
+    "Linhas preditas por disponibilidade das features de lag (hit, partial, miss).",
+    ("result",),
+))
+LAG_KEYS: Gauge = REGISTRY.register(Gauge(
+    "hvac_lag_keys",
+    "Chaves (unit_id, machine_type) com histórico no lag store.",
+))
+
+
+def stage_timer(stage: str):
+    """Atalho para ``STAGE_SECONDS.time(stage=stage)``."""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  HELPERS
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
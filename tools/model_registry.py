@@ -0,0 +1,505 @@
+"""
+Model Registry — Roteamento por tipo de máquina com carga preguiçosa e LRU
+==========================================================================
+
+A API servia apenas ``model/artifacts/dl_hvac/global``, mas os modelos por
+segmento (``segment_*`` do ``SegmentedDLPipeline`` e ``best_pipeline.joblib``
+do ``SegmentedMLPipeline``) costumam ser mais precisos para o seu tipo de
+máquina. Este módulo roteia cada linha ao modelo do seu segmento:
+
+    lote bruto ──► FeatureDeriver.derive()            (uma vez por lote)
+                          │
+                   tipo_maquina normalizado            (espelha SegmentedDLPipeline)
+                          │
+        ┌─────────────────┼──────────────────┐
+    SPLITÃO           SPLIT HI-WALL      desconhecido / sem artefato /
+    transform_derived transform_derived  fora do vocabulário do Embedding
+    + predict         + predict                    │
+        │                 │                 modelo global
+        └─────────────────┴──────────────────┘
+                          │
+                 predições na ordem original
+
+Derivação de datas e geo lookup rodam uma única vez; cada segmento aplica
+apenas a cauda do normalizer (OHE, clipping com os limites do segmento,
+alinhamento) às suas linhas.
+
+Os modelos de segmento são carregados no primeiro uso e mantidos em um LRU
+limitado por orçamento de memória: ao exceder ``memory_budget_mb``, os menos
+usados recentemente são descartados (e recarregados se voltarem a aparecer).
+O custo de cada modelo é o aumento de RSS medido durante a carga, com piso
+no tamanho do artefato em disco.
+
+Fontes por segmento (``source``):
+    - ``"dl"``   : ``segment_*`` do manifesto DL (padrão)
+    - ``"ml"``   : pipelines do manifesto ML; DL se o ``.joblib`` não existir
+    - ``"best"`` : o de menor RMSE nas métricas dos manifestos
+
+Uso:
+    >>> registry = SegmentedModelRegistry(global_api, "model/artifacts/dl_hvac")
+    >>> preds = registry.predict(df)
+    >>> registry.stats()["resident"]
+"""
+
+from __future__ import annotations
+
+import gc
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+try:
+    from .inference_runner import HVACDLInferenceAPI, HVACMLInferenceAPI, run_pipelined
+    from .metrics import (
+        SEGMENT_EVICTIONS,
+        SEGMENT_LOADS,
+        SEGMENT_RESIDENT_BYTES,
+        SEGMENT_ROWS,
+        stage_timer,
+    )
+    from .normalizer import FeatureDeriver
+    from .numpy_engine import dl_model_file
+except ImportError:
+    from inference_runner import HVACDLInferenceAPI, HVACMLInferenceAPI, run_pipelined
+    from metrics import (
+        SEGMENT_EVICTIONS,
+        SEGMENT_LOADS,
+        SEGMENT_RESIDENT_BYTES,
+        SEGMENT_ROWS,
+        stage_timer,
+    )
+    from normalizer import FeatureDeriver
+    from numpy_engine import dl_model_file
+
+from model.pre_process.schema import ModelSchema
+
+_logger = logging.getLogger(__name__)
+
+_SOURCES = ("dl", "ml", "best")
+
+# Rótulos de SEGMENT_ROWS: modelo global / tipos fora dos manifestos
+_GLOBAL = "global"
+_OTHER = "OUTROS"
+
+
+@dataclass(frozen=True)
+class SegmentSpec:
+    """
+    Artefato de um segmento, resolvido a partir dos manifestos.
+
+    Attributes:
+        segment : tipo_maquina normalizado (chave do manifesto).
+        family  : ``"dl"`` ou ``"ml"``.
+        path    : Diretório do artefato (``keras_model.keras``/``numpy_model.npz``
+                  ou ``best_pipeline.joblib``).
+        rmse    : RMSE de teste registrado no manifesto (``inf`` se ausente).
+    """
+
+    segment: str
+    family:  str
+    path:    Path
+    rmse:    float = float("inf")
+
+    @property
+    def artifact_file(self) -> Path:
+        if self.family == "dl":
+            return dl_model_file(self.path)
+        return self.path / "best_pipeline.joblib"
+
+
+class _Resident:
+    """Modelo de segmento carregado + custo estimado em bytes."""
+
+    __slots__ = ("spec", "api", "nbytes")
+
+    def __init__(self, spec: SegmentSpec, api, nbytes: int) -> None:
+        self.spec = spec
+        self.api = api
+        self.nbytes = nbytes
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  ROTEAMENTO
+# ══════════════════════════════════════════════════════════════════════════════
+
+def segment_keys(df: pl.DataFrame) -> pl.Series:
+    """
+    tipo_maquina normalizado de cada linha — mesma regra de
+    ``SegmentedDLPipeline.predict()`` (nulo/vazio → ``"DESCONHECIDO"``).
+    """
+    normalized = (
+        ModelSchema(df.select("machine_type"), ["machine_type"])
+        .adjust_machine_type()
+        .df["tipo_maquina"]
+        .cast(pl.String)
+    )
+    return (
+        pl.DataFrame({"k": normalized})
+        .select(
+            pl.when(pl.col("k").is_null() | (pl.col("k").str.strip_chars() == ""))
+            .then(pl.lit("DESCONHECIDO"))
+            .otherwise(pl.col("k"))
+            .alias("segment")
+        )
+        .to_series()
+    )
+
+
+def load_segment_specs(
+    dl_root: str | Path | None,
+    ml_root: str | Path | None = None,
+    source: str = "dl",
+) -> dict[str, SegmentSpec]:
+    """
+    Lê ``manifest.json`` dos pipelines segmentados e escolhe um artefato por segmento.
+
+    Segmentos listados no manifesto mas sem artefato em disco são ignorados
+    (as linhas desses tipos ficam com o modelo global).
+
+    Args:
+        dl_root: Diretório salvo por ``SegmentedDLPipeline.save()``.
+        ml_root: Diretório salvo por ``SegmentedMLPipeline.save()`` (opcional).
+        source : ``"dl"``, ``"ml"`` ou ``"best"``.
+
+    Returns:
+        {tipo_maquina normalizado: SegmentSpec}
+    """
+    if source not in _SOURCES:
+        raise ValueError(f"source deve ser um de {_SOURCES}, recebido {source!r}")
+
+    candidates: dict[str, list[SegmentSpec]] = {}
+
+    if dl_root is not None and (Path(dl_root) / "manifest.json").exists():
+        manifest = _read_manifest(Path(dl_root))
+        for seg, dname in manifest.get("segment_dirs", {}).items():
+            spec = SegmentSpec(seg, "dl", Path(dl_root) / dname, _rmse(manifest, seg))
+            candidates.setdefault(seg, []).append(spec)
+
+    if ml_root is not None and (Path(ml_root) / "manifest.json").exists():
+        manifest = _read_manifest(Path(ml_root))
+        for seg, fname in manifest.get("segment_files", {}).items():
+            spec = SegmentSpec(seg, "ml", (Path(ml_root) / fname).parent, _rmse(manifest, seg))
+            candidates.setdefault(seg, []).append(spec)
+
+    specs: dict[str, SegmentSpec] = {}
+    for seg, options in candidates.items():
+        options = [s for s in options if s.artifact_file.exists()]
+        if not options:
+            _logger.warning("Segmento '%s' sem artefato em disco — usará o modelo global", seg)
+            continue
+        if source == "best":
+            options.sort(key=lambda s: s.rmse)
+        else:
+            options.sort(key=lambda s: s.family != source)
+        specs[seg] = options[0]
+    return specs
+
+
+def segment_artifact_files(specs: dict[str, SegmentSpec]) -> list[Path]:
+    """Arquivos que definem as predições de ``specs`` (manifestos + artefatos)."""
+    files: list[Path] = []
+    for spec in specs.values():
+        files += [spec.artifact_file, spec.path / "meta.json", spec.path / "metadata_norm.json"]
+        files.append(spec.path.parent / "manifest.json")
+    return sorted(set(files))
+
+
+def predictor_artifact_files(
+    artifact_path: str | Path,
+    dl_root: str | Path | None = None,
+    ml_root: str | Path | None = None,
+    source: str = "dl",
+) -> list[Path]:
+    """
+    Arquivos que definem as predições do preditor servido: modelo global
+    (pesos, ``meta.json``, ``metadata_norm.json``) + manifestos e artefatos
+    dos segmentos escolhidos por ``load_segment_specs``.
+
+    Base da versão dos artefatos da API e do fingerprint dos workers de
+    ``/jobs`` — o re-treino de um único segmento muda os dois.
+    """
+    artifact_path = Path(artifact_path)
+    files = [
+        dl_model_file(artifact_path),
+        artifact_path / "meta.json",
+        artifact_path / "metadata_norm.json",
+    ]
+    if dl_root is None and ml_root is None:
+        return files
+    files += [Path(root) / "manifest.json" for root in (dl_root, ml_root) if root is not None]
+    files += segment_artifact_files(load_segment_specs(dl_root, ml_root, source))
+    return sorted(set(files))
+
+
+def _read_manifest(root: Path) -> dict:
+    with (root / "manifest.json").open(encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _rmse(manifest: dict, segment: str) -> float:
+    value = manifest.get("metrics", {}).get(segment, {}).get("RMSE")
+    return float(value) if value is not None else float("inf")
+
+
+def _rss_bytes() -> int:
+    """RSS atual do processo (Linux); 0 se indisponível."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  REGISTRO
+# ══════════════════════════════════════════════════════════════════════════════
+
+class SegmentedModelRegistry:
+    """
+    Roteia linhas aos modelos de segmento, com fallback para o modelo global.
+
+    Mesma interface de ``HVACDLInferenceAPI`` (``predict`` / ``predict_batch``),
+    para ser usado no lugar dele pela API.
+
+    Attributes:
+        global_api       : Modelo global (sempre residente, fora do orçamento).
+        specs            : {tipo_maquina normalizado: SegmentSpec}.
+        memory_budget_mb : Orçamento dos modelos de segmento residentes.
+        engine           : Engine dos segmentos DL (``"keras"`` | ``"numpy"``).
+        jit_compile      : Compila com XLA o atalho ``tf.function`` (engine keras).
+        ml_engine        : Engine dos segmentos ML (``"native"`` | ``"numpy"``).
+    """
+
+    def __init__(
+        self,
+        global_api: HVACDLInferenceAPI,
+        dl_root: str | Path | None,
+        ml_root: str | Path | None = None,
+        source: str = "dl",
+        memory_budget_mb: float = 256.0,
+        engine: str = "keras",
+        jit_compile: bool = False,
+        ml_engine: str = "native",
+    ) -> None:
+        if memory_budget_mb <= 0:
+            raise ValueError("memory_budget_mb deve ser > 0")
+
+        self.global_api = global_api
+        self.specs = load_segment_specs(dl_root, ml_root, source)
+        self.source = source
+        self.memory_budget_mb = float(memory_budget_mb)
+        self.engine = engine
+        self.jit_compile = jit_compile
+        self.ml_engine = ml_engine
+
+        self._resident: OrderedDict[str, _Resident] = OrderedDict()
+        self._failed: dict[str, str] = {}
+        self._lock = threading.Lock()
+        # Um lock por segmento: duas requisições não carregam o mesmo modelo em dobro
+        self._load_locks = {seg: threading.Lock() for seg in self.specs}
+        self._n_loads = 0
+        self._n_evictions = 0
+
+        _logger.info(
+            "Registro de segmentos: %d segmento(s) (source=%s, orçamento=%.0f MB): %s",
+            len(self.specs), source, self.memory_budget_mb,
+            {seg: spec.family for seg, spec in self.specs.items()},
+        )
+
+    # ── API pública ──────────────────────────────────────────────────────
+
+    def predict(self, df: pl.DataFrame) -> np.ndarray:
+        """
+        Prediz cada linha com o modelo do seu tipo de máquina.
+
+        Args:
+            df: DataFrame bruto (mesmo schema de ``HVACDLInferenceAPI.predict``).
+
+        Returns:
+            np.ndarray (n,) na ordem original.
+        """
+        return self._predict_derived(FeatureDeriver.derive(df))
+
+    def route(self, derived: pl.DataFrame) -> tuple[np.ndarray, list[tuple[_Resident, np.ndarray]], np.ndarray]:
+        """
+        Separa as linhas de um lote já derivado pelo modelo que as prediz.
+
+        Regra de ``predict``: segmento residente do tipo de máquina; nos
+        segmentos DL, só as linhas dentro do vocabulário dos Embeddings.
+        O restante fica com o modelo global.
+
+        Returns:
+            (keys, grupos, idx_global) — tipo_maquina normalizado de cada linha,
+            [(residente, índices)] por segmento e índices do modelo global.
+        """
+        keys = segment_keys(derived)
+        keys_np = keys.to_numpy()
+        use_global = np.ones(len(derived), dtype=bool)
+        groups: list[tuple[_Resident, np.ndarray]] = []
+
+        for seg in keys.unique().to_list():
+            if seg not in self.specs or seg in self._failed:
+                continue
+            resident = self._acquire(seg)
+            if resident is None:
+                continue
+
+            rows = keys_np == seg
+            if resident.spec.family == "dl":
+                # Linhas fora do vocabulário dos Embeddings do segmento → global
+                rows &= resident.api.normalizer.embedding_domain_mask(derived)
+            idx = np.flatnonzero(rows)
+            if not len(idx):
+                continue
+            groups.append((resident, idx))
+            use_global[idx] = False
+
+        return keys_np, groups, np.flatnonzero(use_global)
+
+    def _predict_derived(self, derived: pl.DataFrame) -> np.ndarray:
+        """Roteia um lote já passado por ``FeatureDeriver.derive()``."""
+        keys_np, groups, idx = self.route(derived)
+        result = np.empty(len(derived), dtype=np.float32)
+
+        for resident, rows in groups:
+            result[rows] = resident.api.predict_derived(derived[rows])
+            SEGMENT_ROWS.inc(len(rows), segment=resident.spec.segment, model=resident.spec.family)
+
+        if len(idx):
+            subset = derived if len(idx) == len(derived) else derived[idx]
+            result[idx] = self.global_api.predict_derived(subset)
+            for seg, n in zip(*np.unique(keys_np[idx], return_counts=True)):
+                # Tipos fora dos manifestos viram um único rótulo (cardinalidade limitada)
+                label = str(seg) if seg in self.specs else _OTHER
+                SEGMENT_ROWS.inc(int(n), segment=label, model=_GLOBAL)
+
+        return result
+
+    def predict_batch(self, df: pl.DataFrame, batch_size: int = 1024, prefetch: int = 0) -> np.ndarray:
+        """
+        Mesma semântica de ``HVACDLInferenceAPI.predict_batch``.
+
+        Com ``prefetch`` > 0 a etapa sobreposta ao modelo é a derivação
+        (datas + geo lookup) do lote seguinte.
+        """
+        n_rows = len(df)
+        batches = (df.slice(i, min(batch_size, n_rows - i)) for i in range(0, n_rows, batch_size))
+        if prefetch > 0:
+            predictions = run_pipelined(batches, FeatureDeriver.derive, self._predict_derived, prefetch)
+        else:
+            predictions = [self.predict(batch) for batch in batches]
+        return np.concatenate(predictions) if predictions else np.array([])
+
+    def artifact_files(self) -> list[Path]:
+        """Arquivos que definem as predições do registro (manifestos + artefatos)."""
+        return segment_artifact_files(self.specs)
+
+    def stats(self) -> dict[str, object]:
+        """
+        Estado do registro para ``/stats``.
+
+        Returns:
+            dict com:
+                - ``"source"``           : fonte configurada
+                - ``"memory_budget_mb"`` : orçamento
+                - ``"resident_mb"``      : memória estimada dos residentes
+                - ``"resident"``         : {segmento: {family, mb}} do menos ao mais recente
+                - ``"available"``        : {segmento: family} de todos os segmentos
+                - ``"failed"``           : {segmento: erro} — servidos pelo global
+                - ``"n_loads"`` / ``"n_evictions"``
+        """
+        with self._lock:
+            resident = {
+                seg: {"family": r.spec.family, "mb": round(r.nbytes / 2**20, 2)}
+                for seg, r in self._resident.items()
+            }
+            total = sum(r.nbytes for r in self._resident.values())
+            return {
+                "source":           self.source,
+                "memory_budget_mb": self.memory_budget_mb,
+                "resident_mb":      round(total / 2**20, 2),
+                "resident":         resident,
+                "available":        {seg: s.family for seg, s in self.specs.items()},
+                "failed":           dict(self._failed),
+                "n_loads":          self._n_loads,
+                "n_evictions":      self._n_evictions,
+            }
+
+    # ── Internos ─────────────────────────────────────────────────────────
+
+    def _acquire(self, seg: str) -> _Resident | None:
+        """Devolve o modelo do segmento, carregando-o se necessário (None se falhou)."""
+        with self._lock:
+            resident = self._resident.get(seg)
+            if resident is not None:
+                self._resident.move_to_end(seg)
+                return resident
+
+        with self._load_locks[seg]:
+            with self._lock:
+                resident = self._resident.get(seg)
+                if resident is not None:
+                    self._resident.move_to_end(seg)
+                    return resident
+                if seg in self._failed:
+                    return None
+            resident = self._load(self.specs[seg])
+            if resident is None:
+                return None
+            with self._lock:
+                self._resident[seg] = resident
+                self._n_loads += 1
+                evicted = self._evict_over_budget(keep=seg)
+                SEGMENT_RESIDENT_BYTES.set(sum(r.nbytes for r in self._resident.values()))
+
+        if evicted:
+            # Modelos Keras têm ciclos de referência: libera já, não no próximo GC
+            gc.collect()
+        return resident
+
+    def _load(self, spec: SegmentSpec) -> _Resident | None:
+        rss0 = _rss_bytes()
+        t0 = time.perf_counter()
+        try:
+            with stage_timer("segment_load"):
+                if spec.family == "dl":
+                    api = HVACDLInferenceAPI(spec.path, engine=self.engine, jit_compile=self.jit_compile)
+                else:
+                    api = HVACMLInferenceAPI(spec.path, engine=self.ml_engine)
+        except Exception as exc:
+            # Não tenta de novo a cada lote: o segmento passa a usar o global
+            _logger.error("Falha ao carregar segmento '%s' (%s): %s", spec.segment, spec.path, exc)
+            with self._lock:
+                self._failed[spec.segment] = f"{type(exc).__name__}: {exc}"
+            return None
+
+        nbytes = max(_rss_bytes() - rss0, spec.artifact_file.stat().st_size)
+        SEGMENT_LOADS.inc(segment=spec.segment)
+        _logger.info(
+            "Segmento '%s' (%s) carregado em %.2fs (~%.1f MB)",
+            spec.segment, spec.family, time.perf_counter() - t0, nbytes / 2**20,
+        )
+        return _Resident(spec, api, nbytes)
+
+    def _evict_over_budget(self, keep: str) -> list[str]:
+        """Descarta os menos usados até caber no orçamento (chamado sob ``_lock``)."""
+        budget = self.memory_budget_mb * 2**20
+        evicted: list[str] = []
+        while sum(r.nbytes for r in self._resident.values()) > budget:
+            seg = next(iter(self._resident))
+            if seg == keep:
+                break
+            del self._resident[seg]
+            evicted.append(seg)
+            self._n_evictions += 1
+            SEGMENT_EVICTIONS.inc(segment=seg)
+            _logger.info("Segmento '%s' descartado (orçamento de %.0f MB)", seg, self.memory_budget_mb)
+        return evicted
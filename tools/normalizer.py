@@ -9,7 +9,7 @@ lógica entre ``DLPipeline.predict()``, ``tools/dl_pred.py`` e
 
 **MUDANÇA IMPORTANTE (Message 13):** grupo_regional é agora derivado AUTOMATICAMENTE
 a partir de latitude/longitude usando o arquivo geo_reference.parquet (mapa DBSCAN
-do treinamento com BallTree Haversine KNN-1 para lookup). Não é aceito como input.
+do treinamento com KNN-1 Haversine via grid index para lookup). Não é aceito como input.
 
 Fluxo:
 
@@ -18,7 +18,7 @@ Fluxo:
         ├─ DLNormalizer.transform(df)
         │       0. FeatureDeriver.derive()
         │          ├─ Derivação de features de data (ano, mes, trimestre, etc)
-        │          └─ Derivação de grupo_regional via BallTree KNN-1 (lat/lon → geo_reference.parquet)
+        │          └─ Derivação de grupo_regional via grid index KNN-1 (lat/lon → geo_reference.parquet)
         │       1. Insere dummy target (0.0)
         │       2. Extrai hora, mes, grupo_regional, periodo_dia brutos (Int32)
         │       3. ModelSchema.build()  → OHE, Clipping+MinMax, date features
@@ -32,7 +32,7 @@ Fluxo:
         └─ MLNormalizer.transform(df)
                 0. FeatureDeriver.derive()
                    ├─ Derivação de features de data (ano, mes, trimestre, etc)
-                   └─ Derivação de grupo_regional via BallTree KNN-1 (lat/lon → geo_reference.parquet)
+                   └─ Derivação de grupo_regional via grid index KNN-1 (lat/lon → geo_reference.parquet)
                 1. Insere dummy target (0.0)
                 2. ModelSchema.build()  → OHE, Clipping+MinMax, date features,
                    Target Encoding, Categorical encoding
@@ -59,20 +59,23 @@ Uso:
 
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 
 import numpy as np
 import polars as pl
-from sklearn.neighbors import BallTree
 
 _ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(_ROOT))
 
+from dataframe.complementary_features.regional_group.grid_index import GRID_INDEX_NAME, GeoGridIndex
 from model.pre_process.schema import ModelSchema
+from tools.metrics import stage_timer
+from tools.transform_plan import _FLOAT_DTYPES, EMBEDDING_OUTPUTS, TransformPlan, _sanitized
 
 _logger = logging.getLogger(__name__)
 
@@ -92,9 +95,22 @@ _EMB_COLS: list[str] = ["grupo_regional", "hora", "mes", "periodo_dia"]
 # Caminho do artefato geográfico (mapa de coordenadas únicas → grupo_regional)
 _GEO_REF_PATH = _ROOT / "use_case" / "files" / "geo_reference.parquet"
 
-# Cache do lookup geográfico (BallTree + labels carregados do artefato)
-_geo_tree: BallTree | None = None
-_geo_labels: np.ndarray | None = None
+# Sidecar gravado ao lado de cada best_pipeline.joblib: metadados do MLNormalizer
+# (feature_columns, Target Encoding, clipping) legíveis sem desserializar o modelo
+ML_SIDECAR_NAME = "normalizer_meta.json"
+
+# Grid index KNN-1 ao lado do geo_reference.parquet (cell → pontos candidatos)
+_GEO_GRID_PATH = _GEO_REF_PATH.with_name(GRID_INDEX_NAME)
+
+# Cache do lookup geográfico (grid index carregado do artefato)
+_geo_index: GeoGridIndex | None = None
+
+# Memo coordenada → grupo_regional entre chamadas (FIFO, em pares únicos);
+# lotes pequenos consultam o grid index direto (mais barato que os joins)
+_GEO_MEMO_SIZE = 16_384
+_GEO_DIRECT_ROWS = 64
+_GEO_KEYS = ["latitude", "longitude"]
+_geo_memo: pl.DataFrame | None = None
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -154,24 +170,26 @@ def compute_normalization_stats(
 #  FEATURE DERIVER — Reaproveita ModelSchema + geo_reference.parquet
 # ══════════════════════════════════════════════════════════════════════════════
 
-def _get_geo_lookup() -> tuple[BallTree, np.ndarray]:
+def _get_geo_lookup() -> GeoGridIndex:
     """
-    Carrega o artefato ``geo_reference.parquet`` (gerado pelo DBSCAN
-    no treinamento) e devolve um ``BallTree`` Haversine + vetor de labels.
+    Carrega o grid index KNN-1 Haversine de ``geo_reference.parquet`` (mapa
+    DBSCAN do treinamento) — ``geo_grid.npz``, ao lado do parquet.
 
     O artefato contém as coordenadas únicas de treinamento já
     rotuladas com ``grupo_regional``. Na inferência basta localizar
     o vizinho mais próximo via KNN-1 Haversine — nenhum re-treinamento ocorre.
-    
+    Sem ``geo_grid.npz`` (ou exportado de outro parquet) o índice é montado
+    em memória a partir do parquet.
+
     Returns:
-        tuple[BallTree, np.ndarray]: (tree, labels)
-        
+        GeoGridIndex com os rótulos de ``grupo_regional``.
+
     Raises:
         FileNotFoundError: Se geo_reference.parquet não existe
     """
-    global _geo_tree, _geo_labels
-    if _geo_tree is not None:
-        return _geo_tree, _geo_labels  # type: ignore[return-value]
+    global _geo_index
+    if _geo_index is not None:
+        return _geo_index
 
     if not _GEO_REF_PATH.exists():
         raise FileNotFoundError(
@@ -180,14 +198,25 @@ def _get_geo_lookup() -> tuple[BallTree, np.ndarray]:
             f"Execute o pipeline de treinamento primeiro para gerar geo_reference.parquet"
         )
 
-    _logger.info("Carregando referência geográfica de %s ...", _GEO_REF_PATH.name)
-    ref = pl.read_parquet(_GEO_REF_PATH)
-    coords_rad = np.radians(ref.select(["latitude", "longitude"]).to_numpy())
-    _geo_labels = ref["grupo_regional"].to_numpy()
-    _geo_tree = BallTree(coords_rad, metric="haversine")
-    return _geo_tree, _geo_labels
+    _logger.info("Carregando referência geográfica de %s ...", _GEO_GRID_PATH.name)
+    try:
+        _geo_index = GeoGridIndex.load(_GEO_GRID_PATH, _GEO_REF_PATH)
+    except (FileNotFoundError, ValueError) as exc:
+        _logger.warning("%s — grid index montado a partir de %s", exc, _GEO_REF_PATH.name)
+        # pyarrow sem threads: não inicializa o thread pool do polars, então o
+        # lookup pode ser pré-carregado antes de fork() (tools/prefork.py)
+        import pyarrow.parquet as pq
+
+        ref = pq.read_table(_GEO_REF_PATH, columns=["latitude", "longitude", "grupo_regional"], use_threads=False)
+        _geo_index = GeoGridIndex.build(
+            ref.column("latitude").to_numpy(),
+            ref.column("longitude").to_numpy(),
+            ref.column("grupo_regional").to_numpy(),
+        )
+    return _geo_index
 
 
+@stage_timer("geo_lookup")
 def _assign_grupo_regional_knn(df: pl.DataFrame) -> pl.DataFrame:
     """
     Atribui ``grupo_regional`` a cada linha via KNN-1 Haversine sobre
@@ -196,40 +225,44 @@ def _assign_grupo_regional_knn(df: pl.DataFrame) -> pl.DataFrame:
     • Linhas com lat/lon nulos recebem ``null``.
     • Coordenadas já conhecidas retornam o rótulo exato do treino.
     • Coordenadas novas recebem o grupo do vizinho mais próximo.
-    
+
+    Uma frota tem poucas centenas de coordenadas distintas: acima de
+    ``_GEO_DIRECT_ROWS`` linhas o grid index só é consultado para pares únicos
+    ainda fora do memo (``_GEO_MEMO_SIZE`` pares, os mais antigos saem
+    primeiro), e o resultado volta às linhas por join.
+
     Args:
         df: DataFrame com colunas 'latitude' e 'longitude'
         
     Returns:
         DataFrame com coluna 'grupo_regional' adicionada (Int32)
     """
-    tree, labels = _get_geo_lookup()
-
-    lats = df["latitude"].to_list()
-    lons = df["longitude"].to_list()
-
-    result: list[int | None] = []
-    query_idxs: list[int] = []
-    query_coords: list[tuple[float, float]] = []
+    global _geo_memo
+    if df.height <= _GEO_DIRECT_ROWS:
+        lat, lon = df["latitude"], df["longitude"]
+        valid = ~(lat.is_null() | lon.is_null()).to_numpy()
+        grupo = np.full(df.height, np.nan)
+        if valid.any():
+            grupo[valid] = _get_geo_lookup().assign(lat.to_numpy()[valid], lon.to_numpy()[valid])
+        return df.with_columns(pl.Series("grupo_regional", grupo, nan_to_null=True).cast(pl.Int32))
+
+    keys = df.select([pl.col(c).cast(pl.Float64) for c in _GEO_KEYS])
+    memo = _geo_memo
+    if memo is None:
+        memo = pl.DataFrame(schema={**keys.schema, "grupo_regional": pl.Int32})
+
+    unseen = keys.drop_nulls().unique().join(memo, on=_GEO_KEYS, how="anti")
+    if unseen.height:
+        labels = _get_geo_lookup().assign(unseen["latitude"].to_numpy(), unseen["longitude"].to_numpy())
+        memo = pl.concat([
+            memo,
+            unseen.with_columns(pl.Series("grupo_regional", labels, dtype=pl.Int32)),
+        ])
+        _geo_memo = memo.tail(_GEO_MEMO_SIZE)
+        _logger.debug("Geo lookup: %d coordenada(s) nova(s), memo com %d", unseen.height, _geo_memo.height)
 
-    for i, (lat, lon) in enumerate(zip(lats, lons)):
-        if lat is None or lon is None:
-            result.append(None)
-        else:
-            result.append(None)  # placeholder
-            query_idxs.append(i)
-            query_coords.append((lat, lon))
-
-    # Lookup em batch: converte para radianos e consulta BallTree
-    if query_idxs:
-        coords_rad = np.radians(np.array(query_coords))
-        _, indices = tree.query(coords_rad, k=1)
-        for idx, ref_idx in zip(query_idxs, indices.ravel()):
-            result[idx] = int(labels[ref_idx])
-
-    return df.with_columns(
-        pl.Series("grupo_regional", result, dtype=pl.Int32)
-    )
+    grupo = keys.join(memo, on=_GEO_KEYS, how="left", maintain_order="left")["grupo_regional"]
+    return df.with_columns(grupo)
 
 
 class FeatureDeriver:
@@ -248,7 +281,7 @@ class FeatureDeriver:
         5. is_vespera_feriado     ← De data
         6. is_dia_util            ← De weekday + feriado
         7. estacao                ← De mes (Verão/Outono/Inverno/Primavera)
-        8. grupo_regional         ← De latitude/longitude via BallTree Haversine KNN-1
+        8. grupo_regional         ← De latitude/longitude via grid index Haversine KNN-1
     
     **Observação:** grupo_regional é derivado via lookup de coordenadas geográficas
     usando o mapa pré-computado no treinamento (geo_reference.parquet). 
@@ -261,6 +294,7 @@ class FeatureDeriver:
     """
     
     @staticmethod
+    @stage_timer("derive")
     def derive(df: pl.DataFrame) -> pl.DataFrame:
         """
         Auto-deriva features usando ModelSchema.add_date_features() + geo lookup.
@@ -308,26 +342,13 @@ class FeatureDeriver:
         schema.clipping_limits_ = {}  # ✅ Inicializar atributo que foi bypassado pelo __new__()
         
         # Chama add_date_features() para derivar: mes, trimestre, 
-        # is_feriado, is_vespera_feriado, is_dia_util, periodo_dia
-        schema.add_date_features()
+        # is_feriado, is_vespera_feriado, is_dia_util, periodo_dia e estacao
+        # (tabela de calendário pré-computada; estacao por mês:
+        # Verão (12,1,2), Outono (3,4,5), Inverno (6,7,8), Primavera (9,10,11))
+        schema.add_date_features(with_estacao=True)
         df = schema.df
         
-        # Adiciona estacao (derivada de mes, não é feita por ModelSchema)
-        # Mapeamento: Verão (12,1,2), Outono (3,4,5), Inverno (6,7,8), Primavera (9,10,11)
-        df = df.with_columns(
-            pl.when(pl.col("mes").is_in([12, 1, 2]))
-              .then(pl.lit("verao"))
-              .when(pl.col("mes").is_in([3, 4, 5]))
-              .then(pl.lit("outono"))
-              .when(pl.col("mes").is_in([6, 7, 8]))
-              .then(pl.lit("inverno"))
-              .when(pl.col("mes").is_in([9, 10, 11]))
-              .then(pl.lit("primavera"))
-              .otherwise(pl.lit("desconhecida"))
-              .alias("estacao")
-        )
-        
-        # ── Deriva GRUPO REGIONAL via BallTree Haversine KNN-1 ──────────
+        # ── Deriva GRUPO REGIONAL via grid index Haversine KNN-1 ──────────
         # Reaproveita geo_reference.parquet (gerado no treinamento)
         # Se grupo_regional já existir, preserva e não exige coordenadas.
         if "grupo_regional" not in df.columns:
@@ -342,28 +363,61 @@ class FeatureDeriver:
 #  HELPERS
 # ══════════════════════════════════════════════════════════════════════════════
 
-def _sanitize(df: pl.DataFrame) -> pl.DataFrame:
-    """Substitui NaN/±inf por 0.0 em colunas float."""
-    for c in df.columns:
-        if df[c].dtype in (pl.Float32, pl.Float64):
-            if df[c].is_nan().any() or df[c].is_infinite().any():
-                dt = np.float32 if df[c].dtype == pl.Float32 else np.float64
-                arr = df[c].to_numpy().copy().astype(dt)
-                arr = np.where(np.isfinite(arr), arr, dt(0.0))
-                df = df.with_columns(pl.Series(c, arr))
-    return df
+def _non_finite_columns(df: pl.DataFrame, columns: list[str]) -> list[str]:
+    """
+    Colunas de ``columns`` (float) com algum NaN/±inf.
 
+    Uma única passada de ``sum`` (redução, sem alocar): NaN/±inf propagam na
+    soma, então coluna com soma finita está limpa. Uma soma que estoura para
+    ±inf sem NaN/inf na coluna também entra — sanitizá-la não muda nada.
+    """
+    if not columns:
+        return []
+    sums = df.select([pl.col(c).sum() for c in columns]).row(0)
+    return [c for c, total in zip(columns, sums) if not np.isfinite(total)]
+
+
+def _sanitize(df: pl.DataFrame, columns: list[str] | None = None) -> pl.DataFrame:
+    """
+    Substitui NaN/±inf por 0.0 em colunas float (nulos preservados).
 
-def _align_columns(df: pl.DataFrame, expected: list[str]) -> pl.DataFrame:
-    """Garante que df tenha exatamente as colunas esperadas, na ordem certa."""
-    # Adiciona colunas ausentes (OHE de categorias não presentes na amostra)
-    missing = set(expected) - set(df.columns)
-    if missing:
-        df = df.with_columns(
-            [pl.lit(0.0, dtype=pl.Float32).alias(c) for c in missing]
+    Um único ``with_columns`` com a expressão de ``TransformPlan``, só nas
+    colunas afetadas — sem ida e volta por NumPy nem um frame por coluna.
+
+    Args:
+        df     : DataFrame de entrada.
+        columns: Colunas com NaN/±inf já conhecidas; None = detecta entre as float.
+    """
+    if columns is None:
+        columns = _non_finite_columns(
+            df, [c for c, dtype in df.schema.items() if dtype in _FLOAT_DTYPES]
         )
-    # Remove colunas extras e reordena
-    return df.select(expected)
+    if not columns:
+        return df
+    return df.with_columns([_sanitized(pl.col(c)).alias(c) for c in columns])
+
+
+def _to_float32(df: pl.DataFrame, expected: list[str]) -> pl.DataFrame:
+    """
+    ``_sanitize`` + alinhamento + cast Float32 num único ``select``.
+
+    Garante exatamente as colunas ``expected``, na ordem certa: ausentes
+    (OHE de categorias não presentes na amostra) viram 0.0 e colunas float
+    com NaN/±inf são sanitizadas antes do cast.
+    """
+    schema = df.schema
+    dirty = set(_non_finite_columns(
+        df, [c for c in expected if schema.get(c) in _FLOAT_DTYPES]
+    ))
+    exprs = []
+    for c in expected:
+        if c not in schema:
+            exprs.append(pl.lit(0.0, dtype=pl.Float32).alias(c))
+        elif c in dirty:
+            exprs.append(_sanitized(pl.col(c)).cast(pl.Float32).alias(c))
+        else:
+            exprs.append(pl.col(c).cast(pl.Float32))
+    return df.select(exprs)
 
 
 def _ensure_target(df: pl.DataFrame) -> pl.DataFrame:
@@ -373,6 +427,40 @@ def _ensure_target(df: pl.DataFrame) -> pl.DataFrame:
     return df
 
 
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_ml_pipeline(path: str | Path, mmap_mode: str | None = None):
+    """
+    Desserializa um MLPipeline salvo (.joblib) — uma única vez por artefato.
+
+    Args:
+        path     : Caminho do ``best_pipeline.joblib``.
+        mmap_mode: Repassado a ``joblib.load`` (ex: ``"r"``): arrays NumPy do
+                   pickle viram memmaps somente-leitura em vez de cópias —
+                   processos que carregam o mesmo artefato dividem as páginas.
+
+    Returns:
+        O MLPipeline carregado.
+    """
+    import joblib
+    # O .joblib foi salvo com __main__.MLPipeline (executando ml_pipeline.py
+    # diretamente) — para o pickle desserializar, as classes precisam estar
+    # registradas no namespace __main__.
+    import __main__
+    from model.ml_pipeline import MLPipeline as _MLP, MLPipelineConfig as _MLPC
+    if not hasattr(__main__, "MLPipeline"):
+        __main__.MLPipeline = _MLP
+    if not hasattr(__main__, "MLPipelineConfig"):
+        __main__.MLPipelineConfig = _MLPC
+    return joblib.load(path, mmap_mode=mmap_mode)
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 #  DL NORMALIZER
 # ══════════════════════════════════════════════════════════════════════════════
@@ -401,6 +489,10 @@ class DLNormalizer:
     n_meses:         int
     n_periodos:      int
     clipping_limits: dict | None = None  # ✅ Novo
+    _plan:           TransformPlan = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._plan = TransformPlan(self.feature_columns, self.clipping_limits, embeddings=True)
 
     # ── Factory ──────────────────────────────────────────────────────────
 
@@ -458,7 +550,7 @@ class DLNormalizer:
                 machine_type, Temperatura_*, Umidade_*, Precipitacao_*, Velocidade_*, Pressao_*.
                 
                 **NOTA IMPORTANTE:** Requer 'latitude' e 'longitude' para derivar 
-                'grupo_regional' via lookup geográfico (BallTree Haversine). 
+                'grupo_regional' via lookup geográfico (grid index Haversine). 
                 Não aceita 'grupo_regional' pré-computado.
 
         Returns:
@@ -470,8 +562,52 @@ class DLNormalizer:
                 - ``"dense_features"`` : float32 (n, d)
         """
         # ── 0. Auto-deriva features ausentes ─────────────────────────────
-        df = FeatureDeriver.derive(df)
-        
+        return self.transform_derived(FeatureDeriver.derive(df))
+
+    def transform_derived(self, df: pl.DataFrame) -> dict[str, np.ndarray]:
+        """
+        Etapas 1–8 de ``transform()`` sobre um DataFrame já derivado.
+
+        Permite derivar (datas + geo lookup) uma única vez e aplicar o
+        restante com os metadados de cada segmento (ver
+        ``tools/model_registry.py``). As etapas rodam como um único
+        ``select`` compilado (``tools/transform_plan.py``).
+
+        Args:
+            df: Saída de ``FeatureDeriver.derive()`` (ou um subconjunto de linhas dela).
+
+        Returns:
+            Mesmo dict de ``transform()``.
+        """
+        with stage_timer("schema_transform"):
+            out = self._plan.select(df)
+
+        hora_arr  = out[EMBEDDING_OUTPUTS["hora"]].to_numpy().astype(np.int32)
+        mes_arr   = out[EMBEDDING_OUTPUTS["mes"]].to_numpy().astype(np.int32)
+        grupo_arr = out[EMBEDDING_OUTPUTS["grupo_regional"]].to_numpy().astype(np.int32)
+        periodo_arr = np.where(
+            hora_arr <= 6, 0,
+            np.where(hora_arr <= 11, 1,
+                     np.where(hora_arr <= 18, 2, 3)),
+        ).astype(np.int32)
+
+        self._validate_embeddings(hora_arr, mes_arr, grupo_arr, periodo_arr)
+
+        X_emb = {
+            "grupo_regional": grupo_arr.reshape(-1, 1),
+            "hora":           hora_arr.reshape(-1, 1),
+            "mes":            mes_arr.reshape(-1, 1),
+            "periodo_dia":    periodo_arr.reshape(-1, 1),
+        }
+        return {**X_emb, "dense_features": out.select(self.feature_columns).to_numpy()}
+
+    def _transform_derived_schema(self, df: pl.DataFrame) -> dict[str, np.ndarray]:
+        """
+        ``transform_derived`` passo a passo via ``ModelSchema``.
+
+        Referência da suíte de paridade do plano compilado
+        (``python -m tools.transform_plan parity``).
+        """
         # ── 0b. Renomeia tipo_maquina → machine_type para ModelSchema ──
         if "tipo_maquina" in df.columns and "machine_type" not in df.columns:
             df = df.rename({"tipo_maquina": "machine_type"})
@@ -497,33 +633,34 @@ class DLNormalizer:
         # Cria schema_fields sem 'data' (já foi removida por add_date_features)
         schema_fields_no_data = [f for f in _SCHEMA_FIELDS if f != "data"]
         
-        # Cria schema temporário para usar métodos de transformação
-        schema = ModelSchema.__new__(ModelSchema)
-        schema.df = df.clone()
-        schema._schema_fields = schema_fields_no_data
-        schema.clipping_limits_ = {}  # ✅ Inicializar atributo que foi bypassado pelo __new__()
+        with stage_timer("schema_transform"):
+            # Cria schema temporário para usar métodos de transformação
+            schema = ModelSchema.__new__(ModelSchema)
+            schema.df = df.clone()
+            schema._schema_fields = schema_fields_no_data
+            schema.clipping_limits_ = {}  # ✅ Inicializar atributo que foi bypassado pelo __new__()
         
-        # Aplica transformações (sem add_date_features() que precisa de 'data')
-        schema.adjust_machine_type()
-        schema.make_categorical_columns(["grupo_regional"])
-        schema.make_one_hot_encode_columns(["tipo_maquina", "estacao", "periodo_dia"])
+            # Aplica transformações (sem add_date_features() que precisa de 'data')
+            schema.adjust_machine_type()
+            schema.make_categorical_columns(["grupo_regional"])
+            schema.make_one_hot_encode_columns(["tipo_maquina", "estacao", "periodo_dia"])
         
-        # ✅ NOVO: Se clipping_limits está disponível, usar limites persistidos do treino
-        if self.clipping_limits:
-            schema.clipping_limits_ = self.clipping_limits
-            schema.make_clipping_min_max_columns(
-                list(self.clipping_limits.keys()),
-                use_persisted_limits=True
-            )
-        else:
-            # Fallback: se não houver limits persistidos, usar comportamento antigo (não recomendado)
-            schema.make_clipping_min_max_columns([
-                "Temperatura_C", "Temperatura_Percebida_C",
-                "Umidade_Relativa_%", "Precipitacao_mm",
-                "Velocidade_Vento_kmh", "Pressao_Superficial_hPa",
-            ])
+            # ✅ NOVO: Se clipping_limits está disponível, usar limites persistidos do treino
+            if self.clipping_limits:
+                schema.clipping_limits_ = self.clipping_limits
+                schema.make_clipping_min_max_columns(
+                    list(self.clipping_limits.keys()),
+                    use_persisted_limits=True
+                )
+            else:
+                # Fallback: se não houver limits persistidos, usar comportamento antigo (não recomendado)
+                schema.make_clipping_min_max_columns([
+                    "Temperatura_C", "Temperatura_Percebida_C",
+                    "Umidade_Relativa_%", "Precipitacao_mm",
+                    "Velocidade_Vento_kmh", "Pressao_Superficial_hPa",
+                ])
         
-        df_ml = schema.df
+            df_ml = schema.df
 
         # ── 3. Remove artefatos incompatíveis com DL ─────────────────────
         periodo_ohe = [c for c in df_ml.columns if c.startswith("periodo_dia_")]
@@ -540,31 +677,51 @@ class DLNormalizer:
             pl.Series("periodo_dia",    periodo_arr),
         ])
 
-        # ── 5. Sanitiza ─────────────────────────────────────────────────
-        df_dl = _sanitize(df_dl)
-
-        # ── 6. Valida limites dos Embeddings ─────────────────────────────
+        # ── 5. Valida limites dos Embeddings ─────────────────────────────
         self._validate_embeddings(hora_arr, mes_arr, grupo_arr, periodo_arr)
 
-        # ── 7. Separa Embeddings e Dense ─────────────────────────────────
+        # ── 6. Separa Embeddings e Dense ─────────────────────────────────
         X_emb = {
             col: df_dl[col].to_numpy().astype(np.int32).reshape(-1, 1)
             for col in _EMB_COLS
         }
 
-        # Alinha features densas com a ordem do treino
-        dense_df = _align_columns(
+        # Sanitiza, alinha com a ordem do treino e converte num único select
+        X_dense = _to_float32(
             df_dl.drop([_TARGET] + _EMB_COLS),
             self.feature_columns,
-        )
-        X_dense = dense_df.select(
-            [pl.col(c).cast(pl.Float32) for c in self.feature_columns]
         ).to_numpy()
 
         return {**X_emb, "dense_features": X_dense}
 
     # ── Validação interna ────────────────────────────────────────────────
 
+    def embedding_domain_mask(self, df: pl.DataFrame) -> np.ndarray:
+        """
+        Máscara das linhas cujos índices de Embedding cabem no ``input_dim``.
+
+        Modelos por segmento são treinados com vocabulário menor que o
+        global (ex: ``n_meses=10``, ``n_groups=1``) e o Keras falha com
+        índice fora da faixa — essas linhas precisam de outro modelo.
+
+        Args:
+            df: Saída de ``FeatureDeriver.derive()``.
+
+        Returns:
+            np.ndarray bool (n,) — True onde hora, mes, grupo_regional e
+            periodo_dia estão todos dentro do input_dim.
+        """
+        hora  = df["hora"].to_numpy().astype(np.int32)
+        mes   = df["mes"].to_numpy().astype(np.int32)
+        grupo = df["grupo_regional"].to_numpy().astype(np.int32)
+        periodo = np.where(hora <= 6, 0, np.where(hora <= 11, 1, np.where(hora <= 18, 2, 3)))
+        return (
+            (hora < self.n_horas)
+            & (mes < self.n_meses)
+            & (grupo < self.n_groups)
+            & (periodo < self.n_periodos)
+        )
+
     def _validate_embeddings(
         self,
         hora: np.ndarray,
@@ -672,6 +829,10 @@ class MLNormalizer:
     feature_columns: list[str]
     te_map:          dict | None
     clipping_limits: dict | None = None  # ✅ Novo
+    _plan:           TransformPlan = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._plan = TransformPlan(self.feature_columns, self.clipping_limits, te_map=self.te_map)
 
     # ── Factory ──────────────────────────────────────────────────────────
 
@@ -680,29 +841,73 @@ class MLNormalizer:
         """
         Carrega os metadados de um MLPipeline salvo (.joblib).
 
+        Lê o sidecar ``normalizer_meta.json`` quando existe e corresponde ao
+        ``.joblib`` (sha256); senão desserializa o pipeline.
+
         Args:
             path: Caminho para o arquivo .joblib do MLPipeline.
 
         Returns:
             MLNormalizer configurado com os parâmetros do treino.
         """
-        import joblib
-        # O .joblib foi salvo com __main__.MLPipeline (executando ml_pipeline.py
-        # diretamente) — para o pickle desserializar, as classes precisam estar
-        # registradas no namespace __main__.
-        import __main__
-        from model.ml_pipeline import MLPipeline as _MLP, MLPipelineConfig as _MLPC
-        if not hasattr(__main__, "MLPipeline"):
-            __main__.MLPipeline = _MLP
-        if not hasattr(__main__, "MLPipelineConfig"):
-            __main__.MLPipelineConfig = _MLPC
-        pipe = joblib.load(path)
+        path = Path(path)
+        sidecar = path.with_name(ML_SIDECAR_NAME)
+        if sidecar.exists():
+            with sidecar.open(encoding="utf-8") as fh:
+                meta = json.load(fh)
+            if meta.get("joblib_sha256") == _sha256(path):
+                return cls.from_dict(meta)
+            _logger.warning("%s não corresponde a %s — ignorado", sidecar, path.name)
+        return cls.from_pipeline(load_ml_pipeline(path))
+
+    @classmethod
+    def from_pipeline(cls, pipe) -> "MLNormalizer":
+        """Metadados de um MLPipeline já em memória (sem nova desserialização)."""
         return cls(
             feature_columns=pipe.feature_columns_,
             te_map=getattr(pipe, "_te_map", None),
             clipping_limits=getattr(pipe, "_clipping_limits", None),  # ✅ Novo
         )
 
+    @classmethod
+    def from_dict(cls, meta: dict) -> "MLNormalizer":
+        """Inverso de ``to_dict()``."""
+        te_map = meta.get("te_map")
+        if te_map is not None:
+            # JSON só tem chaves string: o mapping vai como pares [valor, encoding]
+            te_map = {
+                col: {"mapping": {k: v for k, v in info["mapping"]}, "global_mean": info["global_mean"]}
+                for col, info in te_map.items()
+            }
+        return cls(
+            feature_columns=meta["feature_columns"],
+            te_map=te_map,
+            clipping_limits=meta.get("clipping_limits"),
+        )
+
+    def to_dict(self) -> dict:
+        """Metadados serializáveis em JSON (chaves do Target Encoding preservam o tipo)."""
+        te_map = None
+        if self.te_map is not None:
+            te_map = {
+                col: {"mapping": [[k, v] for k, v in info["mapping"].items()], "global_mean": info["global_mean"]}
+                for col, info in self.te_map.items()
+            }
+        return {
+            "feature_columns": self.feature_columns,
+            "te_map": te_map,
+            "clipping_limits": self.clipping_limits,
+        }
+
+    def write_sidecar(self, joblib_path: str | Path) -> Path:
+        """Grava ``normalizer_meta.json`` ao lado do ``.joblib`` (com o sha256 dele)."""
+        joblib_path = Path(joblib_path)
+        sidecar = joblib_path.with_name(ML_SIDECAR_NAME)
+        meta = {"joblib_sha256": _sha256(joblib_path), **self.to_dict()}
+        with sidecar.open("w", encoding="utf-8") as fh:
+            json.dump(meta, fh, indent=2, ensure_ascii=False)
+        return sidecar
+
     # ── Transformação ────────────────────────────────────────────────────
 
     def transform(self, df: pl.DataFrame) -> np.ndarray:
@@ -724,14 +929,35 @@ class MLNormalizer:
                 machine_type, Temperatura_*, Umidade_*, Precipitacao_*, Velocidade_*, Pressao_*).
                 
                 **NOTA IMPORTANTE:** Requer 'latitude' e 'longitude' para derivar 
-                'grupo_regional' via lookup geográfico (BallTree Haversine).
+                'grupo_regional' via lookup geográfico (grid index Haversine).
 
         Returns:
             np.ndarray float32 (n, d) pronto para model.predict().
         """
         # ── 0. Auto-deriva features ausentes ─────────────────────────────
-        df = FeatureDeriver.derive(df)
-        
+        return self.transform_derived(FeatureDeriver.derive(df))
+
+    def transform_derived(self, df: pl.DataFrame) -> np.ndarray:
+        """
+        Etapas 2–8 de ``transform()`` sobre um DataFrame já derivado, como um
+        único ``select`` compilado (``tools/transform_plan.py``).
+
+        Args:
+            df: Saída de ``FeatureDeriver.derive()`` (ou um subconjunto de linhas dela).
+
+        Returns:
+            Mesmo array de ``transform()``.
+        """
+        with stage_timer("schema_transform"):
+            return self._plan.select(df).to_numpy()
+
+    def _transform_derived_schema(self, df: pl.DataFrame) -> np.ndarray:
+        """
+        ``transform_derived`` passo a passo via ``ModelSchema``.
+
+        Referência da suíte de paridade do plano compilado
+        (``python -m tools.transform_plan parity``).
+        """
         # ── 0b. Renomeia tipo_maquina → machine_type para ModelSchema ──
         if "tipo_maquina" in df.columns and "machine_type" not in df.columns:
             df = df.rename({"tipo_maquina": "machine_type"})
@@ -752,40 +978,41 @@ class MLNormalizer:
         # Cria schema_fields sem 'data' (já foi removida por add_date_features)
         schema_fields_no_data = [f for f in _SCHEMA_FIELDS if f != "data"]
         
-        # Cria schema temporário para usar métodos de transformação
-        schema = ModelSchema.__new__(ModelSchema)
-        schema.df = df.clone()
-        schema._schema_fields = schema_fields_no_data
-        schema.clipping_limits_ = {}  # ✅ Inicializar atributo que foi bypassado pelo __new__()
+        with stage_timer("schema_transform"):
+            # Cria schema temporário para usar métodos de transformação
+            schema = ModelSchema.__new__(ModelSchema)
+            schema.df = df.clone()
+            schema._schema_fields = schema_fields_no_data
+            schema.clipping_limits_ = {}  # ✅ Inicializar atributo que foi bypassado pelo __new__()
         
-        schema.adjust_machine_type()
-
-        # ── 3. Target Encoding (antes de OHE, na mesma ordem do treino) ──
-        if self.te_map and te_cols:
-            schema.make_target_encoding_columns(te_cols, encoding_map=self.te_map)
-
-        # ── 4. Categóricas + One-Hot Encoding ────────────────────────────
-        schema.make_categorical_columns(["grupo_regional"])
-        schema.make_one_hot_encode_columns(["tipo_maquina", "estacao", "periodo_dia"])
-
-        # ── 5. Clipping + MinMax ─────────────────────────────────────────
-        # ✅ NOVO: Se clipping_limits está disponível, usar limites persistidos do treino
-        if self.clipping_limits:
-            # Reutilizar limites do treino em vez de recalcular
-            schema.clipping_limits_ = self.clipping_limits
-            schema.make_clipping_min_max_columns(
-                list(self.clipping_limits.keys()),
-                use_persisted_limits=True
-            )
-        else:
-            # Fallback: se não houver limits persistidos, usar comportamento antigo (não recomendado)
-            schema.make_clipping_min_max_columns([
-                "Temperatura_C", "Temperatura_Percebida_C",
-                "Umidade_Relativa_%", "Precipitacao_mm",
-                "Velocidade_Vento_kmh", "Pressao_Superficial_hPa",
-            ])
+            schema.adjust_machine_type()
+
+            # ── 3. Target Encoding (antes de OHE, na mesma ordem do treino) ──
+            if self.te_map and te_cols:
+                schema.make_target_encoding_columns(te_cols, encoding_map=self.te_map)
+
+            # ── 4. Categóricas + One-Hot Encoding ────────────────────────────
+            schema.make_categorical_columns(["grupo_regional"])
+            schema.make_one_hot_encode_columns(["tipo_maquina", "estacao", "periodo_dia"])
+
+            # ── 5. Clipping + MinMax ─────────────────────────────────────────
+            # ✅ NOVO: Se clipping_limits está disponível, usar limites persistidos do treino
+            if self.clipping_limits:
+                # Reutilizar limites do treino em vez de recalcular
+                schema.clipping_limits_ = self.clipping_limits
+                schema.make_clipping_min_max_columns(
+                    list(self.clipping_limits.keys()),
+                    use_persisted_limits=True
+                )
+            else:
+                # Fallback: se não houver limits persistidos, usar comportamento antigo (não recomendado)
+                schema.make_clipping_min_max_columns([
+                    "Temperatura_C", "Temperatura_Percebida_C",
+                    "Umidade_Relativa_%", "Precipitacao_mm",
+                    "Velocidade_Vento_kmh", "Pressao_Superficial_hPa",
+                ])
 
-        df_ml = schema.df
+            df_ml = schema.df
 
         # ── 6. Categorias → códigos numéricos (UInt32) ──────────────────
         cat_cols = [c for c in df_ml.columns if df_ml[c].dtype == pl.Categorical]
@@ -794,14 +1021,8 @@ class MLNormalizer:
                 [pl.col(c).to_physical().alias(c) for c in cat_cols]
             )
 
-        # ── 7. Sanitiza ─────────────────────────────────────────────────
-        df_ml = _sanitize(df_ml)
-
-        # ── 8. Alinha e converte ─────────────────────────────────────────
-        df_aligned = _align_columns(df_ml, self.feature_columns)
-        return df_aligned.select(
-            [pl.col(c).cast(pl.Float32) for c in self.feature_columns]
-        ).to_numpy()
+        # ── 7. Sanitiza, alinha e converte ──────────────────────────────
+        return _to_float32(df_ml, self.feature_columns).to_numpy()
 
     # ── Inspeção ─────────────────────────────────────────────────────────
 
@@ -855,6 +1076,117 @@ if __name__ == "__main__":
         datefmt="%H:%M:%S",
     )
 
+    # Sidecars de artefatos salvos antes do normalizer_meta.json:
+    # python -m tools.normalizer ml-sidecar [model/artifacts/ml_hvac]
+    if sys.argv[1:2] == ["ml-sidecar"]:
+        root = Path(sys.argv[2]) if len(sys.argv) > 2 else _ROOT / "model" / "artifacts" / "ml_hvac"
+        for joblib_path in sorted(root.rglob("best_pipeline.joblib")):
+            sidecar = MLNormalizer.from_pipeline(load_ml_pipeline(joblib_path)).write_sidecar(joblib_path)
+            print(f"  {sidecar}")
+        sys.exit(0)
+
+    # Geo lookup em lote grande: frota (poucas coordenadas) e todas distintas
+    # python -m tools.normalizer geo-bench [1000000]
+    if sys.argv[1:2] == ["geo-bench"]:
+        import time
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+        rng = np.random.default_rng(0)
+        _get_geo_lookup()
+        for k in (300, n):
+            pick = rng.integers(0, k, n)
+            frame = pl.DataFrame({
+                "latitude":  (-23.55 + rng.normal(0.0, 0.5, k))[pick],
+                "longitude": (-46.63 + rng.normal(0.0, 0.5, k))[pick],
+            })
+            for label in ("memo vazio", "memo quente"):
+                if label == "memo vazio":
+                    _geo_memo = None
+                t0 = time.perf_counter()
+                _assign_grupo_regional_knn(frame)
+                print(f"  {n:,} linhas, {k:,} coordenadas, {label}: {(time.perf_counter() - t0) * 1000:,.0f} ms")
+        sys.exit(0)
+
+    # Sanitização + cast Float32 num frame de treino (26 colunas float):
+    # loop por coluna via NumPy (antigo) vs. expressões num único select.
+    # Cada variante roda num processo novo para o pico de RSS não herdar
+    # memória retida pelo alocador da anterior.
+    # python -m tools.normalizer sanitize-bench [8000000]
+    if sys.argv[1:2] == ["sanitize-bench"]:
+        import subprocess
+        import threading
+        import time
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 8_000_000
+        if len(sys.argv) <= 3:
+            for n_dirty in (0, 8):
+                for variant in ("loop", "expr", "loop+f32", "expr+f32"):
+                    run = subprocess.run(
+                        [sys.executable, "-m", "tools.normalizer", "sanitize-bench", str(n), variant, str(n_dirty)],
+                        cwd=_ROOT, capture_output=True, text=True, check=True,
+                    )
+                    print(run.stdout.strip())
+            sys.exit(0)
+
+        variant, n_dirty = sys.argv[3], int(sys.argv[4])
+
+        def _sanitize_columnwise(df: pl.DataFrame) -> pl.DataFrame:
+            """``_sanitize`` antigo: NumPy + ``with_columns`` por coluna afetada."""
+            for c in df.columns:
+                if df[c].dtype in (pl.Float32, pl.Float64):
+                    if df[c].is_nan().any() or df[c].is_infinite().any():
+                        dt = np.float32 if df[c].dtype == pl.Float32 else np.float64
+                        arr = df[c].to_numpy().copy().astype(dt)
+                        arr = np.where(np.isfinite(arr), arr, dt(0.0))
+                        df = df.with_columns(pl.Series(c, arr))
+            return df
+
+        def _rss() -> int:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * 4096
+
+        rng = np.random.default_rng(0)
+        columns = [f"f{i:02d}" for i in range(26)]
+        data = {}
+        for i, c in enumerate(columns):
+            arr = rng.random(n)
+            if i < n_dirty:  # NaN/±inf esparsos, como um clip com upper == lower
+                arr[rng.integers(0, n, n // 1000)] = rng.choice([np.nan, np.inf, -np.inf], n // 1000)
+            data[c] = arr
+        frame = pl.DataFrame(data)
+        del data
+
+        fn = {
+            "loop":     lambda: _sanitize_columnwise(frame),
+            "expr":     lambda: _sanitize(frame),
+            "loop+f32": lambda: _sanitize_columnwise(frame).select(
+                [pl.col(c).cast(pl.Float32) for c in columns]
+            ).to_numpy(),
+            "expr+f32": lambda: _to_float32(frame, columns).to_numpy(),
+        }[variant]
+
+        times, peak = [], 0
+        for _ in range(3):
+            base = _rss()
+            high = [base]
+            done = threading.Event()
+
+            def _poll() -> None:
+                while not done.is_set():
+                    high[0] = max(high[0], _rss())
+                    time.sleep(0.001)
+
+            poller = threading.Thread(target=_poll, daemon=True)
+            poller.start()
+            t0 = time.perf_counter()
+            X = fn()
+            times.append(time.perf_counter() - t0)
+            done.set()
+            poller.join()
+            peak = max(peak, high[0] - base)
+            del X
+        print(f"  {n:,} × {len(columns)} colunas, {n_dirty:>2} com NaN/inf, {variant:<8}: "
+              f"{np.median(times) * 1000:>8,.0f} ms   pico +{peak / 2**20:>6,.0f} MB")
+        sys.exit(0)
+
     SEP = "═" * 70
 
     # ── Carrega amostra do dataset ───────────────────────────────────────
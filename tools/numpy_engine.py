@@ -0,0 +1,425 @@
+"""
+NumPy Engine — Forward pass do Wide & Deep sem TensorFlow no serving
+====================================================================
+
+``HVACDLInferenceAPI`` chamava ``model.predict`` do Keras a cada requisição:
+para uma linha, o overhead do Keras (montagem do dataset, despacho do grafo)
+é de milissegundos, e importar o TensorFlow custa centenas de MB de RSS e
+segundos de cold start. A rede de ``_build_wide_deep_model`` é pequena
+(4 Embeddings + 3 Dense ocultas + saída) e cabe em poucas operações NumPy:
+
+    keras_model.keras ──► export_numpy_weights() ──► numpy_model.npz
+                            ├─ 4 tabelas de Embedding
+                            ├─ Dense ocultas + saída (kernel, bias)
+                            ├─ BatchNorm dobrada na Dense seguinte
+                            └─ Dropout removido (identidade na inferência)
+
+    NumpyWideDeep.predict(inputs)   (mesmo dict de DLNormalizer.transform)
+        h = dense @ W1_dense + b1 + Σ_e (E_e @ W1_e)[idx_e]   ← tabelas pré-projetadas
+        h = relu(h) @ W + b    × camadas restantes
+
+Na arquitetura a BatchNorm vem *depois* da ReLU (Dense → ReLU → BN →
+Dropout), então não pode ser dobrada na Dense anterior sem mudar o
+resultado. Como em inferência ela é afim por coluna (``s·x + t``), é dobrada
+exatamente na Dense seguinte: ``W' = diag(s)·W`` e ``b' = t·W + b``.
+
+A primeira Dense recebe ``concat(embeddings, dense)``; multiplicar cada
+tabela de Embedding pela sua fatia do kernel na carga troca a concatenação e
+~1/3 da primeira matmul por 4 gathers de linhas (``E_e @ W1_e`` tem
+``vocab × 256`` floats).
+
+O ``.npz`` guarda o sha256 do ``keras_model.keras`` de origem: um artefato
+re-treinado sem re-exportar é recusado na carga em vez de servir pesos
+antigos. ``DLPipeline.save()`` exporta o ``.npz`` junto com o modelo.
+
+CLI:
+    python -m tools.numpy_engine export model/artifacts/dl_hvac   # global + segment_*
+    python -m tools.numpy_engine parity model/artifacts/dl_hvac/global
+    python -m tools.numpy_engine bench  model/artifacts/dl_hvac/global
+
+``bench`` compara, por tamanho de lote, ``Model.predict`` (keras), o atalho
+``tf.function`` com buckets de ``BucketedKerasPredictor`` (keras-fn, e
+keras-xla com ``jit_compile``) e este engine (numpy).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from pathlib import Path
+
+import numpy as np
+
+_logger = logging.getLogger(__name__)
+
+NUMPY_MODEL_FILE = "numpy_model.npz"
+_FORMAT_VERSION = 1
+
+# (input do modelo, camada de Embedding) na ordem da concatenação em
+# _build_wide_deep_model — seguidas de dense_features
+_EMBEDDINGS: tuple[tuple[str, str], ...] = (
+    ("grupo_regional", "group_embedding"),
+    ("hora",           "hora_embedding"),
+    ("mes",            "mes_embedding"),
+    ("periodo_dia",    "periodo_embedding"),
+)
+_DENSE_INPUT = "dense_features"
+
+# Linhas por forward pass: limita as ativações intermediárias (256 floats/linha)
+_CHUNK_ROWS = 8192
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  EXPORTAÇÃO (requer TensorFlow)
+# ══════════════════════════════════════════════════════════════════════════════
+
+def extract_weights(model) -> dict[str, np.ndarray]:
+    """
+    Pesos de um modelo de ``_build_wide_deep_model`` no formato do ``.npz``.
+
+    Returns:
+        {"emb/{input}": tabela, "dense_{i}/kernel", "dense_{i}/bias", ...} —
+        ``dense_0`` é ``hidden_1`` e a última é ``output``; a BatchNorm de
+        cada camada oculta já dobrada (em float64) na Dense seguinte.
+
+    Raises:
+        ValueError: O modelo não tem a arquitetura esperada.
+    """
+    layers = {layer.name: layer for layer in model.layers}
+    weights: dict[str, np.ndarray] = {}
+    for input_name, layer_name in _EMBEDDINGS:
+        if layer_name not in layers:
+            raise ValueError(f"Camada '{layer_name}' ausente — não é um modelo Wide & Deep")
+        weights[f"emb/{input_name}"] = np.asarray(layers[layer_name].get_weights()[0], dtype=np.float32)
+
+    hidden = []
+    i = 1
+    while f"hidden_{i}" in layers:
+        hidden.append((layers[f"hidden_{i}"], layers.get(f"bn_{i}")))
+        i += 1
+    if not hidden or "output" not in layers:
+        raise ValueError("Camadas hidden_1..N / output ausentes — não é um modelo Wide & Deep")
+
+    # BN da camada anterior (scale, shift), dobrada na Dense corrente
+    fold: tuple[np.ndarray, np.ndarray] | None = None
+    dense_layers = [d for d, _ in hidden] + [layers["output"]]
+    for k, dense in enumerate(dense_layers):
+        activation = dense.get_config().get("activation")
+        expected = "relu" if k < len(hidden) else "linear"
+        if activation != expected:
+            raise ValueError(f"Camada '{dense.name}' com ativação {activation!r}, esperado {expected!r}")
+        kernel, bias = (np.asarray(w, dtype=np.float64) for w in dense.get_weights())
+        if fold is not None:
+            scale, shift = fold
+            bias = shift @ kernel + bias
+            kernel = scale[:, None] * kernel
+        weights[f"dense_{k}/kernel"] = kernel.astype(np.float32)
+        weights[f"dense_{k}/bias"] = bias.astype(np.float32)
+
+        bn = hidden[k][1] if k < len(hidden) else None
+        if bn is None:
+            fold = None
+            continue
+        cfg = bn.get_config()
+        params = dict(zip(
+            [v.path.rsplit("/", 1)[-1] for v in bn.weights],
+            (np.asarray(w, dtype=np.float64) for w in bn.get_weights()),
+        ))
+        gamma = params.get("gamma", 1.0) if cfg.get("scale", True) else 1.0
+        beta = params.get("beta", 0.0) if cfg.get("center", True) else 0.0
+        scale = gamma / np.sqrt(params["moving_variance"] + cfg["epsilon"])
+        fold = (np.broadcast_to(scale, params["moving_mean"].shape),
+                beta - params["moving_mean"] * scale)
+    return weights
+
+
+def dl_model_file(artifact_dir: str | Path) -> Path:
+    """
+    Arquivo de pesos de um artefato DL: ``keras_model.keras`` ou, num artefato
+    publicado só com ``numpy_model.npz`` (engine ``numpy``), o ``.npz``.
+    """
+    artifact_dir = Path(artifact_dir)
+    keras_file = artifact_dir / "keras_model.keras"
+    return keras_file if keras_file.exists() else artifact_dir / NUMPY_MODEL_FILE
+
+
+def export_numpy_weights(artifact_dir: str | Path, model=None) -> Path:
+    """
+    Grava ``{artifact_dir}/numpy_model.npz`` a partir de ``keras_model.keras``.
+
+    Args:
+        artifact_dir: Diretório com ``keras_model.keras``.
+        model       : Modelo já carregado (evita ler o ``.keras`` de novo).
+
+    Returns:
+        Caminho do ``.npz`` gravado.
+    """
+    artifact_dir = Path(artifact_dir)
+    keras_file = artifact_dir / "keras_model.keras"
+    if model is None:
+        import tensorflow as tf
+
+        model = tf.keras.models.load_model(keras_file)
+    weights = extract_weights(model)
+
+    out = artifact_dir / NUMPY_MODEL_FILE
+    tmp = out.with_name(out.stem + ".tmp.npz")
+    np.savez(
+        tmp,
+        format_version=np.array(_FORMAT_VERSION),
+        keras_sha256=np.array(_sha256(keras_file)),
+        **weights,
+    )
+    tmp.replace(out)
+    _logger.info(f"Pesos NumPy exportados para {out} ({out.stat().st_size / 1024:.0f} KB)")
+    return out
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  ENGINE (apenas NumPy)
+# ══════════════════════════════════════════════════════════════════════════════
+
+class NumpyWideDeep:
+    """
+    Forward pass do Wide & Deep em NumPy (float32).
+
+    Attributes:
+        input_dims : {input de Embedding: tamanho do vocabulário}.
+        n_dense    : Nº de features em ``dense_features``.
+    """
+
+    def __init__(self, weights: dict[str, np.ndarray]) -> None:
+        tables = [np.asarray(weights[f"emb/{name}"], dtype=np.float64) for name, _ in _EMBEDDINGS]
+        n_layers = sum(1 for k in weights if k.startswith("dense_") and k.endswith("/kernel"))
+        kernels = [np.asarray(weights[f"dense_{k}/kernel"], dtype=np.float64) for k in range(n_layers)]
+        biases = [np.asarray(weights[f"dense_{k}/bias"], dtype=np.float64) for k in range(n_layers)]
+
+        # Primeira Dense: fatia de cada Embedding pré-projetada → tabela vocab × units
+        first, offset = kernels[0], 0
+        self._projected: list[tuple[str, np.ndarray]] = []
+        for (name, _), table in zip(_EMBEDDINGS, tables):
+            dim = table.shape[1]
+            self._projected.append((name, (table @ first[offset:offset + dim]).astype(np.float32)))
+            offset += dim
+        self._dense_kernel = np.ascontiguousarray(first[offset:], dtype=np.float32)
+        self._first_bias = biases[0].astype(np.float32)
+        self._layers = [
+            (np.ascontiguousarray(w, dtype=np.float32), b.astype(np.float32))
+            for w, b in zip(kernels[1:], biases[1:])
+        ]
+        self.input_dims = {name: t.shape[0] for name, t in self._projected}
+        self.n_dense = self._dense_kernel.shape[0]
+
+    @classmethod
+    def from_artifact(cls, artifact_dir: str | Path) -> "NumpyWideDeep":
+        """
+        Carrega ``numpy_model.npz`` de um artefato.
+
+        Raises:
+            FileNotFoundError: ``.npz`` ausente (rode ``python -m tools.numpy_engine export``).
+            ValueError       : ``.npz`` exportado de outro ``keras_model.keras``.
+        """
+        artifact_dir = Path(artifact_dir)
+        npz = artifact_dir / NUMPY_MODEL_FILE
+        if not npz.exists():
+            raise FileNotFoundError(
+                f"{npz} não encontrado — exporte com: python -m tools.numpy_engine export {artifact_dir}"
+            )
+        with np.load(npz) as data:
+            weights = {k: data[k] for k in data.files}
+        if int(weights.pop("format_version")) != _FORMAT_VERSION:
+            raise ValueError(f"{npz}: versão de formato não suportada")
+        source = str(weights.pop("keras_sha256"))
+        keras_file = artifact_dir / "keras_model.keras"
+        if keras_file.exists() and _sha256(keras_file) != source:
+            raise ValueError(
+                f"{npz} foi exportado de outro keras_model.keras — re-exporte com: "
+                f"python -m tools.numpy_engine export {artifact_dir}"
+            )
+        return cls(weights)
+
+    def predict(self, inputs: dict[str, np.ndarray], verbose: int = 0) -> np.ndarray:
+        """
+        Mesma assinatura e saída (n, 1) de ``keras.Model.predict``.
+
+        Raises:
+            ValueError: Índice de Embedding fora do vocabulário (o Keras também falha).
+        """
+        dense = np.asarray(inputs[_DENSE_INPUT], dtype=np.float32)
+        indices = []
+        for name, table in self._projected:
+            idx = np.asarray(inputs[name]).reshape(-1)
+            if idx.size and (idx.min() < 0 or idx.max() >= len(table)):
+                raise ValueError(f"{name}: índice fora de [0, {len(table)}) no Embedding")
+            indices.append(idx)
+
+        n = dense.shape[0]
+        out = np.empty((n, 1), dtype=np.float32)
+        for start in range(0, n, _CHUNK_ROWS):
+            sl = slice(start, min(start + _CHUNK_ROWS, n))
+            h = dense[sl] @ self._dense_kernel
+            h += self._first_bias
+            for (_, table), idx in zip(self._projected, indices):
+                h += table[idx[sl]]
+            for kernel, bias in self._layers:
+                np.maximum(h, 0.0, out=h)
+                h = h @ kernel
+                h += bias
+            out[sl] = h
+        return out
+
+
+# Caminhos comparados por ``bench`` (keras-fn/keras-xla: inference_runner.BucketedKerasPredictor)
+BENCH_ENGINES: tuple[str, ...] = ("keras", "keras-fn", "keras-xla", "numpy")
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  CLI — exportação, paridade e benchmark
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _artifact_dirs(root: Path) -> list[Path]:
+    """``root`` se for um artefato, senão todos os artefatos abaixo dele."""
+    if (root / "keras_model.keras").exists():
+        return [root]
+    return sorted(p.parent for p in root.rglob("keras_model.keras"))
+
+
+def _parity(artifact_dir: Path, sizes: tuple[int, ...] = (1, 7, 1000, 20_000)) -> float:
+    """Máximo |keras − numpy| sobre lotes sintéticos (mesmos inputs normalizados)."""
+    import tensorflow as tf
+
+    from tools.normalizer import DLNormalizer, FeatureDeriver
+    from tools.warmup import synthetic_frame
+
+    normalizer = DLNormalizer.from_artifact(artifact_dir)
+    model = tf.keras.models.load_model(artifact_dir / "keras_model.keras")
+    engine = NumpyWideDeep.from_artifact(artifact_dir)
+    worst = 0.0
+    for i, n in enumerate(sizes):
+        # Segmentos têm vocabulário menor: só as linhas que o roteador lhes enviaria
+        derived = FeatureDeriver.derive(synthetic_frame(n, seed=i))
+        derived = derived.filter(normalizer.embedding_domain_mask(derived))
+        if derived.is_empty():
+            print(f"  n={n:>6}  nenhuma linha no vocabulário do segmento")
+            continue
+        inputs = normalizer.transform_derived(derived)
+        ref = model.predict(inputs, verbose=0).ravel()
+        got = engine.predict(inputs).ravel()
+        diff = float(np.max(np.abs(ref - got)))
+        rel = diff / max(float(np.max(np.abs(ref))), 1e-6)
+        print(f"  n={derived.height:>6}  max|Δ|={diff:.2e}  relativo={rel:.2e}")
+        worst = max(worst, rel)
+    return worst
+
+
+def _bench_one(artifact_dir: Path, engine: str, sizes: list[int], repeats: int) -> None:
+    """Corpo de um processo de benchmark: RSS após a carga e latência por lote."""
+    import json
+    import os
+    import time
+
+    def _rss_bytes() -> int:
+        # Não importa tools.model_registry: ele carrega o TensorFlow
+        with open("/proc/self/statm", encoding="ascii") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    rss0 = _rss_bytes()
+    t0 = time.perf_counter()
+    if engine == "numpy":
+        model = NumpyWideDeep.from_artifact(artifact_dir)
+    else:
+        import tensorflow as tf
+
+        model = tf.keras.models.load_model(artifact_dir / "keras_model.keras")
+        if engine != "keras":
+            from tools.inference_runner import BucketedKerasPredictor
+
+            model = BucketedKerasPredictor(model, jit_compile=engine == "keras-xla")
+    load_s = time.perf_counter() - t0
+
+    n_dense = len(json.loads((artifact_dir / "meta.json").read_text(encoding="utf-8"))["feature_columns"])
+    rng = np.random.default_rng(0)
+    result = {"engine": engine, "load_s": load_s, "rss_load_mb": (_rss_bytes() - rss0) / 2**20, "ms": {}}
+    dims = {"grupo_regional": 1, "hora": 24, "mes": 13, "periodo_dia": 4}
+    for n in sizes:
+        inputs = {k: rng.integers(0, d, (n, 1)).astype(np.int32) for k, d in dims.items()}
+        inputs[_DENSE_INPUT] = rng.random((n, n_dense), dtype=np.float32)
+        model.predict(inputs, verbose=0)  # tracing / primeira alocação
+        times = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            model.predict(inputs, verbose=0)
+            times.append(time.perf_counter() - t0)
+        result["ms"][n] = float(np.median(times)) * 1000
+    result["rss_peak_mb"] = (_rss_bytes() - rss0) / 2**20
+    print(json.dumps(result))
+
+
+def _bench(artifact_dir: Path, sizes: list[int], repeats: int) -> None:
+    """Roda cada engine num processo novo (RSS e cold start sem interferência)."""
+    import json
+    import subprocess
+    import sys
+
+    rows = {}
+    for engine in BENCH_ENGINES:
+        proc = subprocess.run(
+            [sys.executable, "-m", "tools.numpy_engine", "_bench-one", str(artifact_dir),
+             "--engine", engine, "--sizes", ",".join(map(str, sizes)), "--repeats", str(repeats)],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).resolve().parent.parent,
+        )
+        rows[engine] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    # Entre parênteses: speedup sobre Model.predict (keras)
+    base = rows["keras"]
+    print("\n  " + f"{'':>10}" + "".join(f"{e:>21}" for e in BENCH_ENGINES))
+    print("  " + f"{'carga (s)':>10}" + "".join(f"{rows[e]['load_s']:>21.3f}" for e in BENCH_ENGINES))
+    print("  " + f"{'RSS (MB)':>10}" + "".join(f"{rows[e]['rss_peak_mb']:>21.0f}" for e in BENCH_ENGINES))
+    for size in sizes:
+        cells = []
+        for e in BENCH_ENGINES:
+            ms = rows[e]["ms"][str(size)]
+            cells.append(f"{ms:>10.3f}ms ({base['ms'][str(size)] / ms:>6.1f}×)")
+        print("  " + f"{f'n={size}':>10}" + "".join(f"{c:>21}" for c in cells))
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    parser = argparse.ArgumentParser(description="Engine NumPy do modelo Wide & Deep")
+    parser.add_argument("command", choices=("export", "parity", "bench", "_bench-one"))
+    parser.add_argument("path", type=Path, help="Artefato (…/global) ou raiz com segment_*")
+    parser.add_argument("--engine", choices=BENCH_ENGINES, default="numpy")
+    parser.add_argument("--sizes", default="1,8,50,64,300,512,1000,10000,100000")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    if args.command == "export":
+        for artifact in _artifact_dirs(args.path):
+            export_numpy_weights(artifact)
+    elif args.command == "parity":
+        failed = False
+        for artifact in _artifact_dirs(args.path):
+            print(f"\n  {artifact}")
+            worst = _parity(artifact)
+            ok = worst < 1e-4
+            failed |= not ok
+            print(f"  {'OK' if ok else 'FALHOU'} (erro relativo máximo {worst:.2e}, tolerância 1e-4)")
+        sys.exit(1 if failed else 0)
+    elif args.command == "bench":
+        _bench(args.path, sizes, args.repeats)
+    else:
+        _bench_one(args.path, args.engine, sizes, args.repeats)
@@ -0,0 +1,240 @@
+"""
+Prediction Cache — LRU + TTL endereçado por conteúdo para /predict e lotes
+===========================================================================
+
+Dashboards pedem repetidamente as mesmas combinações de (hora, data,
+machine_type, lat/lon, clima), e cada chamada paga derive → normalize →
+predict inteiro. Este cache guarda a predição de cada linha sob um hash
+canônico das 13 features de input, vinculado à versão dos artefatos:
+
+    lote (n linhas) ──► hash_rows das 13 colunas canônicas (vetorizado, 128 bits)
+                                     │
+                     ┌── hit ────────┴──────── miss ──┐
+                     │                                 │
+               valor do cache          linhas únicas ► predict_fn (1 chamada)
+                     │                                 │
+                     └──── merge na ordem de entrada ◄─┘
+
+Canonização: colunas na ordem de ``CACHE_COLUMNS``, tipos fixos (Int64 /
+Date / Float64) e ``machine_type`` em minúsculas (o normalizer já ignora a
+caixa). Linhas repetidas dentro do mesmo lote são preditas uma única vez.
+As features de lag (``LAG_COLUMNS``), quando presentes, também entram na
+chave — o mesmo input com histórico de consumo diferente é outra predição.
+
+``invalidate(version)`` esvazia o cache quando o modelo é recarregado — uma
+entrada nunca é servida para uma versão de artefato diferente da que a gerou.
+
+Uso:
+    >>> cache = PredictionCache(max_entries=100_000, ttl_s=3600)
+    >>> cache.invalidate(artifact_version([path / "keras_model.keras"]))
+    >>> preds = cache.predict(df, api.predict)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Iterable
+
+import numpy as np
+import polars as pl
+
+try:
+    from .lag_store import LAG_COLUMNS
+    from .metrics import CACHE_ENTRIES, CACHE_HITS, CACHE_MISSES
+except ImportError:
+    from lag_store import LAG_COLUMNS
+    from metrics import CACHE_ENTRIES, CACHE_HITS, CACHE_MISSES
+
+# As 13 features de input (schema do normalizer) e o tipo canônico de cada uma
+CACHE_COLUMNS: dict[str, pl.DataType] = {
+    "hora":                    pl.Int64,
+    "data":                    pl.Date,
+    "machine_type":            pl.Utf8,
+    "latitude":                pl.Float64,
+    "longitude":               pl.Float64,
+    "Temperatura_C":           pl.Float64,
+    "Temperatura_Percebida_C": pl.Float64,
+    "Umidade_Relativa_%":      pl.Float64,
+    "Precipitacao_mm":         pl.Float64,
+    "Velocidade_Vento_kmh":    pl.Float64,
+    "Pressao_Superficial_hPa": pl.Float64,
+    "Irradiancia_Direta_Wm2":  pl.Float64,
+    "Irradiancia_Difusa_Wm2":  pl.Float64,
+}
+
+# Dois hashes de 64 bits com sementes distintas → chave de 128 bits
+_SEEDS = (0x5EED_0001, 0x5EED_0002)
+
+
+def row_keys(df: pl.DataFrame) -> list[tuple[int, int]]:
+    """
+    Hash canônico de cada linha sobre as 13 features de input (+ lags presentes).
+
+    Raises:
+        KeyError: Alguma das colunas de ``CACHE_COLUMNS`` está ausente.
+    """
+    missing = [c for c in CACHE_COLUMNS if c not in df.columns]
+    if missing:
+        raise KeyError(f"Colunas ausentes para a chave do cache: {missing}")
+    canonical = df.select(
+        pl.col("machine_type").cast(pl.Utf8).str.to_lowercase(),
+        *[pl.col(c).cast(dt) for c, dt in CACHE_COLUMNS.items() if c != "machine_type"],
+        *[pl.col(c).cast(pl.Float64) for c in LAG_COLUMNS if c in df.columns],
+    ).select(list(CACHE_COLUMNS) + [c for c in LAG_COLUMNS if c in df.columns])
+    h1, h2 = (canonical.hash_rows(seed=seed).to_list() for seed in _SEEDS)
+    return list(zip(h1, h2))
+
+
+def artifact_version(paths: Iterable[str | Path]) -> str:
+    """
+    Versão dos artefatos: sha256 (12 hex) do conteúdo dos arquivos existentes.
+
+    Qualquer re-treino que troque pesos, ``meta.json`` ou manifestos gera
+    uma versão nova.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(Path(p) for p in paths):
+        if not path.is_file():
+            continue
+        digest.update(str(path.name).encode())
+        with path.open("rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+class PredictionCache:
+    """
+    Cache LRU com TTL de predições por linha.
+
+    Attributes:
+        max_entries : Nº máximo de linhas em cache (LRU acima disso).
+        ttl_s       : Validade de cada entrada em segundos (0 = sem expiração).
+        version     : Versão dos artefatos das entradas atuais.
+    """
+
+    def __init__(self, max_entries: int = 100_000, ttl_s: float = 3600.0) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries deve ser >= 1")
+        if ttl_s < 0:
+            raise ValueError("ttl_s deve ser >= 0")
+
+        self.max_entries = int(max_entries)
+        self.ttl_s = float(ttl_s)
+        self.version: str | None = None
+
+        # {chave: (predição, expira_em)}
+        self._entries: OrderedDict[tuple[int, int], tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    # ── API pública ──────────────────────────────────────────────────────
+
+    def predict(
+        self,
+        df: pl.DataFrame,
+        predict_fn: Callable[[pl.DataFrame], np.ndarray],
+        version: str | None = None,
+    ) -> np.ndarray:
+        """
+        Predições de ``df`` servindo do cache o que houver e computando o resto.
+
+        Args:
+            df        : Lote no schema do normalizer (13 colunas de input).
+            predict_fn: Predição bloqueante ``pl.DataFrame → np.ndarray`` para os misses.
+            version   : Versão dos artefatos de ``predict_fn``. Se diferente da do
+                        cache (modelo trocado durante a requisição), o cache é
+                        ignorado — nem lido nem escrito. None = versão atual.
+
+        Returns:
+            np.ndarray (n,) na ordem de entrada.
+        """
+        if version is None:
+            version = self.version
+        elif version != self.version:
+            return np.asarray(predict_fn(df), dtype=np.float32)
+
+        keys = row_keys(df)
+        result = np.empty(len(keys), dtype=np.float32)
+
+        # Miss → índices das linhas com aquela chave (repetidas no lote contam 1x)
+        pending: dict[tuple[int, int], list[int]] = {}
+        now = time.monotonic()
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(key)
+                    result[i] = entry[0]
+                    continue
+                if entry is not None:
+                    del self._entries[key]
+                pending.setdefault(key, []).append(i)
+            n_miss = sum(len(rows) for rows in pending.values())
+            self._hits += len(keys) - n_miss
+            self._misses += n_miss
+
+        CACHE_HITS.inc(len(keys) - n_miss)
+        CACHE_MISSES.inc(n_miss)
+        if not pending:
+            return result
+
+        first = np.fromiter((rows[0] for rows in pending.values()), dtype=np.int64)
+        subset = df if len(first) == len(df) else df[first]
+        preds = np.asarray(predict_fn(subset), dtype=np.float32)
+        for rows, value in zip(pending.values(), preds):
+            result[rows] = value
+
+        self._store(zip(pending.keys(), preds.tolist()), version)
+        return result
+
+    def invalidate(self, version: str | None = None) -> None:
+        """Esvazia o cache e passa a associar novas entradas a ``version``."""
+        with self._lock:
+            self._entries.clear()
+            self.version = version
+            self._invalidations += 1
+        CACHE_ENTRIES.set(0)
+
+    def stats(self) -> dict[str, object]:
+        """
+        Estatísticas para ``/stats``.
+
+        Returns:
+            dict com ``version``, ``entries``, ``max_entries``, ``ttl_s``,
+            ``hits``, ``misses``, ``hit_ratio`` e ``invalidations``.
+        """
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "version":       self.version,
+                "entries":       len(self._entries),
+                "max_entries":   self.max_entries,
+                "ttl_s":         self.ttl_s,
+                "hits":          self._hits,
+                "misses":        self._misses,
+                "hit_ratio":     round(self._hits / total, 4) if total else 0.0,
+                "invalidations": self._invalidations,
+            }
+
+    # ── Internos ─────────────────────────────────────────────────────────
+
+    def _store(self, items: Iterable[tuple[tuple[int, int], float]], version: str | None) -> None:
+        expires = time.monotonic() + self.ttl_s if self.ttl_s else float("inf")
+        with self._lock:
+            # Modelo recarregado durante a predição: o resultado é da versão antiga
+            if version != self.version:
+                return
+            for key, value in items:
+                self._entries[key] = (value, expires)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            n = len(self._entries)
+        CACHE_ENTRIES.set(n)
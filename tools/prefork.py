@@ -0,0 +1,392 @@
+"""
+Pre-fork — N workers uvicorn compartilhando memória copy-on-write
+=================================================================
+
+``uvicorn --workers N`` cria cada worker do zero: cada um importa TensorFlow,
+Keras, polars e recarrega os artefatos — RSS e tempo de startup
+multiplicados por N. Aqui o **master** faz o trabalho pesado uma vez e só
+então chama ``fork()``; os workers herdam essas páginas copy-on-write:
+
+    master
+      ├─ importa tools.api_server (TensorFlow, Keras, polars, schema)
+      ├─ preload_fork_safe(): DLNormalizer + grade geográfica
+      ├─ gc.freeze()            ← GC não toca mais os objetos herdados
+      ├─ bind/listen do socket  ← compartilhado, o kernel distribui os accepts
+      └─ fork() × N
+            worker i: carrega o keras_model.keras (~10 MB) → uvicorn no socket herdado
+
+Por que o modelo Keras não é carregado no master: depois de executar qualquer
+operação, o runtime TensorFlow (e o thread pool do polars) mantém threads e
+locks que não sobrevivem a ``fork()`` — o worker trava no primeiro predict.
+Por isso o master só faz trabalho fork-safe (imports + metadados + grade
+geográfica lida do ``geo_grid.npz``); a parte compartilhada é a que domina o RSS
+(~600 MB só do import do TensorFlow).
+
+Cada worker limita TensorFlow/polars/executor a ``max(1, CPUs // N)`` threads
+para N processos não disputarem os mesmos núcleos (variáveis de ambiente
+``INFERENCE_WORKERS`` / ``POLARS_MAX_THREADS`` explícitas têm precedência).
+
+O master supervisiona os workers: repassa SIGTERM/SIGINT (graceful shutdown
+do uvicorn) e recria um worker que morrer inesperadamente.
+
+O lag store (``LAG_STORE``) é estado em memória de cada processo: com mais
+de um worker, ``POST /lags/ingest`` chegaria a um só e a mesma predição
+mudaria conforme o worker sorteado pelo kernel. Por isso, com N > 1, o master
+desliga o lag store antes do ``fork()`` — e recusa subir se ``LAG_STORE=1``
+foi pedido explicitamente.
+
+Uso:
+    >>> python -m tools.prefork --workers 4 --port $PORT
+    >>> python -m tools.prefork --benchmark 4          # RSS e req/s de 1 a 4 workers
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parent.parent
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+_logger = logging.getLogger("hvac_prefork")
+
+_RESPAWN_BACKOFF_S = 1.0
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  MASTER
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _uses_tensorflow() -> bool:
+    """INFERENCE_ENGINE=numpy serve sem TensorFlow (ver tools/numpy_engine.py)."""
+    return os.environ.get("INFERENCE_ENGINE", "keras") == "keras"
+
+
+def _worker_main(index: int, sock: socket.socket, threads: int) -> None:
+    """Corpo do processo filho: ajusta threads e roda uvicorn no socket herdado."""
+    import uvicorn
+
+    # Restaura handlers padrão (o uvicorn instala os seus em Server.run)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    # Thread pools são criados no primeiro uso — ainda dá tempo de limitá-los
+    os.environ.setdefault("POLARS_MAX_THREADS", str(threads))
+    if _uses_tensorflow():
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    from tools import api_server
+
+    _logger.info(f"worker {index} iniciado (pid={os.getpid()}, threads={threads})")
+    config = uvicorn.Config(api_server.app, lifespan="on", log_level="info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(host: str, port: int, n_workers: int) -> int:
+    """
+    Pré-carrega o estado compartilhável, faz fork de ``n_workers`` e os
+    supervisiona até SIGTERM/SIGINT.
+
+    Returns:
+        Código de saída do master (2 se ``LAG_STORE=1`` com mais de um worker).
+    """
+    threads = max(1, (os.cpu_count() or 1) // n_workers)
+    os.environ.setdefault("INFERENCE_WORKERS", str(threads))
+
+    t0 = time.perf_counter()
+    if _uses_tensorflow():
+        import tensorflow as tf
+        tf.keras.models  # força o import (lazy) do Keras antes do fork
+    from tools import api_server
+
+    if n_workers > 1 and api_server._lag_store is not None:
+        if os.environ.get("LAG_STORE") == "1":
+            _logger.error(
+                f"LAG_STORE=1 exige um único worker (recebido {n_workers}): cada worker teria "
+                f"um lag store próprio — use --workers 1 ou LAG_STORE=0"
+            )
+            return 2
+        api_server.disable_lag_store(f"pre-fork com {n_workers} workers")
+
+    api_server.preload_fork_safe()
+    gc.collect()
+    gc.freeze()
+    _logger.info(
+        f"master pid={os.getpid()} pré-carregado em {time.perf_counter() - t0:.2f}s — "
+        f"iniciando {n_workers} worker(s) em {host}:{port}"
+    )
+
+    sock = _bind_socket(host, port)
+    workers: dict[int, int] = {}   # pid → índice
+    stopping = False
+
+    def _spawn(index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _worker_main(index, sock, threads)
+            except BaseException:
+                _logger.exception(f"worker {index} falhou")
+                code = 1
+            finally:
+                os._exit(code)
+        workers[pid] = index
+
+    def _stop(signum, _frame) -> None:
+        nonlocal stopping
+        stopping = True
+        _logger.info(f"master recebeu sinal {signum} — encerrando {len(workers)} worker(s)")
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    for i in range(n_workers):
+        _spawn(i)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index = workers.pop(pid, None)
+        if index is None or stopping:
+            continue
+        _logger.error(
+            f"worker {index} (pid={pid}) terminou inesperadamente "
+            f"(status={status}) — recriando em {_RESPAWN_BACKOFF_S:.0f}s"
+        )
+        time.sleep(_RESPAWN_BACKOFF_S)
+        if not stopping:
+            _spawn(index)
+
+    sock.close()
+    _logger.info("master encerrado")
+    return 0
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  BENCHMARK
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _children(pid: int) -> list[int]:
+    path = Path(f"/proc/{pid}/task/{pid}/children")
+    return [int(p) for p in path.read_text().split()] if path.exists() else []
+
+
+def _memory_mb(pid: int) -> dict[str, float]:
+    """RSS, PSS e USS (privada) de um processo via /proc/<pid>/smaps_rollup."""
+    fields: dict[str, int] = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        key, value = line.split(":", 1)
+        fields[key] = int(value.split()[0])
+    uss = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {"rss": fields["Rss"] / 1024, "pss": fields["Pss"] / 1024, "uss": uss / 1024}
+
+
+def _load(port: int, payload: bytes, n_clients: int, duration_s: float) -> tuple[int, list[float], int]:
+    """Dispara ``n_clients`` threads com conexões keep-alive por ``duration_s``."""
+    import http.client
+    import threading
+
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration_s
+
+    def _client() -> None:
+        nonlocal errors
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        local: list[float] = []
+        local_errors = 0
+        headers = {"Content-Type": "application/json"}
+        while time.perf_counter() < deadline:
+            t = time.perf_counter()
+            try:
+                conn.request("POST", "/predict_batch", body=payload, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status == 200:
+                    local.append(time.perf_counter() - t)
+                else:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+
+    threads = [threading.Thread(target=_client) for _ in range(n_clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return len(latencies), latencies, errors
+
+
+def _wait_ready(port: int, payload: bytes, n_workers: int, timeout_s: float = 300) -> None:
+    """
+    Aguarda todos os workers responderem 200: o kernel distribui as conexões
+    entre eles, então exige uma sequência de sucessos proporcional a N.
+    """
+    import http.client
+
+    needed = 10 * n_workers
+    streak = 0
+    deadline = time.perf_counter() + timeout_s
+    while time.perf_counter() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            conn.request("POST", "/predict_batch", body=payload,
+                         headers={"Content-Type": "application/json"})
+            ok = conn.getresponse().status == 200
+            conn.close()
+        except OSError:
+            ok = False
+        streak = streak + 1 if ok else 0
+        if streak >= needed:
+            return
+        if not ok:
+            time.sleep(0.5)
+    raise TimeoutError(f"{n_workers} worker(s) não ficaram prontos em {timeout_s:.0f}s")
+
+
+def benchmark(max_workers: int, duration_s: float = 15.0, batch_rows: int = 32) -> None:
+    """
+    Sobe o master com 1..``max_workers`` workers e mede throughput e memória.
+
+    Para cada N: req/s e p50/p99 de ``/predict_batch`` (``batch_rows`` linhas,
+    2 clientes por worker) e RSS / PSS / USS médios por worker. PSS divide as
+    páginas compartilhadas entre os processos que as mapeiam — é a medida
+    honesta do custo marginal de cada worker; USS é a memória só dele.
+    """
+    import json
+    import subprocess
+
+    record = {
+        "hora": 14, "data": "2025-07-03", "machine_type": "splitao",
+        "latitude": -23.88, "longitude": -46.42,
+        "temperatura_c": 25.7, "temperatura_percebida_c": 24.9,
+        "umidade_relativa_pct": 57.0, "precipitacao_mm": 0.0,
+        "velocidade_vento_kmh": 21.4, "pressao_superficial_hpa": 969.8,
+        "irradiancia_direta_wm2": 520.0, "irradiancia_difusa_wm2": 180.0,
+    }
+    payload = json.dumps({"records": [record] * batch_rows}).encode()
+
+    rows = []
+    for n in range(1, max_workers + 1):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "tools.prefork", "--workers", str(n),
+             "--host", "127.0.0.1", "--port", str(port)],
+            cwd=_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            t0 = time.perf_counter()
+            _wait_ready(port, payload, n)
+            startup_s = time.perf_counter() - t0
+            n_ok, lat, errors = _load(port, payload, 2 * n, duration_s)
+            mem = [_memory_mb(pid) for pid in _children(proc.pid)]
+            master = _memory_mb(proc.pid)
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            try:
+                proc.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+        lat_ms = sorted(x * 1000 for x in lat) or [0.0]
+        k = max(1, len(mem))
+        rows.append({
+            "workers": n,
+            "startup_s": startup_s,
+            "req_s": n_ok / duration_s,
+            "p50": lat_ms[len(lat_ms) // 2],
+            "p99": lat_ms[min(len(lat_ms) - 1, int(len(lat_ms) * 0.99))],
+            "errors": errors,
+            "rss": sum(m["rss"] for m in mem) / k,
+            "pss": sum(m["pss"] for m in mem) / k,
+            "uss": sum(m["uss"] for m in mem) / k,
+            "total_pss": master["pss"] + sum(m["pss"] for m in mem),
+        })
+        print(f"  {n} worker(s) medidos", flush=True)
+
+    W = 100
+    print("\n" + "=" * W)
+    print(f"  PRE-FORK — {os.cpu_count()} CPU(s), /predict_batch com {batch_rows} linhas, "
+          f"{duration_s:.0f}s por ponto")
+    print("=" * W)
+    print(f"  {'workers':>7} {'pronto(s)':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'erros':>6} "
+          f"{'RSS/w MB':>9} {'PSS/w MB':>9} {'USS/w MB':>9} {'PSS total':>10}")
+    for r in rows:
+        print(f"  {r['workers']:>7} {r['startup_s']:>9.1f} {r['req_s']:>8.1f} {r['p50']:>8.1f} "
+              f"{r['p99']:>8.1f} {r['errors']:>6} {r['rss']:>9.0f} {r['pss']:>9.0f} "
+              f"{r['uss']:>9.0f} {r['total_pss']:>10.0f}")
+    base, last = rows[0], rows[-1]
+    print("-" * W)
+    print(f"  Sem compartilhamento (processos independentes): ~{last['workers']} × "
+          f"{base['total_pss']:.0f} = {last['workers'] * base['total_pss']:.0f} MB; "
+          f"com pre-fork: {last['total_pss']:.0f} MB "
+          f"(cada worker extra ≈ {last['uss']:.0f} MB privados).")
+    print("=" * W)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  EXECUÇÃO
+# ══════════════════════════════════════════════════════════════════════════════
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor pre-fork da HVAC Predictions API")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", 2)))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--benchmark", type=int, metavar="N",
+                        help="Mede RSS e req/s de 1 a N workers e sai")
+    parser.add_argument("--duration", type=float, default=15.0,
+                        help="Segundos de carga por ponto do benchmark")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='{"ts":"%(asctime)s","level":"%(levelname)s","logger":"%(name)s","msg":"%(message)s"}',
+        datefmt="%Y-%m-%dT%H:%M:%S",
+        stream=sys.stdout,
+    )
+
+    if args.benchmark:
+        benchmark(args.benchmark, duration_s=args.duration)
+    else:
+        if args.workers < 1:
+            parser.error("--workers deve ser >= 1")
+        sys.exit(serve(args.host, args.port, args.workers))
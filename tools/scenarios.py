@@ -0,0 +1,294 @@
+"""
+Cenários What-if — varredura sobre uma única normalização
+==========================================================
+
+"E se a temperatura subir 1..5 °C?", "e se a unidade operar no feriado?" —
+rodar ``HVACDLInferenceAPI.predict`` num frame modificado por cenário repete
+a derivação (datas + geo lookup), o OHE e o clipping de todas as colunas a
+cada cenário. Aqui o frame base é derivado e normalizado uma única vez:
+
+    df ──► FeatureDeriver.derive ──► DLNormalizer.transform_derived   (uma vez)
+                 │                              │
+           colunas brutas                 dense base (n, d)
+           dos cenários                         │
+                 └──► por cenário: copia o bloco e reescreve só as colunas
+                      alteradas (clip + min/max com os limites do treino)
+                                                │
+                      (n·S, d) empilhado ──► um único forward pass
+                                                │
+                      tabela tidy: scenario × row → consumo_kwh, delta_kwh
+
+Cada cenário altera features densas do modelo (``feature_columns`` do
+``meta.json``) em unidade bruta, na ordem ``set`` → ``scale`` → ``delta``:
+
+    Scenario("temp+2", delta={"Temperatura_C": 2, "Temperatura_Percebida_C": 2})
+    Scenario("feriado", set={"is_feriado": 1, "is_dia_util": 0})
+
+Colunas com ``clipping_limits`` no ``metadata_norm.json`` são re-clipadas e
+re-escaladas como no treino: ``(clip(x, lower, upper) − lower) / (upper − lower)``;
+as demais (``is_feriado``, ``trimestre``, OHE…) recebem o valor direto. O
+resultado é idêntico a rodar ``predict`` no frame já modificado.
+
+Embeddings (hora, mes, grupo_regional, periodo_dia) não são alteráveis: um
+cenário sobre eles muda a derivação e deve passar por ``predict``.
+
+Uso:
+    >>> engine = ScenarioEngine(HVACDLInferenceAPI("model/artifacts/dl_hvac/global"))
+    >>> table = engine.sweep(df, temperature_scenarios((1, 2, 3, 4, 5)))
+    >>> table.filter(pl.col("scenario") == "temp+3")["delta_kwh"].mean()
+
+Com segmentação, ``sweep_routed(registry, df, ...)`` varre cada segmento DL
+com o próprio modelo (mesmo roteamento de ``predict``); linhas de segmentos
+ML usam o modelo global — a coluna ``model`` indica qual.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from typing import Iterable
+
+import numpy as np
+import polars as pl
+
+try:
+    from .inference_runner import HVACDLInferenceAPI
+    from .metrics import stage_timer
+    from .normalizer import FeatureDeriver
+except ImportError:
+    from inference_runner import HVACDLInferenceAPI
+    from metrics import stage_timer
+    from normalizer import FeatureDeriver
+
+_logger = logging.getLogger(__name__)
+
+BASE_SCENARIO = "base"
+_GLOBAL_MODEL = "global"
+_TEMPERATURE_COLUMNS = ("Temperatura_C", "Temperatura_Percebida_C")
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """
+    Alteração de features densas, em unidade bruta.
+
+    Attributes:
+        name  : Rótulo do cenário na tabela de saída.
+        set   : {coluna: valor} — substitui o valor.
+        scale : {coluna: fator} — multiplica.
+        delta : {coluna: incremento} — soma (após ``set`` e ``scale``).
+    """
+
+    name:  str
+    set:   dict[str, float] = field(default_factory=dict)
+    scale: dict[str, float] = field(default_factory=dict)
+    delta: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def columns(self) -> list[str]:
+        """Colunas alteradas, na ordem da primeira menção."""
+        return list(dict.fromkeys([*self.set, *self.scale, *self.delta]))
+
+    def apply(self, column: str, raw: np.ndarray | None, n: int) -> np.ndarray:
+        """Valores brutos (n,) float64 de ``column`` neste cenário."""
+        if column in self.set:
+            values = np.full(n, float(self.set[column]))
+        else:
+            values = raw.astype(np.float64, copy=True)
+        if column in self.scale:
+            values *= float(self.scale[column])
+        if column in self.delta:
+            values += float(self.delta[column])
+        return values
+
+
+def temperature_scenarios(
+    deltas: Iterable[float],
+    columns: tuple[str, ...] = _TEMPERATURE_COLUMNS,
+) -> list[Scenario]:
+    """Um cenário ``temp+{d}`` por incremento, aplicado à temperatura e à percebida."""
+    return [Scenario(f"temp{d:+g}", delta={c: d for c in columns}) for d in deltas]
+
+
+class ScenarioEngine:
+    """
+    Predições de vários cenários com uma normalização e um forward pass.
+
+    Attributes:
+        api : ``HVACDLInferenceAPI`` (qualquer engine) cujo normalizer e
+              modelo são usados.
+    """
+
+    def __init__(self, api: HVACDLInferenceAPI) -> None:
+        self.api = api
+        self._column_index = {c: i for i, c in enumerate(api.normalizer.feature_columns)}
+        self._limits = api.normalizer.clipping_limits or {}
+
+    def sweep(
+        self,
+        df: pl.DataFrame,
+        scenarios: list[Scenario],
+        include_base: bool = True,
+    ) -> pl.DataFrame:
+        """
+        Predição de cada linha de ``df`` em cada cenário.
+
+        Args:
+            df          : Frame bruto (mesmo schema de ``HVACDLInferenceAPI.predict``).
+            scenarios   : Cenários, na ordem da tabela de saída.
+            include_base: Inclui o cenário ``"base"`` (frame sem alterações)
+                          e a coluna ``delta_kwh`` (cenário − base).
+
+        Returns:
+            pl.DataFrame tidy com ``scenario`` (str), ``row`` (índice em ``df``),
+            ``consumo_kwh`` e, com ``include_base``, ``delta_kwh``.
+
+        Raises:
+            ValueError: Cenário sem nome, nomes repetidos ou coluna que não
+                        é feature densa do modelo.
+        """
+        return self.sweep_derived(FeatureDeriver.derive(df), scenarios, include_base)
+
+    def sweep_derived(
+        self,
+        derived: pl.DataFrame,
+        scenarios: list[Scenario],
+        include_base: bool = True,
+    ) -> pl.DataFrame:
+        """``sweep`` sobre um lote já passado por ``FeatureDeriver.derive()``."""
+        self._validate(scenarios, include_base)
+        names = ([BASE_SCENARIO] if include_base else []) + [s.name for s in scenarios]
+        n = derived.height
+
+        base = self.api.normalizer.transform_derived(derived)
+        dense = base["dense_features"]
+
+        with stage_timer("scenario_patch"):
+            blocks = [dense] if include_base else []
+            raw_cache: dict[str, np.ndarray] = {}
+            for scenario in scenarios:
+                block = dense.copy()
+                for column in scenario.columns:
+                    raw = None
+                    if column not in scenario.set:
+                        raw = raw_cache.get(column)
+                        if raw is None:
+                            raw = raw_cache[column] = self._raw_column(derived, column)
+                    block[:, self._column_index[column]] = self._encode(column, scenario.apply(column, raw, n))
+                blocks.append(block)
+            inputs = {
+                key: np.concatenate(blocks) if key == "dense_features" else np.tile(value, (len(names), 1))
+                for key, value in base.items()
+            }
+
+        predictions = self.api._predict_inputs(inputs)
+        _logger.debug(f"Cenários: {len(names)} × {n} linhas em um forward pass")
+
+        predictions = predictions.astype(np.float64)
+        table = {
+            "scenario":    pl.Series(np.repeat(names, n), dtype=pl.Utf8),
+            "row":         np.tile(np.arange(n, dtype=np.int64), len(names)),
+            "consumo_kwh": predictions,
+        }
+        if include_base:
+            table["delta_kwh"] = predictions - np.tile(predictions[:n], len(names))
+        return pl.DataFrame(table)
+
+    # ── Internos ─────────────────────────────────────────────────────────
+
+    def _validate(self, scenarios: list[Scenario], include_base: bool) -> None:
+        names = [s.name for s in scenarios] + ([BASE_SCENARIO] if include_base else [])
+        if any(not name for name in names):
+            raise ValueError("Todo cenário precisa de um nome")
+        repeated = sorted({name for name in names if names.count(name) > 1})
+        if repeated:
+            raise ValueError(f"Nomes de cenário repetidos: {repeated}")
+        for scenario in scenarios:
+            unknown = [c for c in scenario.columns if c not in self._column_index]
+            if unknown:
+                raise ValueError(
+                    f"Cenário '{scenario.name}': {unknown} não são features densas do modelo "
+                    f"(disponíveis: {list(self._column_index)})"
+                )
+
+    @staticmethod
+    def _raw_column(derived: pl.DataFrame, column: str) -> np.ndarray:
+        """Valores brutos (pré-clipping) de ``column`` no frame derivado."""
+        if column not in derived.columns:
+            raise ValueError(f"Coluna '{column}' ausente no input: use 'set' em vez de 'scale'/'delta'")
+        return derived[column].cast(pl.Float64).to_numpy()
+
+    def _encode(self, column: str, values: np.ndarray) -> np.ndarray:
+        """Mesma escala de ``ModelSchema.make_clipping_min_max_columns`` + ``_sanitize``."""
+        limits = self._limits.get(column)
+        if limits is not None:
+            lower, upper = limits["lower"], limits["upper"]
+            values = (np.clip(values, lower, upper) - lower) / (upper - lower)
+        return np.where(np.isfinite(values), values, 0.0).astype(np.float32)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  ROTEAMENTO POR SEGMENTO
+# ══════════════════════════════════════════════════════════════════════════════
+
+def sweep_routed(
+    predictor,
+    df: pl.DataFrame,
+    scenarios: list[Scenario],
+    include_base: bool = True,
+) -> pl.DataFrame:
+    """
+    ``ScenarioEngine.sweep`` com o mesmo roteamento de ``predictor.predict``.
+
+    ``predictor`` é um ``HVACDLInferenceAPI`` (todas as linhas no modelo
+    global) ou um ``SegmentedModelRegistry``: o frame é derivado uma vez,
+    separado por ``route`` (tipo de máquina + domínio dos Embeddings) e cada
+    segmento DL residente varre as suas linhas — o cenário ``base`` bate com
+    ``predict``. Segmentos ML não têm bloco denso para reescrever: as linhas
+    deles vão explicitamente ao modelo global.
+
+    Returns:
+        A tabela de ``sweep`` (``row`` indexa ``df``) + ``model``: segmento
+        que predisse a linha ou ``"global"``.
+
+    Raises:
+        ValueError: Mesmos casos de ``ScenarioEngine.sweep``, contra as
+                    features de cada modelo usado.
+    """
+    derived = FeatureDeriver.derive(df)
+    route = getattr(predictor, "route", None)
+    if route is None:
+        table = ScenarioEngine(predictor).sweep_derived(derived, scenarios, include_base)
+        return table.with_columns(model=pl.lit(_GLOBAL_MODEL))
+
+    _, groups, idx_global = route(derived)
+    runs = [
+        (resident.spec.segment, resident.api, rows)
+        for resident, rows in groups
+        if resident.spec.family == "dl"
+    ]
+    ml_rows = [rows for resident, rows in groups if resident.spec.family != "dl"]
+    if ml_rows:
+        idx_global = np.sort(np.concatenate([idx_global, *ml_rows]))
+    if len(idx_global) or not runs:
+        runs.append((_GLOBAL_MODEL, predictor.global_api, idx_global))
+
+    engines = [(label, ScenarioEngine(api), rows) for label, api, rows in runs]
+    for _, engine, _ in engines:
+        engine._validate(scenarios, include_base)
+
+    tables = []
+    for label, engine, rows in engines:
+        subset = derived if len(rows) == derived.height else derived[rows]
+        table = engine.sweep_derived(subset, scenarios, include_base)
+        tables.append(table.with_columns(
+            row=pl.Series(rows.astype(np.int64))[table["row"]],
+            model=pl.lit(label),
+        ))
+    if len(tables) == 1:
+        return tables[0]
+
+    # Mesma ordem de ``sweep``: cenário (na ordem pedida) → linha
+    names = ([BASE_SCENARIO] if include_base else []) + [s.name for s in scenarios]
+    order = pl.col("scenario").replace_strict(names, list(range(len(names))), return_dtype=pl.Int32)
+    return pl.concat(tables).sort(order, "row")
@@ -0,0 +1,298 @@
+"""
+Streaming — Leitura incremental do corpo e resposta em chunks
+=============================================================
+
+Para lotes muito grandes, ``/predict_batch`` segura o input inteiro e a lista
+inteira de predições em memória e só responde no final. Este módulo fatia o
+corpo da requisição **enquanto ele chega** em DataFrames de tamanho fixo, de
+modo que cada chunk é inferido e devolvido ao cliente antes do próximo ser lido:
+
+    corpo (bytes chegando) ──► ndjson_frames / arrow_frames ──► chunk de N linhas
+                                                                     │
+                                              HVACDLInferenceAPI.predict_batch
+                                                                     │
+    resposta (bytes saindo) ◄── ndjson_lines / ArrowChunkEncoder ◄────┘
+
+A memória fica limitada a ~1 chunk de entrada + 1 de saída, independente do
+tamanho total, e o time-to-first-byte depende só do tamanho do chunk.
+
+Formatos de entrada:
+    - NDJSON: uma linha JSON por registro, com os campos de ``/predict``.
+      Cada chunk é parseado de uma vez por ``pl.read_ndjson`` (sem laço por linha).
+    - Arrow IPC stream: record batches lidos por ``pyarrow.ipc`` em uma thread
+      auxiliar, alimentada pelos bytes da requisição via fila limitada.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import queue
+import threading
+from typing import AsyncIterator
+
+import numpy as np
+import polars as pl
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+try:
+    from .columnar import API_SCHEMA, ColumnarValidationError
+except ImportError:
+    from tools.columnar import API_SCHEMA, ColumnarValidationError
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Nº máximo de pedaços de bytes da requisição bufferizados para a thread Arrow
+_MAX_BUFFERED_BODY_CHUNKS = 8
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  ENTRADA — NDJSON
+# ══════════════════════════════════════════════════════════════════════════════
+
+async def ndjson_frames(
+    byte_chunks: AsyncIterator[bytes],
+    chunk_rows: int,
+) -> AsyncIterator[pl.DataFrame]:
+    """
+    Converte um corpo NDJSON em DataFrames de ``chunk_rows`` linhas.
+
+    Args:
+        byte_chunks: Iterador assíncrono dos bytes do corpo (``request.stream()``).
+        chunk_rows : Linhas por DataFrame emitido (o último pode ser menor).
+
+    Yields:
+        pl.DataFrame com as colunas do contrato da API.
+
+    Raises:
+        ColumnarValidationError: Linha JSON malformada.
+    """
+    tail = b""
+    lines: list[bytes] = []
+    async for chunk in byte_chunks:
+        if not chunk:
+            continue
+        parts = (tail + chunk).split(b"\n")
+        tail = parts.pop()
+        lines.extend(p for p in parts if p.strip())
+        while len(lines) >= chunk_rows:
+            batch, lines = lines[:chunk_rows], lines[chunk_rows:]
+            yield _parse_ndjson(batch)
+    if tail.strip():
+        lines.append(tail)
+    if lines:
+        yield _parse_ndjson(lines)
+
+
+def _parse_ndjson(lines: list[bytes]) -> pl.DataFrame:
+    try:
+        return pl.read_ndjson(io.BytesIO(b"\n".join(lines)), schema=API_SCHEMA)
+    except Exception as exc:
+        raise ColumnarValidationError(f"NDJSON inválido: {exc}") from exc
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  ENTRADA — ARROW IPC STREAM
+# ══════════════════════════════════════════════════════════════════════════════
+
+class _QueueReader(io.RawIOBase):
+    """File-like bloqueante que lê de uma fila de bytes (b"" sinaliza EOF)."""
+
+    def __init__(self, inbox: "queue.Queue[bytes]") -> None:
+        self._inbox = inbox
+        self._buf = memoryview(b"")
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        # pyarrow trata leitura curta como fim do arquivo: preenche ``b`` inteiro
+        # (ou até o EOF) atravessando quantos pedaços da fila forem necessários.
+        filled = 0
+        while filled < len(b):
+            if not self._buf:
+                if self._eof:
+                    break
+                chunk = self._inbox.get()
+                if not chunk:
+                    self._eof = True
+                    continue
+                self._buf = memoryview(chunk)
+            n = min(len(b) - filled, len(self._buf))
+            b[filled:filled + n] = self._buf[:n]
+            self._buf = self._buf[n:]
+            filled += n
+        return filled
+
+
+async def arrow_frames(
+    byte_chunks: AsyncIterator[bytes],
+    chunk_rows: int,
+) -> AsyncIterator[pl.DataFrame]:
+    """
+    Converte um corpo Arrow IPC stream em DataFrames de ``chunk_rows`` linhas.
+
+    ``pyarrow.ipc.open_stream`` exige um leitor bloqueante, então ele roda em
+    uma thread auxiliar; o event loop apenas bombeia os bytes recebidos para
+    uma fila limitada (backpressure até o cliente via TCP).
+
+    Raises:
+        ColumnarValidationError: Corpo não é um Arrow IPC stream válido.
+    """
+    import pyarrow as pa
+
+    loop = asyncio.get_running_loop()
+    inbox: "queue.Queue[bytes]" = queue.Queue(maxsize=_MAX_BUFFERED_BODY_CHUNKS)
+    outbox: asyncio.Queue = asyncio.Queue(maxsize=1)
+    stop = threading.Event()
+
+    def emit(item) -> None:
+        if not stop.is_set():
+            asyncio.run_coroutine_threadsafe(outbox.put(item), loop).result()
+
+    def reader() -> None:
+        try:
+            pending: pl.DataFrame | None = None
+            for batch in pa.ipc.open_stream(_QueueReader(inbox)):
+                if stop.is_set():
+                    return
+                df = pl.from_arrow(pa.Table.from_batches([batch]))
+                pending = df if pending is None else pl.concat([pending, df])
+                while pending.height >= chunk_rows:
+                    emit(pending.head(chunk_rows))
+                    pending = pending.slice(chunk_rows)
+            if pending is not None and pending.height:
+                emit(pending)
+            emit(None)
+        except Exception as exc:
+            emit(exc)
+
+    def put(chunk: bytes) -> None:
+        # put com timeout para não prender a thread se a leitora já parou
+        while not stop.is_set():
+            try:
+                inbox.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    async def pump() -> None:
+        async for chunk in byte_chunks:
+            if chunk:
+                await loop.run_in_executor(None, put, chunk)
+        await loop.run_in_executor(None, put, b"")
+
+    thread = threading.Thread(target=reader, name="arrow-stream-reader", daemon=True)
+    thread.start()
+    pump_task = loop.create_task(pump())
+    try:
+        while True:
+            item = await outbox.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise ColumnarValidationError(f"Arrow IPC stream inválido: {item}") from item
+            yield item
+    finally:
+        # Libera a thread leitora mesmo se o consumidor abandonou o stream
+        stop.set()
+        pump_task.cancel()
+        while not outbox.empty():
+            outbox.get_nowait()
+        try:
+            inbox.put_nowait(b"")
+        except queue.Full:
+            pass
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  SAÍDA
+# ══════════════════════════════════════════════════════════════════════════════
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que pode ler o corpo da requisição enquanto responde.
+
+    O ``StreamingResponse`` padrão (ASGI < 2.4) escuta ``receive()`` em
+    paralelo para detectar desconexão — e consome as mensagens do corpo que
+    o gerador ainda precisa ler. Aqui a desconexão é detectada pelo próprio
+    fluxo: ``request.stream()`` levanta ``ClientDisconnect`` ou o ``send``
+    falha.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+
+def ndjson_lines(preds: np.ndarray) -> bytes:
+    """Serializa um chunk de predições como linhas ``{"consumo_kwh": x}``."""
+    return "".join(
+        f'{{"consumo_kwh":{v!r}}}\n' for v in np.asarray(preds, dtype=np.float64).tolist()
+    ).encode()
+
+
+def ndjson_error(message: str, rows_done: int) -> bytes:
+    """Linha final de erro (o status HTTP 200 já foi enviado ao cliente)."""
+    return (json.dumps({"error": message, "rows_done": rows_done}, ensure_ascii=False) + "\n").encode()
+
+
+class _ChunkSink:
+    """Sink append-only para o writer Arrow; ``drain()`` devolve os bytes novos."""
+
+    closed = False
+
+    def __init__(self) -> None:
+        self._parts: list[bytes] = []
+        self._pos = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+class ArrowChunkEncoder:
+    """
+    Serializa chunks de predições como um único Arrow IPC stream incremental.
+
+    O primeiro ``encode()`` inclui o schema; cada chamada devolve apenas os
+    bytes novos, e ``close()`` devolve o marcador de fim de stream.
+    """
+
+    def __init__(self) -> None:
+        import pyarrow as pa
+
+        self._pa = pa
+        self._schema = pa.schema([("consumo_kwh", pa.float64())])
+        self._sink = _ChunkSink()
+        self._writer = pa.ipc.new_stream(self._sink, self._schema)
+
+    def encode(self, preds: np.ndarray) -> bytes:
+        batch = self._pa.record_batch(
+            [self._pa.array(np.asarray(preds, dtype=np.float64))], schema=self._schema,
+        )
+        self._writer.write_batch(batch)
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
@@ -0,0 +1,392 @@
+"""
+TransformPlan — normalização DL/ML compilada em um único ``select``
+===================================================================
+
+O caminho ``ModelSchema`` de ``transform_derived`` materializa um frame novo a
+cada passo: ``clone`` → ``adjust_machine_type`` → categóricas → um
+``to_dummies`` + ``with_columns`` por coluna de OHE → um ``with_columns`` por
+coluna clipada → ``_to_float32`` (sanitiza, alinha e converte).
+
+Como ``feature_columns``, ``clipping_limits`` e ``te_map`` são fixos por
+artefato, cada feature de saída é resolvida uma vez (na construção do
+normalizer) numa regra, e as regras viram expressões polars avaliadas num
+único ``select`` que já sai em Float32:
+
+    feature_columns ─┐
+    clipping_limits ─┼─► regras (uma por feature) ─► exprs ─► df.select(...)
+    te_map ──────────┘   (na construção)             (por schema de input)
+
+    regra     expressão                                        exemplo
+    ────────  ───────────────────────────────────────────────  ─────────────────────
+    ohe       src.eq_missing(valor)                            estacao_verao
+    te        hora.replace_strict(chaves, encodings, média)    hora_target_enc
+    cat       grupo_regional → Utf8 → Categorical → físico     grupo_regional (ML)
+    clip      (clip(x, lower, upper) − lower) / (upper − lower) Temperatura_C
+    iqr       idem, limites de Tukey dos quantis do lote       (sem clipping_limits)
+    col       coluna como está                                 is_feriado, lags
+    zero      0.0 (ausente / consumida por outra etapa)        periodo_dia_* (DL)
+
+Toda saída float passa pela mesma sanitização de ``_sanitize`` (NaN/±inf →
+0.0, nulos preservados) antes do cast para Float32. As expressões dependem
+do schema do input (colunas opcionais ausentes viram zero, como em
+``_to_float32``), então ficam em cache por schema.
+
+O caminho ``ModelSchema`` continua disponível
+(``_transform_derived_schema``) como referência da suíte de paridade:
+
+    python -m tools.transform_plan parity
+    python -m tools.transform_plan bench --sizes 1,1000,100000,1000000
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+try:
+    from model.pre_process.schema import ModelSchema
+except ImportError:
+    import sys
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from model.pre_process.schema import ModelSchema
+
+_logger = logging.getLogger(__name__)
+
+_TARGET = "consumo_kwh"
+
+# Colunas de OHE, na ordem de make_one_hot_encode_columns
+_OHE_SOURCES: tuple[str, ...] = ("tipo_maquina", "estacao", "periodo_dia")
+
+# Clipping recalculado no lote quando o artefato não tem clipping_limits
+FALLBACK_CLIP_COLUMNS: list[str] = [
+    "Temperatura_C", "Temperatura_Percebida_C",
+    "Umidade_Relativa_%", "Precipitacao_mm",
+    "Velocidade_Vento_kmh", "Pressao_Superficial_hPa",
+]
+
+# Embeddings do DL: coluna de saída do select (os índices saem como no caminho antigo)
+EMBEDDING_OUTPUTS: dict[str, str] = {
+    "hora":           "__emb_hora",
+    "mes":            "__emb_mes",
+    "grupo_regional": "__emb_grupo_regional",
+}
+
+# Schemas de input distintos vistos por plano (além disso, o cache recomeça)
+_CACHE_SIZE = 8
+
+_FLOAT_DTYPES = (pl.Float32, pl.Float64)
+
+
+class TransformPlan:
+    """
+    Regras de normalização de um artefato, avaliadas num único ``select``.
+
+    Attributes:
+        feature_columns : Features de saída, na ordem do treino.
+        embeddings      : True para o DL (hora/mes/grupo_regional saem
+                          também como índices de Embedding e deixam de ser
+                          features densas); False para o ML.
+    """
+
+    def __init__(
+        self,
+        feature_columns: list[str],
+        clipping_limits: dict | None = None,
+        te_map: dict | None = None,
+        embeddings: bool = False,
+    ) -> None:
+        self.feature_columns = list(feature_columns)
+        self.embeddings = embeddings
+
+        te_bases = [c[: -len("_target_enc")] for c in self.feature_columns if c.endswith("_target_enc")]
+        self._te = {}
+        if te_map and te_bases:
+            for base in te_bases:
+                info = te_map[base]
+                pairs = [(k, v) for k, v in info["mapping"].items() if k is not None]
+                self._te[base] = (
+                    [k for k, _ in pairs],
+                    [float(v) for _, v in pairs],
+                    float(info["global_mean"]),
+                )
+
+        # Colunas que o caminho ModelSchema consome (removidas antes do alinhamento)
+        consumed = {"machine_type", *_OHE_SOURCES}
+        if embeddings:
+            consumed |= {_TARGET, "hora", "mes", "grupo_regional"}
+
+        self._rules = [self._rule(c, consumed, clipping_limits) for c in self.feature_columns]
+        self._cache: dict[tuple, tuple[list[pl.Expr], list[int]]] = {}
+
+    def _rule(self, column: str, consumed: set[str], clipping_limits: dict | None) -> tuple:
+        """Regra de uma feature de saída (ver tabela no docstring do módulo)."""
+        base = column[: -len("_target_enc")]
+        if column.endswith("_target_enc") and base in self._te:
+            return ("te", base)
+        for source in _OHE_SOURCES:
+            if column.startswith(f"{source}_"):
+                if self.embeddings and source == "periodo_dia":
+                    return ("zero",)
+                return ("ohe", source, column[len(source) + 1:])
+        if column in consumed:
+            return ("zero",)
+        if column == "grupo_regional":
+            return ("cat",)
+        if clipping_limits:
+            if column in clipping_limits:
+                limits = clipping_limits[column]
+                return ("clip", limits["lower"], limits["upper"])
+        elif column in FALLBACK_CLIP_COLUMNS:
+            return ("iqr",)
+        return ("col",)
+
+    # ── Execução ─────────────────────────────────────────────────────────
+
+    def select(self, df: pl.DataFrame) -> pl.DataFrame:
+        """
+        Avalia o plano sobre a saída de ``FeatureDeriver.derive()``.
+
+        Returns:
+            pl.DataFrame com ``feature_columns`` (Float32, na ordem do treino)
+            e, com ``embeddings``, as colunas de ``EMBEDDING_OUTPUTS``.
+        """
+        key = tuple(df.schema.items())
+        bound = self._cache.get(key)
+        if bound is None:
+            if len(self._cache) >= _CACHE_SIZE:
+                self._cache.clear()
+            bound = self._cache[key] = self._bind(df.schema)
+        exprs, iqr = bound
+        if iqr:
+            exprs = list(exprs)
+            for i, expr in self._iqr_exprs(df, iqr).items():
+                exprs[i] = expr
+        # lazy: a eliminação de subexpressões comuns avalia cada fonte uma vez
+        return df.lazy().select(exprs).collect()
+
+    def _iqr_exprs(self, df: pl.DataFrame, iqr: list[int]) -> dict[int, pl.Expr]:
+        """Clipping de Tukey com quantis do próprio lote (``make_clipping_min_max_columns``)."""
+        names = [self.feature_columns[i] for i in iqr]
+        quantiles = df.select(
+            [pl.col(c).quantile(0.15).alias(f"{c}__q1") for c in names]
+            + [pl.col(c).quantile(0.85).alias(f"{c}__q3") for c in names]
+        ).row(0, named=True)
+        exprs = {}
+        for i, column in zip(iqr, names):
+            q1, q3 = quantiles[f"{column}__q1"], quantiles[f"{column}__q3"]
+            if q1 is None or q3 is None:
+                expr = _sanitized(pl.col(column))
+            else:
+                iqr_ = q3 - q1
+                expr = _clipped(column, q1 - 1.5 * iqr_, q3 + 1.5 * iqr_)
+            exprs[i] = expr.cast(pl.Float32).alias(column)
+        return exprs
+
+    def _bind(self, schema: pl.Schema) -> tuple[list[pl.Expr], list[int]]:
+        """
+        Expressões do plano para um schema de input.
+
+        Returns:
+            (exprs, iqr) — ``iqr`` são as posições cujos limites dependem dos
+            quantis do lote (expressão refeita a cada chamada).
+        """
+        # tipo_maquina chega renomeado do FeatureDeriver ou cru (ver transform_derived)
+        machine = "machine_type" if "machine_type" in schema or "tipo_maquina" not in schema else "tipo_maquina"
+        sources = {
+            "tipo_maquina": ModelSchema.machine_type_expr(machine),
+            "estacao":      pl.col("estacao"),
+            "periodo_dia":  pl.col("periodo_dia"),
+        }
+        # Target Encoding remove a coluna base (só quando ela existe no input)
+        te_applied = {base for base in self._te if base in schema}
+
+        exprs, iqr = [], []
+        for column, rule in zip(self.feature_columns, self._rules):
+            kind = rule[0]
+            if kind == "col" and column in te_applied:
+                kind = "zero"
+            if kind in ("col", "clip", "iqr") and column not in schema:
+                kind = "zero"
+            if kind == "te" and rule[1] not in schema:
+                kind = "zero"
+
+            if kind == "ohe":
+                expr = sources[rule[1]].eq_missing(rule[2])
+            elif kind == "te":
+                keys, values, fallback = self._te[rule[1]]
+                expr = pl.col(rule[1]).replace_strict(
+                    pl.Series(keys).cast(schema[rule[1]]),
+                    pl.Series(values, dtype=pl.Float64),
+                    default=fallback,
+                    return_dtype=pl.Float64,
+                ).fill_null(fallback)
+                if not np.isfinite([*values, fallback]).all():
+                    expr = _sanitized(expr)
+            elif kind == "cat":
+                expr = pl.col(column).cast(pl.Utf8).cast(pl.Categorical).to_physical()
+            elif kind == "clip":
+                expr = _clipped(column, rule[1], rule[2])
+            elif kind == "iqr":
+                iqr.append(len(exprs))
+                expr = pl.col(column)
+            elif kind == "col":
+                expr = pl.col(column)
+                if schema[column] in _FLOAT_DTYPES:
+                    expr = _sanitized(expr)
+            else:
+                expr = pl.lit(0.0)
+            exprs.append(expr.cast(pl.Float32).alias(column))
+
+        if self.embeddings:
+            exprs += [pl.col(src).alias(out) for src, out in EMBEDDING_OUTPUTS.items()]
+        return exprs, iqr
+
+
+def _sanitized(expr: pl.Expr) -> pl.Expr:
+    """NaN/±inf → 0.0 (nulos preservados: ``when(null)`` cai no ``otherwise``), como ``_sanitize``."""
+    return pl.when(~expr.is_finite()).then(0.0).otherwise(expr)
+
+
+def _clipped(column: str, lower: float, upper: float) -> pl.Expr:
+    """Clip + Min/Max de ``make_clipping_min_max_columns``, já sanitizado."""
+    expr = (pl.col(column).clip(lower, upper) - lower) / (upper - lower)
+    if np.isfinite([lower, upper]).all():
+        # Com limites finitos o clip elimina ±inf: só resta NaN (input NaN ou upper == lower)
+        return expr.fill_nan(0.0)
+    return _sanitized(expr)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  CLI — paridade e benchmark contra o caminho ModelSchema
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _normalizers() -> list[tuple[str, object]]:
+    """DL global + segmentos e os segmentos ML (sidecar, sem desserializar o .joblib)."""
+    from tools.normalizer import _ROOT, DLNormalizer, MLNormalizer
+
+    dl_root = _ROOT / "model" / "artifacts" / "dl_hvac"
+    ml_root = _ROOT / "model" / "artifacts" / "ml_hvac"
+    found = [
+        (f"dl/{p.parent.name}", DLNormalizer.from_artifact(p.parent))
+        for p in sorted(dl_root.rglob("meta.json"))
+    ]
+    found += [
+        (f"ml/{p.parent.name}", MLNormalizer.from_artifact(p))
+        for p in sorted(ml_root.rglob("best_pipeline.joblib"))
+    ]
+    return found
+
+
+def _parity_frames() -> list[tuple[str, pl.DataFrame]]:
+    """Frames derivados que exercitam os ramos do plano."""
+    from tools.normalizer import FeatureDeriver
+    from tools.warmup import synthetic_frame
+
+    base = FeatureDeriver.derive(synthetic_frame(5000, seed=7))
+    rng = np.random.default_rng(7)
+    n = base.height
+
+    def _dirty(values: np.ndarray) -> np.ndarray:
+        values = values.copy()
+        values[rng.random(n) < 0.05] = np.nan
+        values[rng.random(n) < 0.02] = np.inf
+        values[rng.random(n) < 0.02] = -np.inf
+        return values
+
+    dirty = base.with_columns(
+        pl.Series("Temperatura_C", _dirty(base["Temperatura_C"].to_numpy())),
+        pl.Series("Irradiancia_Direta_Wm2", _dirty(base["Irradiancia_Direta_Wm2"].to_numpy())),
+        pl.when(pl.int_range(pl.len()) % 11 == 0).then(None).otherwise(pl.col("Umidade_Relativa_%"))
+          .alias("Umidade_Relativa_%"),
+        pl.when(pl.int_range(pl.len()) % 13 == 0).then(pl.lit("maquina-nova"))
+          .when(pl.int_range(pl.len()) % 17 == 0).then(None)
+          .otherwise(pl.col("machine_type")).alias("machine_type"),
+    )
+    return [
+        ("sintético",          base),
+        ("1 linha",            base),
+        ("NaN/inf/nulos",      dirty),
+        ("tipo_maquina",       base.rename({"machine_type": "tipo_maquina"})),
+        ("sem irradiância",    base.drop(["Irradiancia_Direta_Wm2", "Irradiancia_Difusa_Wm2"])),
+        ("clima inteiro",      base.with_columns(pl.col("Pressao_Superficial_hPa").round(0).cast(pl.Int64))),
+        ("coluna toda nula",   base.with_columns(pl.lit(None, dtype=pl.Float64).alias("Precipitacao_mm"))),
+    ]
+
+
+def _same(a: np.ndarray, b: np.ndarray) -> bool:
+    return a.dtype == b.dtype and a.shape == b.shape and np.array_equal(a, b, equal_nan=True)
+
+
+def _parity() -> bool:
+    """Saída bit a bit idêntica ao caminho ModelSchema, por artefato e frame."""
+    frames = _parity_frames()
+    ok = True
+    for name, normalizer in _normalizers():
+        failed = []
+        for label, df in frames:
+            if hasattr(normalizer, "embedding_domain_mask"):
+                # Segmentos DL: só linhas dentro do vocabulário (como no SegmentedModelRegistry)
+                df = df.filter(normalizer.embedding_domain_mask(df))
+            if label == "1 linha":
+                df = df.head(1)
+            ref = normalizer._transform_derived_schema(df)
+            got = normalizer.transform_derived(df)
+            if isinstance(ref, dict):
+                equal = ref.keys() == got.keys() and all(_same(ref[k], got[k]) for k in ref)
+            else:
+                equal = _same(ref, got)
+            if not equal:
+                failed.append(label)
+        ok &= not failed
+        status = "idêntico" if not failed else "DIVERGE: " + ", ".join(failed)
+        print(f"  {name:<44} {len(frames)} frames  {status}")
+    return ok
+
+
+def _bench(sizes: list[int], repeats: int) -> None:
+    """Latência mediana por tamanho de lote: caminho ModelSchema vs plano."""
+    import time
+
+    from tools.normalizer import FeatureDeriver
+    from tools.warmup import synthetic_frame
+
+    derived = FeatureDeriver.derive(synthetic_frame(max(sizes)))
+    targets = [(n, z) for n, z in _normalizers() if n in ("dl/global", "ml/SPLIT_DUTO", "ml/DESCONHECIDO")]
+    for name, normalizer in targets:
+        print(f"\n  {name}: {len(normalizer.feature_columns)} features")
+        print(f"  {'':>12} {'ModelSchema':>13} {'plano':>11} {'speedup':>9}")
+        for n in sizes:
+            df = derived.head(n)
+            ms = {}
+            for label, fn in (("schema", normalizer._transform_derived_schema),
+                              ("plano", normalizer.transform_derived)):
+                fn(df)
+                times = []
+                for _ in range(repeats if n < 100_000 else max(3, repeats // 10)):
+                    t0 = time.perf_counter()
+                    fn(df)
+                    times.append(time.perf_counter() - t0)
+                ms[label] = float(np.median(times)) * 1000
+            print(f"  {f'n={n:,}':>12} {ms['schema']:>11.2f}ms {ms['plano']:>9.2f}ms "
+                  f"{ms['schema'] / ms['plano']:>8.1f}×")
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+
+    parser = argparse.ArgumentParser(description="Plano compilado do DLNormalizer/MLNormalizer")
+    parser.add_argument("command", choices=("parity", "bench"))
+    parser.add_argument("--sizes", default="1,1000,100000,1000000")
+    parser.add_argument("--repeats", type=int, default=30)
+    args = parser.parse_args()
+
+    if args.command == "parity":
+        sys.exit(0 if _parity() else 1)
+    _bench([int(s) for s in args.sizes.split(",")], args.repeats)
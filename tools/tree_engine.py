@@ -0,0 +1,487 @@
+"""
+Tree Engine — Predição dos segmentos LightGBM/XGBoost em NumPy
+==============================================================
+
+``HVACMLInferenceAPI.predict`` passa por ``MLPipeline.predict`` →
+``MLNormalizer.transform`` → API sklearn do booster: validação de input,
+conversão para a estrutura do LightGBM/XGBoost e despacho para o C++ a cada
+chamada — para lotes pequenos o overhead domina, e a carga exige
+desserializar o pickle inteiro (e importar lightgbm/xgboost/sklearn).
+
+Aqui as árvores de cada segmento são achatadas em arrays contíguos, uma
+linha por nó (todas as árvores concatenadas):
+
+    best_pipeline.joblib ──► export_tree_model() ──► tree_model.npz
+                               ├─ feature    int32   (n_nodes,)   índice da coluna de X
+                               ├─ threshold  float64 (n_nodes,)   direita ⇔ x > threshold
+                               ├─ children   int32   (n_nodes, 2) [esquerda, direita]
+                               ├─ value      float64 (n_nodes,)   valor da folha
+                               ├─ nan_right  bool    (n_nodes,)   destino de NaN
+                               └─ roots, base_score, max_depth
+
+    NumpyTreeEnsemble.predict(X)   (mesmo array de MLNormalizer.transform)
+        node = roots                          (n, n_trees) — todas as árvores juntas
+        max_depth × : right = X[i, feature[node]] > threshold[node]
+                      node  = children[node, right]
+        ŷ = base_score + Σ_t value[node_t]
+
+Folhas têm limiar +inf e apontam para si mesmas, então a travessia é sem
+desvios: todas as árvores avançam ``max_depth`` passos com 4 gathers e uma
+comparação por passo, sem laço Python por árvore ou por linha (e sem numba).
+
+A semântica de cada booster é normalizada na exportação para essa única
+comparação:
+    LightGBM : ``x <= limiar`` → esquerda; ``missing_type`` None → NaN é 0.0,
+               NaN → NaN segue ``default_left``; splits categóricos (``==``,
+               ex: grupo_regional) viram uma pequena sub-árvore de busca sobre
+               as faixas de ``int(x)`` do conjunto.
+    XGBoost  : ``x < limiar`` (float32) vira ``x <= anterior(limiar)`` em
+               float64; NaN segue ``default_left``; ``base_score`` somado às folhas.
+
+O ``.npz`` guarda o sha256 do ``best_pipeline.joblib`` de origem e é recusado
+na carga se o pipeline foi re-treinado sem re-exportar. ``MLPipeline.save()``
+exporta o ``.npz`` junto com o modelo.
+
+CLI:
+    python -m tools.tree_engine export model/artifacts/ml_hvac     # todos os segmentos
+    python -m tools.tree_engine parity model/artifacts/ml_hvac
+    python -m tools.tree_engine bench  model/artifacts/ml_hvac/SPLIT_DUTO
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+
+_logger = logging.getLogger(__name__)
+
+TREE_MODEL_FILE = "tree_model.npz"
+_FORMAT_VERSION = 1
+
+# Objetivos cuja saída é a soma das folhas (sem função de ligação)
+_LGBM_IDENTITY = {"regression", "regression_l1", "huber", "fair", "quantile", "mape"}
+_XGB_IDENTITY = {"reg:squarederror", "reg:absoluteerror", "reg:pseudohubererror", "reg:quantileerror"}
+
+# Linhas por travessia: limita o array de nós ativos a (_CHUNK_ROWS × n_trees)
+_CHUNK_ROWS = 256
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  EXPORTAÇÃO (requer lightgbm/xgboost)
+# ══════════════════════════════════════════════════════════════════════════════
+
+class _NodeTable:
+    """
+    Acumula nós de várias árvores nos arrays planos do ``.npz``.
+
+    Todo nó interno é normalizado para ``direita ⇔ x > threshold`` e
+    ``nan_right`` dá o destino de NaN. Folhas têm limiar +inf e apontam para
+    si mesmas, então ficam paradas nos passos restantes da travessia.
+    """
+
+    def __init__(self) -> None:
+        self.feature: list[int] = []
+        self.threshold: list[float] = []
+        self.children: list[list[int]] = []
+        self.value: list[float] = []
+        self.nan_right: list[bool] = []
+        self.roots: list[int] = []
+
+    def leaf(self, value: float) -> int:
+        idx = len(self.feature)
+        self.feature.append(0)
+        self.threshold.append(np.inf)
+        self.children.append([idx, idx])
+        self.value.append(float(value))
+        self.nan_right.append(False)
+        return idx
+
+    def split(self, feature: int, threshold: float, nan_right: bool, left: int = -1, right: int = -1) -> int:
+        idx = len(self.feature)
+        self.feature.append(int(feature))
+        self.threshold.append(float(threshold))
+        self.children.append([left, right])
+        self.value.append(0.0)
+        self.nan_right.append(bool(nan_right))
+        return idx
+
+    def category_split(self, feature: int, categories: list[int], left: int, right: int) -> int:
+        """
+        Split categórico do LightGBM (``int(x) ∈ conjunto`` → esquerda; NaN ou
+        ``int(x) < 0`` → direita) compilado em uma sub-árvore de busca numérica.
+
+        ``int()`` trunca em direção a zero: a categoria c ≥ 1 cobre [c, c+1) e a
+        0 cobre (-1, 1). Em ``x <= b`` cada faixa vira (lo, hi] com
+        hi = anterior(c+1); faixas contíguas são fundidas e a busca binária
+        sobre as bordas termina em ``left`` ou ``right``. NaN vai à direita em
+        todo nó e chega à última faixa, que é sempre "fora do conjunto".
+        """
+        bounds: list[float] = []  # bordas alternando entrada/saída do conjunto
+        for c in sorted(set(categories)):
+            lo = -1.0 if c == 0 else float(np.nextafter(c, -np.inf))
+            hi = float(np.nextafter(c + 1, -np.inf))
+            if bounds and bounds[-1] == lo:
+                bounds[-1] = hi
+            else:
+                bounds += [lo, hi]
+
+        def _search(first: int, last: int) -> int:
+            # Faixas first..last; a faixa i está entre bounds[i-1] e bounds[i]; ímpar = no conjunto
+            if first == last:
+                return left if first % 2 else right
+            mid = (first + last) // 2
+            return self.split(feature, bounds[mid], True, _search(first, mid), _search(mid + 1, last))
+
+        return _search(0, len(bounds))
+
+    def max_depth(self) -> int:
+        """Maior caminho raiz → folha (as sub-árvores categóricas formam um DAG)."""
+        depth: dict[int, int] = {}
+
+        def _depth(idx: int) -> int:
+            if idx not in depth:
+                left, right = self.children[idx]
+                depth[idx] = 0 if left == idx else 1 + max(_depth(left), _depth(right))
+            return depth[idx]
+
+        return max((_depth(r) for r in self.roots), default=0)
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        return {
+            "feature":   np.asarray(self.feature, dtype=np.int32),
+            "threshold": np.asarray(self.threshold, dtype=np.float64),
+            "children":  np.asarray(self.children, dtype=np.int32).reshape(-1, 2),
+            "value":     np.asarray(self.value, dtype=np.float64),
+            "nan_right": np.asarray(self.nan_right, dtype=bool),
+            "roots":     np.asarray(self.roots, dtype=np.int32),
+            "max_depth": np.array(self.max_depth()),
+        }
+
+
+def _flatten_lightgbm(model) -> dict[str, np.ndarray]:
+    dump = model.booster_.dump_model()  # mesmas iterações que predict (best_iteration)
+    if dump["num_tree_per_iteration"] != 1 or dump.get("average_output"):
+        raise ValueError("LightGBM: só regressão gbdt (uma árvore por iteração) é suportada")
+    objective = dump["objective"].split()[0]
+    if objective not in _LGBM_IDENTITY:
+        raise ValueError(f"LightGBM: objetivo {objective!r} não suportado")
+
+    table = _NodeTable()
+
+    def _walk(node: dict) -> int:
+        if "split_index" not in node:
+            return table.leaf(node["leaf_value"])
+        left, right = _walk(node["left_child"]), _walk(node["right_child"])
+        feature = node["split_feature"]
+        if node["decision_type"] == "==":
+            categories = [int(c) for c in str(node["threshold"]).split("||")]
+            return table.category_split(feature, categories, left, right)
+        threshold = float(node["threshold"])
+        if node["missing_type"] == "NaN":
+            nan_right = not node["default_left"]
+        elif node["missing_type"] == "None":
+            nan_right = not 0.0 <= threshold  # NaN é tratado como 0.0
+        else:  # "Zero" (zero_as_missing=True): zero e NaN seguem default_left
+            raise ValueError("LightGBM: missing_type 'Zero' (zero_as_missing) não suportado")
+        return table.split(feature, threshold, nan_right, left, right)
+
+    for tree in dump["tree_info"]:
+        table.roots.append(_walk(tree["tree_structure"]))
+    return {**table.arrays(), "base_score": np.array(0.0)}
+
+
+def _flatten_xgboost(model) -> dict[str, np.ndarray]:
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw("json"))["learner"]
+    if learner["objective"]["name"] not in _XGB_IDENTITY:
+        raise ValueError(f"XGBoost: objetivo {learner['objective']['name']!r} não suportado")
+    gbm = learner["gradient_booster"]
+    if gbm["name"] != "gbtree":
+        raise ValueError(f"XGBoost: booster {gbm['name']!r} não suportado")
+    trees = gbm["model"]["trees"]
+    best = booster.attr("best_iteration")
+    if best is not None:  # predict do sklearn usa iteration_range=(0, best + 1)
+        trees = trees[: gbm["model"]["iteration_indptr"][int(best) + 1]]
+
+    table = _NodeTable()
+    for tree in trees:
+        if any(tree["split_type"]):
+            raise ValueError("XGBoost: splits categóricos não suportados")
+        base = len(table.feature)
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32).astype(np.float64)
+        for nid, (left, right) in enumerate(zip(tree["left_children"], tree["right_children"])):
+            if left == -1:
+                table.leaf(conditions[nid])
+            else:
+                # XGBoost: esquerda ⇔ x < c  ⇔  x <= anterior(c) (exato em float64)
+                table.split(
+                    tree["split_indices"][nid],
+                    np.nextafter(conditions[nid], -np.inf),
+                    not tree["default_left"][nid],
+                    base + left,
+                    base + right,
+                )
+        table.roots.append(base)
+
+    base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+    return {**table.arrays(), "base_score": np.array(base_score)}
+
+
+def flatten_trees(model) -> dict[str, np.ndarray]:
+    """Arrays do ``.npz`` a partir de um ``LGBMRegressor`` ou ``XGBRegressor`` treinado."""
+    name = type(model).__name__
+    if name.startswith("LGBM"):
+        return _flatten_lightgbm(model)
+    if name.startswith("XGB"):
+        return _flatten_xgboost(model)
+    raise ValueError(f"Modelo {name} não suportado pelo tree engine (LightGBM/XGBoost)")
+
+
+def export_tree_model(artifact_dir: str | Path, pipeline=None) -> Path:
+    """
+    Grava ``{artifact_dir}/tree_model.npz`` a partir de ``best_pipeline.joblib``.
+
+    Args:
+        artifact_dir: Diretório com ``best_pipeline.joblib``.
+        pipeline    : MLPipeline já carregado (evita ler o ``.joblib`` de novo).
+
+    Returns:
+        Caminho do ``.npz`` gravado.
+    """
+    artifact_dir = Path(artifact_dir)
+    joblib_file = artifact_dir / "best_pipeline.joblib"
+    if pipeline is None:
+        from tools.normalizer import load_ml_pipeline
+
+        pipeline = load_ml_pipeline(joblib_file)
+    arrays = flatten_trees(pipeline.model)
+
+    out = artifact_dir / TREE_MODEL_FILE
+    tmp = out.with_name(out.stem + ".tmp.npz")
+    np.savez(
+        tmp,
+        format_version=np.array(_FORMAT_VERSION),
+        joblib_sha256=np.array(_sha256(joblib_file)),
+        n_features=np.array(len(pipeline.feature_columns_)),
+        **arrays,
+    )
+    tmp.replace(out)
+    _logger.info(
+        f"Árvores exportadas para {out} ({len(arrays['roots'])} árvores, "
+        f"{len(arrays['feature'])} nós, {out.stat().st_size / 1024:.0f} KB)"
+    )
+    return out
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  ENGINE (apenas NumPy)
+# ══════════════════════════════════════════════════════════════════════════════
+
+class NumpyTreeEnsemble:
+    """
+    Soma de árvores de regressão avaliada em NumPy, todas as árvores por passo.
+
+    Attributes:
+        n_trees    : Número de árvores.
+        n_features : Colunas esperadas em X (``MLNormalizer.feature_columns``).
+        max_depth  : Passos de travessia (caminho mais longo, com os splits categóricos compilados).
+    """
+
+    def __init__(self, arrays: dict[str, np.ndarray]) -> None:
+        self._feature = arrays["feature"].astype(np.intp)
+        self._threshold = arrays["threshold"]
+        self._children = np.ascontiguousarray(arrays["children"], dtype=np.intp).ravel()
+        self._value = arrays["value"]
+        self._nan_right = arrays["nan_right"]
+        self._roots = arrays["roots"].astype(np.intp)
+        self._base_score = float(arrays["base_score"])
+        self.n_trees = len(self._roots)
+        self.n_features = int(arrays["n_features"])
+        self.max_depth = int(arrays["max_depth"])
+
+    @classmethod
+    def from_artifact(cls, artifact_dir: str | Path) -> "NumpyTreeEnsemble":
+        """
+        Carrega ``tree_model.npz`` de um artefato.
+
+        Raises:
+            FileNotFoundError: ``.npz`` ausente (rode ``python -m tools.tree_engine export``).
+            ValueError       : ``.npz`` exportado de outro ``best_pipeline.joblib``.
+        """
+        artifact_dir = Path(artifact_dir)
+        npz = artifact_dir / TREE_MODEL_FILE
+        if not npz.exists():
+            raise FileNotFoundError(
+                f"{npz} não encontrado — exporte com: python -m tools.tree_engine export {artifact_dir}"
+            )
+        with np.load(npz) as data:
+            arrays = {k: data[k] for k in data.files}
+        if int(arrays.pop("format_version")) != _FORMAT_VERSION:
+            raise ValueError(f"{npz}: versão de formato não suportada")
+        source = str(arrays.pop("joblib_sha256"))
+        joblib_file = artifact_dir / "best_pipeline.joblib"
+        if joblib_file.exists() and _sha256(joblib_file) != source:
+            raise ValueError(
+                f"{npz} foi exportado de outro best_pipeline.joblib — re-exporte com: "
+                f"python -m tools.tree_engine export {artifact_dir}"
+            )
+        return cls(arrays)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """
+        Predição (n,) float64 — mesma saída de ``model.predict(X)``.
+
+        Args:
+            X: (n, n_features), tipicamente o float32 de ``MLNormalizer.transform``.
+        """
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"X deve ter shape (n, {self.n_features}), recebido {X.shape}")
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), _CHUNK_ROWS):
+            chunk = X[start:start + _CHUNK_ROWS]
+            out[start:start + len(chunk)] = self._predict_chunk(chunk)
+        return out
+
+    def _predict_chunk(self, X: np.ndarray) -> np.ndarray:
+        n, d = X.shape
+        flat = np.ascontiguousarray(X, dtype=np.float64).ravel()  # float32 → float64 é exato
+        has_nan = bool(np.isnan(flat).any())
+        row_base = (np.arange(n, dtype=np.intp) * d)[:, None]
+
+        # Buffers reaproveitados entre passos: cada passo são 4 gathers + 1 comparação
+        node = np.tile(self._roots, (n, 1))
+        slot = np.empty_like(node)
+        x = np.empty(node.shape, dtype=np.float64)
+        threshold = np.empty_like(x)
+        go_right = np.empty(node.shape, dtype=bool)
+        for _ in range(self.max_depth):
+            np.take(self._feature, node, out=slot)
+            slot += row_base
+            np.take(flat, slot, out=x)
+            np.take(self._threshold, node, out=threshold)
+            np.greater(x, threshold, out=go_right)
+            if has_nan:
+                nan = np.isnan(x)
+                go_right[nan] = self._nan_right[node[nan]]
+            np.multiply(node, 2, out=slot)
+            slot += go_right
+            np.take(self._children, slot, out=node)
+
+        return np.take(self._value, node).sum(axis=1) + self._base_score
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  CLI — exportação, paridade e benchmark
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _artifact_dirs(root: Path) -> list[Path]:
+    """``root`` se for um artefato, senão todos os segmentos abaixo dele."""
+    if (root / "best_pipeline.joblib").exists():
+        return [root]
+    return sorted(p.parent for p in root.rglob("best_pipeline.joblib"))
+
+
+def _parity(artifact_dir: Path, sizes: tuple[int, ...] = (1, 7, 1000, 20_000)) -> float:
+    """Máximo erro relativo entre ``model.predict`` nativo e o engine (mesmo X normalizado)."""
+    from tools.normalizer import FeatureDeriver, MLNormalizer, load_ml_pipeline
+    from tools.warmup import synthetic_frame
+
+    pipeline = load_ml_pipeline(artifact_dir / "best_pipeline.joblib")
+    normalizer = MLNormalizer.from_pipeline(pipeline)
+    engine = NumpyTreeEnsemble.from_artifact(artifact_dir)
+    worst = 0.0
+    for i, n in enumerate(sizes):
+        X = normalizer.transform_derived(FeatureDeriver.derive(synthetic_frame(n, seed=i)))
+        # Variação extra em todas as colunas: cobre ramos que o frame sintético não alcança
+        rng = np.random.default_rng(i)
+        X = np.concatenate([X, X * rng.uniform(0.5, 1.5, X.shape).astype(np.float32)])
+        ref = np.asarray(pipeline.model.predict(X), dtype=np.float64).ravel()
+        got = engine.predict(X)
+        diff = float(np.max(np.abs(ref - got)))
+        rel = diff / max(float(np.max(np.abs(ref))), 1e-6)
+        print(f"  n={len(X):>6}  max|Δ|={diff:.2e}  relativo={rel:.2e}")
+        worst = max(worst, rel)
+    return worst
+
+
+def _bench(artifact_dir: Path, sizes: list[int], repeats: int) -> None:
+    """Latência mediana e throughput por tamanho de lote: booster nativo vs engine."""
+    import time
+    import warnings
+
+    from tools.normalizer import FeatureDeriver, MLNormalizer, load_ml_pipeline
+    from tools.warmup import synthetic_frame
+
+    t0 = time.perf_counter()
+    pipeline = load_ml_pipeline(artifact_dir / "best_pipeline.joblib")
+    native_load = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    engine = NumpyTreeEnsemble.from_artifact(artifact_dir)
+    numpy_load = time.perf_counter() - t0
+
+    normalizer = MLNormalizer.from_pipeline(pipeline)
+    X_all = normalizer.transform_derived(FeatureDeriver.derive(synthetic_frame(max(sizes))))
+
+    print(f"\n  {artifact_dir.name}: {type(pipeline.model).__name__}, {engine.n_trees} árvores, "
+          f"profundidade {engine.max_depth}")
+    print(f"  carga: nativo (joblib) {native_load * 1000:.0f} ms, numpy {numpy_load * 1000:.1f} ms")
+    print(f"\n  {'':>10} {'nativo':>12} {'numpy':>12} {'speedup':>9} {'numpy linhas/s':>16}")
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore")
+        for n in sizes:
+            X = X_all[:n]
+            ms = {}
+            for name, fn in (("nativo", pipeline.model.predict), ("numpy", engine.predict)):
+                fn(X)
+                times = []
+                for _ in range(repeats):
+                    t0 = time.perf_counter()
+                    fn(X)
+                    times.append(time.perf_counter() - t0)
+                ms[name] = float(np.median(times)) * 1000
+            print(f"  {f'n={n}':>10} {ms['nativo']:>10.3f}ms {ms['numpy']:>10.3f}ms "
+                  f"{ms['nativo'] / ms['numpy']:>8.1f}× {n / ms['numpy'] * 1000:>16,.0f}")
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    parser = argparse.ArgumentParser(description="Engine NumPy dos segmentos LightGBM/XGBoost")
+    parser.add_argument("command", choices=("export", "parity", "bench"))
+    parser.add_argument("path", type=Path, help="Segmento (…/ml_hvac/SPLIT_DUTO) ou raiz ml_hvac")
+    parser.add_argument("--sizes", default="1,8,64,512,4096,32768")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        for artifact in _artifact_dirs(args.path):
+            export_tree_model(artifact)
+    elif args.command == "parity":
+        failed = False
+        for artifact in _artifact_dirs(args.path):
+            print(f"\n  {artifact}")
+            worst = _parity(artifact)
+            ok = worst < 1e-5
+            failed |= not ok
+            print(f"  {'OK' if ok else 'FALHOU'} (erro relativo máximo {worst:.2e}, tolerância 1e-5)")
+        sys.exit(1 if failed else 0)
+    else:
+        for artifact in _artifact_dirs(args.path):
+            _bench(artifact, [int(s) for s in args.sizes.split(",")], args.repeats)
@@ -0,0 +1,112 @@
+"""
+Warm-up — Lotes sintéticos para aquecer um modelo antes de servi-lo
+===================================================================
+
+A primeira predição de um ``HVACDLInferenceAPI`` recém-carregado paga o
+tracing do grafo TensorFlow (por formato de lote), a inicialização do
+polars, a leitura do calendário e da referência geográfica e, com roteamento por
+segmento, a carga dos modelos de segmento mais comuns — as primeiras
+requisições ficam 10–100× mais lentas que o regime. Rodar lotes sintéticos
+de vários tamanhos antes de expor o modelo tira esse custo das requisições:
+
+    modelo novo ──► synthetic_frame(n) ──► predictor.predict ──► (só então) /ready, swap
+                    n ∈ WARMUP_BATCH_SIZES    └─ hvac_warmup_seconds{target,batch_size}
+
+As linhas são válidas para ``PredictionRequest`` (mesmas faixas) e cobrem os
+tipos de máquina mais frequentes, todas as horas e dias úteis/fins de semana.
+
+Uso:
+    >>> timings = warm_up(api, sizes=(1, 64))
+    >>> timings
+    {1: 0.41, 64: 0.05}
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from datetime import date, timedelta
+from typing import Sequence
+
+import numpy as np
+import polars as pl
+
+try:
+    from .metrics import WARMUP_SECONDS
+except ImportError:
+    from metrics import WARMUP_SECONDS
+
+_logger = logging.getLogger(__name__)
+
+# Tipos brutos (antes de adjust_machine_type) dos segmentos mais frequentes
+WARMUP_MACHINE_TYPES: tuple[str, ...] = (
+    "splitao",
+    "split-wall",
+    "splitao-inverter",
+    "rooftop",
+    "self",
+    "split-duto",
+    "ar condicionado de janela",
+)
+
+_BASE_DATE = date(2025, 7, 1)
+
+
+def synthetic_frame(n: int, seed: int = 0) -> pl.DataFrame:
+    """
+    ``n`` linhas sintéticas no schema do normalizer (13 colunas de input).
+
+    Clima em faixas plausíveis para a Grande São Paulo; coordenadas com
+    pequena dispersão em torno do centro (o geo lookup é um KNN-1, qualquer
+    ponto resolve).
+    """
+    rng = np.random.default_rng(seed)
+    idx = np.arange(n)
+    temp = rng.uniform(12.0, 34.0, n)
+    return pl.DataFrame({
+        "hora":                    idx % 24,
+        "data":                    [_BASE_DATE + timedelta(days=int(d)) for d in idx % 14],
+        "machine_type":            [WARMUP_MACHINE_TYPES[i % len(WARMUP_MACHINE_TYPES)] for i in idx],
+        "latitude":                -23.55 + rng.normal(0.0, 0.05, n),
+        "longitude":               -46.63 + rng.normal(0.0, 0.05, n),
+        "Temperatura_C":           temp,
+        "Temperatura_Percebida_C": temp + rng.normal(0.0, 1.0, n),
+        "Umidade_Relativa_%":      rng.uniform(30.0, 95.0, n),
+        "Precipitacao_mm":         rng.exponential(0.5, n),
+        "Velocidade_Vento_kmh":    rng.uniform(0.0, 30.0, n),
+        "Pressao_Superficial_hPa": rng.uniform(920.0, 1015.0, n),
+        "Irradiancia_Direta_Wm2":  rng.uniform(0.0, 800.0, n),
+        "Irradiancia_Difusa_Wm2":  rng.uniform(0.0, 300.0, n),
+    }).with_columns(pl.col("data").cast(pl.Date))
+
+
+def warm_up(
+    predictor,
+    sizes: Sequence[int] = (1, 64),
+    target: str = "global",
+) -> dict[int, float]:
+    """
+    Roda um lote sintético de cada tamanho em ``sizes`` por ``predictor.predict``.
+
+    Args:
+        predictor: ``HVACDLInferenceAPI`` ou ``SegmentedModelRegistry``.
+        sizes    : Tamanhos de lote, na ordem de execução.
+        target   : Label ``target`` em ``hvac_warmup_seconds`` (global | segments).
+
+    Returns:
+        {tamanho: segundos} de cada lote.
+
+    Raises:
+        ValueError: Predição não finita — o modelo não deve ser servido.
+    """
+    timings: dict[int, float] = {}
+    for i, n in enumerate(sizes):
+        df = synthetic_frame(n, seed=i)
+        t0 = time.perf_counter()
+        preds = np.asarray(predictor.predict(df))
+        timings[n] = time.perf_counter() - t0
+        if preds.shape != (n,) or not np.isfinite(preds).all():
+            raise ValueError(f"Warm-up com {n} linhas produziu predições inválidas")
+        WARMUP_SECONDS.set(timings[n], target=target, batch_size=str(n))
+        _logger.info("Warm-up (%s): lote de %d linhas em %.1fms", target, n, timings[n] * 1000)
+    return timings